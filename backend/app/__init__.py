@@ -0,0 +1,6 @@
+"""Chronology backend application."""
+
+import time
+
+# Taken before any application module is imported; /health reports the import time measured from here
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,68 @@
+"""
+Streaming statistics for regression detection on ingest.
+
+Every (project, model, metric) keeps a small state that each new value
+updates in O(1): Welford's running count, mean and M2 over all values, and
+an exponentially weighted mean and variance that track the recent level.
+A value is anomalous when it lies more than ``ANOMALY_Z_THRESHOLD`` EWMA
+standard deviations from the EWMA mean as it stood *before* the value was
+folded in. It is a regression when that deviation is in the metric's worse
+direction (e.g. accuracy down, loss up).
+"""
+
+import math
+from typing import Optional
+
+from .config import ANOMALY_EWMA_ALPHA, ANOMALY_MIN_SAMPLES
+
+# Metrics where a smaller value is better (matched as substrings of the metric id)
+LOWER_IS_BETTER_HINTS = ('loss', 'error', 'mse', 'mae', 'perplexity', 'latency')
+
+# Below this the EWMA deviation is treated as zero, so constant series never score
+_MIN_STD = 1e-12
+
+
+def lower_is_better(metric_id: str) -> bool:
+    """Whether smaller values of a metric are better, e.g. loss versus accuracy."""
+    name = metric_id.lower()
+    return any(hint in name for hint in LOWER_IS_BETTER_HINTS)
+
+
+def new_state() -> dict:
+    return {"count": 0, "mean": 0.0, "m2": 0.0, "ewma_mean": 0.0, "ewma_var": 0.0}
+
+
+def observe(state: dict, value: float, alpha: float = ANOMALY_EWMA_ALPHA,
+            min_samples: int = ANOMALY_MIN_SAMPLES) -> Optional[tuple]:
+    """Fold ``value`` into ``state`` in place.
+
+    Returns ``(z_score, expected, std)`` measured against the state before the
+    update, or None while fewer than ``min_samples`` values have been seen or
+    the recent values have no spread.
+    """
+    scored = None
+    if state["count"] >= min_samples:
+        std = math.sqrt(state["ewma_var"])
+        if std > _MIN_STD:
+            scored = ((value - state["ewma_mean"]) / std, state["ewma_mean"], std)
+
+    state["count"] += 1
+    delta = value - state["mean"]
+    state["mean"] += delta / state["count"]
+    state["m2"] += delta * (value - state["mean"])
+
+    if state["count"] <= max(min_samples, round(1 / alpha)):
+        # Until the EWMA's effective window has filled, mirror the unweighted statistics so
+        # the EWMA starts from an unbiased level and spread instead of from a single value
+        state["ewma_mean"] = state["mean"]
+        state["ewma_var"] = state["m2"] / (state["count"] - 1) if state["count"] > 1 else 0.0
+    else:
+        difference = value - state["ewma_mean"]
+        increment = alpha * difference
+        state["ewma_mean"] += increment
+        state["ewma_var"] = (1 - alpha) * (state["ewma_var"] + difference * increment)
+    return scored
+
+
+def is_regression(metric_id: str, z_score: float) -> bool:
+    return z_score > 0 if lower_is_better(metric_id) else z_score < 0
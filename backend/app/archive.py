@@ -0,0 +1,194 @@
+"""
+Cold-tier archive of metric records in compressed columnar segment files.
+
+Archiving moves a project's records out of ``project_metrics`` into
+immutable segment files under ``ARCHIVE_DIR/<project>/``; the
+``archive_segments`` table is the catalog of which files hold live data.
+A segment stores each column as a separately zlib-compressed block, so a
+reader only decompresses the columns it needs, and only when first asked.
+Decoded segments are kept in a small LRU since archived projects are read
+rarely but usually several times in a row.
+
+Segment layout::
+
+    MAGIC | u32 header length | JSON header | column blocks
+
+The header records the row count and, per column, its type, offset and
+length. Types: ``str`` (JSON list of strings or nulls), ``f64`` (float64
+array, NaN for null) and ``ts`` (int64 microseconds since the epoch).
+"""
+
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+import uuid
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from .cache import VersionedCache
+from .config import ARCHIVE_DIR, ARCHIVE_CACHE_SEGMENTS
+
+MAGIC = b"CHRSEG1\n"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# project_metrics column -> segment column type
+ARCHIVE_COLUMNS = {
+    "id": "str",
+    "timestamp": "ts",
+    "model_name": "str",
+    "model_version": "str",
+    "accuracy": "f64",
+    "loss": "f64",
+    "precision": "f64",
+    "recall": "f64",
+    "f1_score": "f64",
+    "additional_metrics": "str",
+}
+
+_NAN = float("nan")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def project_archive_dir(project_id: str) -> Path:
+    return Path(ARCHIVE_DIR) / quote(project_id, safe="")
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode(kind: str, values: List[Any]) -> bytes:
+    if kind == "str":
+        raw = json.dumps(values, separators=(",", ":")).encode()
+    elif kind == "f64":
+        raw = _little_endian(array("d", (_NAN if value is None else value for value in values))).tobytes()
+    else:
+        raw = _little_endian(array("q", ((value - _EPOCH) // _MICROSECOND for value in values))).tobytes()
+    return zlib.compress(raw, 6)
+
+
+def _decode(kind: str, block: bytes) -> List[Any]:
+    raw = zlib.decompress(block)
+    if kind == "str":
+        return json.loads(raw)
+    values = _little_endian(array("d" if kind == "f64" else "q", raw))
+    if kind == "f64":
+        return [None if value != value else value for value in values]
+    return [_EPOCH + timedelta(microseconds=micros) for micros in values]
+
+
+def write_segment(path: Path, rows: List[dict]) -> int:
+    """Write rows (``project_metrics`` column dicts) as a new segment; returns the file size.
+
+    The file is written under a temporary name and renamed into place, so a
+    segment is either complete or absent.
+    """
+    blocks = []
+    columns = {}
+    offset = 0
+    for name, kind in ARCHIVE_COLUMNS.items():
+        block = _encode(kind, [row[name] for row in rows])
+        columns[name] = {"type": kind, "offset": offset, "length": len(block)}
+        blocks.append(block)
+        offset += len(block)
+    header = json.dumps({"rows": len(rows), "columns": columns}).encode()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(_HEADER_LENGTH.pack(len(header)))
+        file.write(header)
+        for block in blocks:
+            file.write(block)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return path.stat().st_size
+
+
+class SegmentReader:
+    """Reads one segment, decompressing each column on first access."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a Chronology archive segment")
+            (header_length,) = _HEADER_LENGTH.unpack(file.read(_HEADER_LENGTH.size))
+            header = json.loads(file.read(header_length))
+        self.rows: int = header["rows"]
+        self._columns: Dict[str, dict] = header["columns"]
+        self._data_offset = len(MAGIC) + _HEADER_LENGTH.size + header_length
+        self._decoded: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def column(self, name: str) -> List[Any]:
+        with self._lock:
+            values = self._decoded.get(name)
+            if values is None:
+                meta = self._columns[name]
+                with open(self.path, "rb") as file:
+                    file.seek(self._data_offset + meta["offset"])
+                    block = file.read(meta["length"])
+                values = self._decoded[name] = _decode(meta["type"], block)
+            return values
+
+    def records(self) -> Iterator[dict]:
+        """Rows as ``project_metrics`` column dicts."""
+        columns = [(name, self.column(name)) for name in ARCHIVE_COLUMNS]
+        for i in range(self.rows):
+            yield {name: values[i] for name, values in columns}
+
+
+# Segments are immutable, so the file name is a sufficient version
+_segment_cache = VersionedCache(max_entries=ARCHIVE_CACHE_SEGMENTS)
+
+
+def open_segment(project_id: str, name: str) -> SegmentReader:
+    path = project_archive_dir(project_id) / name
+    reader = _segment_cache.get(str(path), name)
+    if reader is None:
+        reader = SegmentReader(path)
+        _segment_cache.set(str(path), name, reader)
+    return reader
+
+
+def new_segment_name() -> str:
+    return f"segment-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.seg"
+
+
+def remove_segment(project_id: str, name: str) -> None:
+    path = project_archive_dir(project_id) / name
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def remove_project_archive(project_id: str) -> None:
+    """Delete all segment files of a project, e.g. after the project itself is deleted."""
+    shutil.rmtree(project_archive_dir(project_id), ignore_errors=True)
+
+
+def read_archived_rows(project_id: str, segment_names: List[str], columns: Optional[List[str]] = None) -> List[dict]:
+    """Rows of the given segments, limited to ``columns`` (decompressing only those)."""
+    rows: List[dict] = []
+    for name in segment_names:
+        reader = open_segment(project_id, name)
+        if columns is None:
+            rows.extend(reader.records())
+        else:
+            values = [(column, reader.column(column)) for column in columns]
+            rows.extend({column: data[i] for column, data in values} for i in range(reader.rows))
+    return rows
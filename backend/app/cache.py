@@ -0,0 +1,169 @@
+"""
+Versioned in-process caches for derived project data.
+
+Every write path in ``storage.py`` bumps the version of the scopes it
+touches (for example ``project:<id>``). Cached values are stored together
+with the version they were computed at, so a lookup with a newer version is
+simply a miss and no explicit invalidation is needed.
+
+The version counters live in a small memory-mapped file next to the
+database, so a write handled by one uvicorn worker invalidates the caches of
+every other worker on the host. Checking a version is a read from shared
+memory, cheap enough to do on every request.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process versions
+    fcntl = None
+
+from .config import CACHE_EPOCH_PATH
+
+PROJECTS_SCOPE = "projects"
+DATASETS_SCOPE = "datasets"
+
+
+def project_scope(project_id: str) -> str:
+    return f"project:{project_id}"
+
+
+class DataVersions:
+    """Monotonic version counters per scope."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def current(self, scope: str) -> int:
+        return self._versions.get(scope, 0)
+
+    def bump(self, *scopes: str) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+
+EPOCH_SLOTS = 4096
+_SLOT = struct.Struct("<Q")
+
+
+class SharedDataVersions:
+    """Version counters in a memory-mapped file shared by all processes on the host.
+
+    Scopes hash into a fixed number of 8-byte slots; a collision only costs an
+    extra cache miss. Readers load a slot straight from the mapping, writers
+    increment under an exclusive ``flock`` so concurrent bumps are not lost.
+    """
+
+    def __init__(self, path: str, slots: int = EPOCH_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._open()
+
+    def _open(self) -> None:
+        size = self.slots * _SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        except OSError:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._pid = os.getpid()
+
+    def _ensure_open(self) -> None:
+        # flock is held per open file, so forked workers need their own descriptor
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._open()
+
+    def _offset(self, scope: str) -> int:
+        return (zlib.crc32(scope.encode()) % self.slots) * _SLOT.size
+
+    def current(self, scope: str) -> int:
+        self._ensure_open()
+        return _SLOT.unpack_from(self._map, self._offset(scope))[0]
+
+    def bump(self, *scopes: str) -> None:
+        self._ensure_open()
+        offsets = sorted({self._offset(scope) for scope in scopes})
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for offset in offsets:
+                    _SLOT.pack_into(self._map, offset, _SLOT.unpack_from(self._map, offset)[0] + 1)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def create_versions(path: Optional[str] = CACHE_EPOCH_PATH):
+    """Shared versions when an epoch file is configured and usable, per-process ones otherwise."""
+    if path and fcntl is not None:
+        try:
+            return SharedDataVersions(path)
+        except OSError as e:
+            print(f"Warning: Could not open cache epoch file {path}, caches are per-process: {e}")
+    return DataVersions()
+
+
+versions = create_versions()
+
+
+def touch_projects(*project_ids: str) -> None:
+    """Record that data of the given projects (and so the project list) changed."""
+    versions.bump(PROJECTS_SCOPE, *(project_scope(project_id) for project_id in project_ids))
+
+
+def touch_datasets() -> None:
+    """Record that a dataset file was added or replaced."""
+    versions.bump(DATASETS_SCOPE)
+
+
+class VersionedCache:
+    """Thread-safe LRU mapping ``key -> (version, value)``.
+
+    Read the version *before* computing a value and store it with that
+    version; a write that lands in between then makes the entry unreachable
+    instead of serving stale data.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: int, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -2,8 +2,29 @@
 Simple configuration management for the Chronology backend.
 """
 
+import os
 from typing import List
 
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_choice(name: str, default: str, choices: tuple) -> str:
+    value = os.getenv(name, default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, not '{value}'")
+    return value
+
+
 # Application settings
 APP_NAME = "Chronology Backend"
 APP_VERSION = "0.1.0"
@@ -11,6 +32,12 @@ DEBUG = True
 
 # Database settings
 DATABASE_URL = "sqlite:///./chronology.db"
+# Seeding on startup is opt-in so worker boot does not depend on database size
+SEED_ON_STARTUP = _env_flag("CHRONOLOGY_SEED_ON_STARTUP", False)
+
+# Shared file holding cache versions, so writes in one worker invalidate the caches
+# of the others; set to an empty string to keep versions per process
+CACHE_EPOCH_PATH = os.getenv("CHRONOLOGY_CACHE_EPOCH_PATH", "./chronology.db.epoch")
 
 # API settings
 API_PREFIX = "/api/v1"
@@ -18,4 +45,58 @@ CORS_ORIGINS: List[str] = ["*"]
 
 # Pagination settings
 DEFAULT_PAGE_SIZE = 50
-MAX_PAGE_SIZE = 100 
\ No newline at end of file
+MAX_PAGE_SIZE = 100
+
+# Instrumentation settings
+METRICS_ENABLED = _env_flag("CHRONOLOGY_METRICS_ENABLED", True)
+SERVER_TIMING_ENABLED = _env_flag("CHRONOLOGY_SERVER_TIMING", False)
+
+# Slow-query log settings (opt-in)
+SLOW_QUERY_LOG_ENABLED = _env_flag("CHRONOLOGY_SLOW_QUERY_LOG", False)
+SLOW_QUERY_THRESHOLD_MS = _env_number("CHRONOLOGY_SLOW_QUERY_THRESHOLD_MS", 100.0)
+SLOW_QUERY_LOG_SIZE = int(_env_number("CHRONOLOGY_SLOW_QUERY_LOG_SIZE", 200))
+
+# Projects with more records than this are purged by a background job
+PROJECT_PURGE_ASYNC_THRESHOLD = int(_env_number("CHRONOLOGY_PURGE_ASYNC_THRESHOLD", 100000))
+PROJECT_PURGE_CHUNK_SIZE = int(_env_number("CHRONOLOGY_PURGE_CHUNK_SIZE", 20000))
+
+# Cold-tier archive: where segment files live, records per segment, decoded segments kept in memory
+ARCHIVE_DIR = os.getenv("CHRONOLOGY_ARCHIVE_DIR", "./archive")
+ARCHIVE_SEGMENT_ROWS = int(_env_number("CHRONOLOGY_ARCHIVE_SEGMENT_ROWS", 100000))
+ARCHIVE_CACHE_SEGMENTS = int(_env_number("CHRONOLOGY_ARCHIVE_CACHE_SEGMENTS", 8))
+
+# Retention compaction: raw records rolled up per transaction, and how often to run it (0 = only on demand)
+RETENTION_BATCH_SIZE = int(_env_number("CHRONOLOGY_RETENTION_BATCH_SIZE", 5000))
+RETENTION_COMPACT_INTERVAL_SECONDS = _env_number("CHRONOLOGY_RETENTION_INTERVAL_SECONDS", 0)
+
+# Dataset streaming: read buffer size, and rows per emitted chunk
+DATASET_STREAM_BUFFER_BYTES = int(_env_number("CHRONOLOGY_DATASET_STREAM_BUFFER_BYTES", 1024 * 1024))
+DATASET_STREAM_BATCH_ROWS = int(_env_number("CHRONOLOGY_DATASET_STREAM_BATCH_ROWS", 1000))
+
+# Dataset import: rows converted and inserted per transaction
+DATASET_IMPORT_CHUNK_ROWS = int(_env_number("CHRONOLOGY_DATASET_IMPORT_CHUNK_ROWS", 20000))
+
+# Anomaly detection on ingest: smoothing of the rolling baseline, values seen before scoring starts,
+# and how many standard deviations from the baseline count as an anomaly
+ANOMALY_DETECTION_ENABLED = _env_flag("CHRONOLOGY_ANOMALY_DETECTION", True)
+ANOMALY_EWMA_ALPHA = _env_number("CHRONOLOGY_ANOMALY_EWMA_ALPHA", 0.1)
+ANOMALY_MIN_SAMPLES = int(_env_number("CHRONOLOGY_ANOMALY_MIN_SAMPLES", 10))
+ANOMALY_Z_THRESHOLD = _env_number("CHRONOLOGY_ANOMALY_Z_THRESHOLD", 3.0)
+
+# Response cache for hot read endpoints
+RESPONSE_CACHE_ENABLED = _env_flag("CHRONOLOGY_RESPONSE_CACHE", True)
+RESPONSE_CACHE_MAX_BYTES = int(_env_number("CHRONOLOGY_RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_TTL_SECONDS = _env_number("CHRONOLOGY_RESPONSE_CACHE_TTL_SECONDS", 300.0)
+
+# How long a request waits for an identical in-flight computation before running it itself
+SINGLE_FLIGHT_TIMEOUT_SECONDS = _env_number("CHRONOLOGY_SINGLE_FLIGHT_TIMEOUT_SECONDS", 30.0)
+
+# Metric ingestion: "direct" commits each posted record in the request, "queued" hands it to a
+# background writer that group-commits batches. With "queued", INGEST_ACK chooses whether the
+# request returns once the record is committed ("commit") or as soon as it is queued ("enqueue").
+INGEST_MODE = _env_choice("CHRONOLOGY_INGEST_MODE", "direct", ("direct", "queued"))
+INGEST_ACK = _env_choice("CHRONOLOGY_INGEST_ACK", "commit", ("commit", "enqueue"))
+INGEST_BATCH_SIZE = int(_env_number("CHRONOLOGY_INGEST_BATCH_SIZE", 500))
+INGEST_MAX_DELAY_MS = _env_number("CHRONOLOGY_INGEST_MAX_DELAY_MS", 20.0)
+INGEST_QUEUE_SIZE = int(_env_number("CHRONOLOGY_INGEST_QUEUE_SIZE", 10000))
+INGEST_COMMIT_TIMEOUT_SECONDS = _env_number("CHRONOLOGY_INGEST_COMMIT_TIMEOUT_SECONDS", 30.0)
@@ -1,22 +1,68 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
+from .config import METRICS_ENABLED, SLOW_QUERY_LOG_ENABLED, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_SIZE
+from .instrumentation import InstrumentedConnection, install_sql_hooks
+from .slow_queries import enable_slow_query_log
+from .search import create_search_index
 
 # Database URL
 DATABASE_URL = "sqlite:///./chronology.db"
 
 # Create engine
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+connect_args = {"check_same_thread": False}  # Needed for SQLite
+if METRICS_ENABLED:
+    connect_args["factory"] = InstrumentedConnection  # Counts rows fetched per request
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+@event.listens_for(engine, "connect")
+def _configure_connection(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are enforced per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    # Only takes effect for new database files; lets retention compaction shrink the file incrementally
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.close()
+
+if METRICS_ENABLED:
+    install_sql_hooks(engine)
+
+if SLOW_QUERY_LOG_ENABLED:
+    enable_slow_query_log(engine, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_SIZE)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables
-def create_tables():
+# Create missing tables with their indexes, and the search index, on the application engine or ``bind``
+def create_tables(bind=None):
     from .models import Base
-    Base.metadata.create_all(bind=engine)
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        create_search_index(connection)
+
+def missing_indexes(bind=None) -> list:
+    """Indexes of the models that the database does not have yet
+    
+    ``create_all`` only builds indexes together with new tables, so a database created by an older
+    release lacks the indexes added since. Only the schema is read, so this is cheap at startup.
+    """
+    from .models import Base
+    bind = bind if bind is not None else engine
+    with bind.connect() as connection:
+        rows = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existing = {name for (name,) in rows}
+    return [index for table in Base.metadata.sorted_tables for index in table.indexes if index.name not in existing]
+
+def upgrade_schema(bind=None) -> list:
+    """Build the indexes reported by ``missing_indexes``; returns their names"""
+    bind = bind if bind is not None else engine
+    indexes = missing_indexes(bind)
+    with bind.begin() as connection:
+        for index in indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    return [index.name for index in indexes]
 
 # Dependency to get database session
 def get_db():
@@ -0,0 +1,300 @@
+"""
+Synthetic data generator for load testing and benchmarks.
+
+This module can:
+- Populate a database with N projects x M models x K records per model
+- Attach custom ``additionalMetrics`` keys to every record
+- Write large CSV files shaped like the bundled datasets in ``dataset/``
+
+Output is fully determined by the seed, so benchmark runs are reproducible.
+
+Usage (from the backend directory):
+    python -m app.datagen db --projects 10 --models 4 --records 10000 --extra-metrics perplexity,bleu
+    python -m app.datagen csv --kind weather --rows 1000000 --output dataset/weather_large.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .storage import create_projects, create_metrics, create_metric_settings_batch, get_project_ids_with_prefix
+
+MODEL_FAMILIES = [
+    "ResNet-50", "EfficientNet-B0", "Vision Transformer", "BERT-base", "RoBERTa-base",
+    "DistilBERT", "LSTM", "GRU", "Transformer", "XGBoost", "MobileNet-V3", "T5-small",
+]
+
+STANDARD_SETTINGS = [
+    {'metric_id': 'accuracy', 'name': 'Accuracy', 'type': 'percentage', 'unit': '%', 'min_value': 0, 'max_value': 1,
+     'description': 'Model prediction accuracy'},
+    {'metric_id': 'loss', 'name': 'Loss', 'type': 'float', 'unit': '', 'min_value': 0, 'max_value': None,
+     'description': 'Training loss value'},
+    {'metric_id': 'precision', 'name': 'Precision', 'type': 'percentage', 'unit': '%', 'min_value': 0, 'max_value': 1,
+     'description': 'Model precision score'},
+    {'metric_id': 'recall', 'name': 'Recall', 'type': 'percentage', 'unit': '%', 'min_value': 0, 'max_value': 1,
+     'description': 'Model recall score'},
+    {'metric_id': 'f1Score', 'name': 'F1 Score', 'type': 'percentage', 'unit': '%', 'min_value': 0, 'max_value': 1,
+     'description': 'F1 score metric'},
+]
+
+CSV_KINDS = ("weather", "sales", "customer")
+
+DEFAULT_START = datetime(2024, 1, 1)
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _color(rng: random.Random) -> str:
+    return f"hsl({rng.randrange(360)}, {rng.randrange(60, 101)}%, {rng.randrange(35, 61)}%)"
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _model_names(count: int) -> List[str]:
+    names = []
+    for i in range(count):
+        family = MODEL_FAMILIES[i % len(MODEL_FAMILIES)]
+        generation = i // len(MODEL_FAMILIES)
+        names.append(family if generation == 0 else f"{family}-g{generation + 1}")
+    return names
+
+
+def _model_records(
+    rng: random.Random,
+    project_id: str,
+    model_name: str,
+    records: int,
+    extra_metrics: List[str],
+    start: datetime,
+    interval: timedelta,
+    versions: int,
+) -> Iterator[dict]:
+    """Yield one model's records following a noisy learning curve."""
+    floor = rng.uniform(0.45, 0.7)
+    ceiling = rng.uniform(max(floor + 0.05, 0.8), 0.99)
+    tau = max(records / rng.uniform(2.0, 6.0), 1.0)
+    noise = rng.uniform(0.005, 0.02)
+    records_per_version = max(records // max(versions, 1), 1)
+    extra_scale = {key: rng.uniform(1.0, 100.0) for key in extra_metrics}
+
+    for i in range(records):
+        progress = 1.0 - math.exp(-i / tau)
+        accuracy = min(max(floor + (ceiling - floor) * progress + rng.gauss(0, noise), 0.0), 1.0)
+        precision = min(max(accuracy + rng.gauss(0, noise), 0.0), 1.0)
+        recall = min(max(accuracy + rng.gauss(0, noise), 0.0), 1.0)
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        loss = max(-math.log(max(accuracy, 1e-6)) + rng.gauss(0, noise), 0.0)
+
+        additional = None
+        if extra_metrics:
+            additional = {
+                key: round(scale * (0.5 + 0.5 * progress) + rng.gauss(0, scale * noise), 6)
+                for key, scale in extra_scale.items()
+            }
+
+        yield {
+            'id': f"{project_id}-{_uuid(rng)}",
+            'project_id': project_id,
+            'timestamp': start + interval * i,
+            'model_name': model_name,
+            'model_version': f"v{min(i // records_per_version, versions - 1) + 1}.0",
+            'accuracy': round(accuracy, 6),
+            'loss': round(loss, 6),
+            'precision': round(precision, 6),
+            'recall': round(recall, 6),
+            'f1_score': round(f1, 6),
+            'additional_metrics': json.dumps(additional) if additional else None,
+        }
+
+
+def _next_project_number(db: Session, project_prefix: str) -> int:
+    """One more than the highest ``<prefix>-<n>`` project id in the database, so repeated runs add projects"""
+    numbers = [0]
+    for project_id in get_project_ids_with_prefix(db, f"{project_prefix}-"):
+        suffix = project_id[len(project_prefix) + 1:]
+        if suffix.isdigit():
+            numbers.append(int(suffix))
+    return max(numbers) + 1
+
+
+def generate_workload(
+    db: Session,
+    projects: int,
+    models: int,
+    records: int,
+    extra_metrics: Optional[List[str]] = None,
+    seed: int = 42,
+    start: datetime = DEFAULT_START,
+    interval: timedelta = timedelta(hours=1),
+    versions: int = 3,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    project_prefix: str = "gen",
+) -> Dict[str, int]:
+    """Bulk insert ``projects`` x ``models`` x ``records`` synthetic metric records.
+
+    Records are streamed in batches of ``batch_size`` so memory stays flat
+    regardless of the workload size. Project ids continue after the highest
+    existing ``<project_prefix>-<n>`` id, so generating twice into the same
+    database adds projects instead of failing on duplicate ids.
+    """
+    rng = random.Random(seed)
+    extra_metrics = extra_metrics or []
+    model_names = _model_names(models)
+
+    first_number = _next_project_number(db, project_prefix)
+    project_rows = []
+    settings_rows = []
+    for p in range(projects):
+        project_id = f"{project_prefix}-{first_number + p}"
+        created = start + timedelta(days=p)
+        project_rows.append({
+            'id': project_id,
+            'name': f"Synthetic Project {first_number + p}",
+            'description': f"Generated workload with {models} models and {records} records per model",
+            'color': _color(rng),
+            'created_at': created,
+            'updated_at': created + interval * max(records - 1, 0),
+        })
+        for setting in STANDARD_SETTINGS:
+            settings_rows.append(dict(setting, project_id=project_id, color=_color(rng), enabled=True))
+        for key in extra_metrics:
+            settings_rows.append({
+                'project_id': project_id, 'metric_id': key, 'name': key, 'type': 'float',
+                'color': _color(rng), 'unit': '', 'enabled': True, 'min_value': None, 'max_value': None,
+                'description': f"Generated metric {key}",
+            })
+
+    create_projects(db, project_rows)
+    create_metric_settings_batch(db, settings_rows)
+
+    inserted = 0
+    batch: List[dict] = []
+    for project in project_rows:
+        for model_name in model_names:
+            for record in _model_records(rng, project['id'], model_name, records, extra_metrics,
+                                         project['created_at'], interval, versions):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    inserted += create_metrics(db, batch)
+                    batch = []
+    inserted += create_metrics(db, batch)
+
+    return {'projects': len(project_rows), 'settings': len(settings_rows), 'records': inserted}
+
+
+def _weather_row(rng: random.Random, i: int, start: datetime) -> list:
+    locations = ["New York", "London", "Tokyo", "Sydney", "Berlin", "Toronto", "Mumbai", "Sao Paulo"]
+    return [
+        (start + timedelta(hours=6 * i)).isoformat(sep=' '),
+        round(rng.uniform(-10, 35), 1), rng.randint(20, 100), round(rng.uniform(980, 1040), 1),
+        round(rng.uniform(0, 40), 1), round(max(rng.gauss(1, 3), 0), 1), locations[i % len(locations)],
+    ]
+
+
+def _sales_row(rng: random.Random, i: int, start: datetime) -> list:
+    products = [("Laptop", "Electronics", 1200.0), ("Desk Chair", "Furniture", 450.0),
+                ("Monitor", "Electronics", 300.0), ("Bookshelf", "Furniture", 180.0),
+                ("Headphones", "Electronics", 150.0), ("Lamp", "Furniture", 60.0)]
+    product, category, price = products[rng.randrange(len(products))]
+    units = rng.randint(1, 20)
+    return [
+        (start + timedelta(days=i // 50)).date().isoformat(), product, category,
+        rng.choice(["North", "South", "East", "West"]), round(price * units * rng.uniform(0.85, 1.1), 2),
+        units, round(rng.uniform(0.05, 0.35), 2),
+    ]
+
+
+def _customer_row(rng: random.Random, i: int, start: datetime) -> list:
+    feedback = ["Great product quality", "Good but expensive", "Fast delivery", "Average experience",
+                "Would buy again", "Packaging could be better"]
+    tickets = rng.choice([0, 0, 0, 1, 1, 2, 3])
+    return [
+        f"CUST{i + 1:07d}", round(rng.uniform(1, 5), 1), rng.choice(feedback),
+        rng.choice(["Electronics", "Furniture", "Clothing", "Books"]),
+        (start + timedelta(days=i // 100)).date().isoformat(), tickets,
+        round(rng.uniform(0.5, 48), 1) if tickets else 0,
+    ]
+
+
+CSV_SCHEMAS = {
+    "weather": (["timestamp", "temperature", "humidity", "pressure", "wind_speed", "precipitation", "location"],
+                _weather_row),
+    "sales": (["date", "product", "category", "region", "sales_amount", "units_sold", "profit_margin"], _sales_row),
+    "customer": (["customer_id", "rating", "feedback", "product_category", "purchase_date", "support_tickets",
+                  "resolution_time"], _customer_row),
+}
+
+
+def generate_csv(path: str, kind: str, rows: int, seed: int = 42, start: datetime = DEFAULT_START) -> int:
+    """Write a CSV dataset shaped like one of the bundled datasets."""
+    if kind not in CSV_SCHEMAS:
+        raise ValueError(f"Unknown CSV kind '{kind}', expected one of {', '.join(CSV_KINDS)}")
+
+    rng = random.Random(seed)
+    header, make_row = CSV_SCHEMAS[kind]
+    with open(path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024) as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for i in range(rows):
+            writer.writerow(make_row(rng, i, start))
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.datagen", description="Generate synthetic Chronology data")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    db_parser = commands.add_parser("db", help="insert synthetic projects into a database")
+    db_parser.add_argument("--projects", type=int, default=10)
+    db_parser.add_argument("--models", type=int, default=3)
+    db_parser.add_argument("--records", type=int, default=1000, help="records per model")
+    db_parser.add_argument("--versions", type=int, default=3, help="versions per model")
+    db_parser.add_argument("--extra-metrics", default="", help="comma separated additionalMetrics keys")
+    db_parser.add_argument("--interval-minutes", type=float, default=60.0, help="spacing between records")
+    db_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    db_parser.add_argument("--prefix", default="gen", help="project id prefix")
+    db_parser.add_argument("--database-url", help="target database (default: the application database)")
+
+    csv_parser = commands.add_parser("csv", help="write a synthetic CSV dataset")
+    csv_parser.add_argument("--kind", choices=CSV_KINDS, default="weather")
+    csv_parser.add_argument("--rows", type=int, default=100000)
+    csv_parser.add_argument("--output", required=True, help="output path, e.g. dataset/weather_large.csv")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "csv":
+        generate_csv(args.output, args.kind, args.rows, args.seed)
+        print(f"Wrote {args.rows} {args.kind} rows to {args.output}")
+        return
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from .database import engine as app_engine, create_tables
+
+    engine = create_engine(args.database_url) if args.database_url else app_engine
+    create_tables(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        extra = [key.strip() for key in args.extra_metrics.split(",") if key.strip()]
+        stats = generate_workload(
+            db, args.projects, args.models, args.records, extra_metrics=extra, seed=args.seed,
+            interval=timedelta(minutes=args.interval_minutes), versions=args.versions,
+            batch_size=args.batch_size, project_prefix=args.prefix,
+        )
+        print(f"Inserted {stats['projects']} projects, {stats['settings']} metric settings "
+              f"and {stats['records']} records")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
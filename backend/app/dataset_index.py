@@ -0,0 +1,200 @@
+"""
+Row-offset sidecar index for CSV datasets.
+
+The index of ``dataset/<name>.csv`` lives in ``dataset/.index/<name>.csv.idx``
+and holds the byte offset at which every data row starts, so row ``i`` can be
+read with one seek instead of a scan from the top of the file. It records the
+(mtime_ns, size) signature of the file it was built from and is ignored once
+the file changes.
+
+Index layout::
+
+    MAGIC | i64 mtime_ns | i64 size | u64 rows | u64 offset per row
+
+Offsets are found on raw bytes: a record ends at a newline outside quotes,
+which for RFC 4180 CSV is a newline after an even number of quote characters
+(escaped quotes are doubled), so quoted fields spanning lines are handled.
+Empty lines are not rows, as for ``csv.reader`` consumers that skip the empty
+rows it yields for them; a line holding only spaces is a row.
+
+Uploaded datasets also get ``<name>.csv.meta.json`` next to the index, with
+the header, row count, checksum and column statistics computed while the
+upload streamed in, under the same signature check.
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+INDEX_DIR_NAME = ".index"
+MAGIC = b"CHRIDX1\n"
+_HEADER = struct.Struct("<qqQ")
+_OFFSET = struct.Struct("<Q")
+_DATA_START = len(MAGIC) + _HEADER.size
+
+
+def index_path(csv_file: Path) -> Path:
+    return csv_file.parent / INDEX_DIR_NAME / (csv_file.name + ".idx")
+
+
+class RowOffsetBuilder:
+    """Collects row start offsets from the raw lines of a CSV file, fed in order."""
+
+    def __init__(self, skip_header: bool = True):
+        self.offsets = array("Q")
+        self.position = 0
+        self._record_start: Optional[int] = None
+        self._quotes = 0
+        self._parts: List[bytes] = []
+        self._skip = 1 if skip_header else 0
+
+    def feed(self, line: bytes) -> Optional[bytes]:
+        """Account for one line; returns the record it completes, if any (including the header)."""
+        if self._record_start is None:
+            self._record_start = self.position
+            self._parts = []
+        self._parts.append(line)
+        self._quotes += line.count(b'"')
+        self.position += len(line)
+        if self._quotes % 2:
+            return None
+        record = line if len(self._parts) == 1 else b"".join(self._parts)
+        if self._skip:
+            self._skip -= 1
+        elif record.rstrip(b"\r\n"):
+            self.offsets.append(self._record_start)
+        else:
+            record = None
+        self._record_start = None
+        self._quotes = 0
+        return record
+
+
+def write_index(csv_file: Path, offsets: array, signature: Tuple[int, int]) -> Path:
+    """Write an index for ``csv_file`` as of ``signature``; replaced atomically."""
+    path = index_path(csv_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(_HEADER.pack(signature[0], signature[1], len(offsets)))
+        file.write(_little_endian(offsets).tobytes())
+    os.replace(temporary, path)
+    return path
+
+
+def build_index(csv_file: Path) -> Path:
+    """Index ``csv_file`` in one buffered pass over its bytes."""
+    file_stat = csv_file.stat()
+    builder = RowOffsetBuilder()
+    with open(csv_file, "rb", buffering=1024 * 1024) as file:
+        for line in file:
+            builder.feed(line)
+    return write_index(csv_file, builder.offsets, (file_stat.st_mtime_ns, file_stat.st_size))
+
+
+def remove_index(csv_file: Path) -> None:
+    for path in (index_path(csv_file), metadata_path(csv_file)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def metadata_path(csv_file: Path) -> Path:
+    return csv_file.parent / INDEX_DIR_NAME / (csv_file.name + ".meta.json")
+
+
+def write_metadata(csv_file: Path, metadata: dict, signature: Tuple[int, int]) -> None:
+    """Store precomputed metadata of ``csv_file`` (header, row count, checksum, column stats)."""
+    path = metadata_path(csv_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"signature": list(signature), **metadata}, file)
+    os.replace(temporary, path)
+
+
+def read_metadata(csv_file: Path, signature: Tuple[int, int]) -> Optional[dict]:
+    """Stored metadata of ``csv_file``, or None if there is none for its current contents."""
+    try:
+        with open(metadata_path(csv_file), encoding="utf-8") as file:
+            metadata = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if tuple(metadata.pop("signature", ())) != tuple(signature):
+        return None
+    return metadata
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values = array("Q", values)
+        values.byteswap()
+    return values
+
+
+class RowIndex:
+    """A memory-mapped index; only the offsets that are looked up are read."""
+
+    def __init__(self, csv_file: Path, file, mapped: mmap.mmap, rows: int):
+        self.csv_file = csv_file
+        self.rows = rows
+        self._file = file
+        self._mmap = mapped
+
+    def offset(self, row: int) -> int:
+        return _OFFSET.unpack_from(self._mmap, _DATA_START + row * _OFFSET.size)[0]
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "RowIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def read_rows(self, rows: Iterable[int]) -> Iterator[List[str]]:
+        """Parsed rows at the given (preferably ascending) row numbers."""
+        with open(self.csv_file, "rb") as file:
+            for row in rows:
+                file.seek(self.offset(row))
+                lines = [file.readline()]
+                while lines[-1] and sum(line.count(b'"') for line in lines) % 2:
+                    lines.append(file.readline())
+                record = b"".join(lines).decode("utf-8")
+                yield next(csv.reader([record]), [])
+
+
+def open_index(csv_file: Path) -> Optional[RowIndex]:
+    """The index of ``csv_file``, or None if there is none or it predates the file's last change."""
+    path = index_path(csv_file)
+    try:
+        file_stat = csv_file.stat()
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file
+        file.close()
+        return None
+    if mapped[:len(MAGIC)] != MAGIC or len(mapped) < _DATA_START:
+        mapped.close()
+        file.close()
+        return None
+    mtime_ns, size, rows = _HEADER.unpack_from(mapped, len(MAGIC))
+    stale = (mtime_ns, size) != (file_stat.st_mtime_ns, file_stat.st_size)
+    if stale or len(mapped) < _DATA_START + rows * _OFFSET.size:
+        mapped.close()
+        file.close()
+        return None
+    return RowIndex(csv_file, file, mapped, rows)
@@ -5,15 +5,187 @@ This module provides functionality to:
 - List available CSV datasets
 - Get dataset metadata (size, samples, columns)
 - Read dataset content
+- Stream whole datasets, or a filtered slice, as NDJSON or columnar batches
+- Draw reproducible random, stratified or systematic samples
+- Accept streamed uploads, indexing them while they are written
 """
 
 import os
 import csv
+import io
 import json
+import uuid
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 import hashlib
+import random
+
+from .cache import VersionedCache, versions, touch_datasets, DATASETS_SCOPE
+from .dataset_index import (
+    RowOffsetBuilder, build_index, open_index, index_path, write_index, write_metadata, read_metadata
+)
+from .config import DATASET_STREAM_BUFFER_BYTES, DATASET_STREAM_BATCH_ROWS
+from .singleflight import flights
+
+# Parsed metadata per file, valid while the file's (mtime, size) signature is unchanged.
+# The signature comes from the shared filesystem, so every worker sees the same changes.
+_dataset_info_cache = VersionedCache(max_entries=1024)
+
+# Stream format -> media type; columnar lines are JSON documents, but not one object per row
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "columnar": "application/vnd.chronology.columnar+jsonl",
+}
+SAMPLE_MODES = ("random", "stratified", "systematic")
+
+# Uploaded records are parsed for column statistics this many at a time
+UPLOAD_STATS_BATCH_ROWS = 10000
+# Distinct values are counted per column up to this many; beyond it only the cap is reported
+UPLOAD_DISTINCT_LIMIT = 1000
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number == number else None
+
+
+class _ColumnStats:
+    """Running statistics of one column, updated a batch of values at a time."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.non_empty = 0
+        self.numeric = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.distinct: Optional[set] = set()
+    
+    def update(self, values) -> None:
+        present = [value for value in values if value != '']
+        self.non_empty += len(present)
+        numbers = [number for number in map(_to_float, present) if number is not None]
+        if numbers:
+            self.numeric += len(numbers)
+            self.total += sum(numbers)
+            low, high = min(numbers), max(numbers)
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        if self.distinct is not None:
+            self.distinct.update(present)
+            if len(self.distinct) > UPLOAD_DISTINCT_LIMIT:
+                self.distinct = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "nonEmpty": self.non_empty,
+            "numeric": self.numeric,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.total / self.numeric if self.numeric else None,
+            # None once there are more than UPLOAD_DISTINCT_LIMIT distinct values
+            "distinct": len(self.distinct) if self.distinct is not None else None,
+        }
+
+
+class DatasetUpload:
+    """Writes an uploaded CSV to a temporary file, computing its metadata from the same bytes.
+    
+    Header, row count, row-offset index, SHA-256 and column statistics are all derived
+    while the chunks stream through, so the dataset needs no second pass once it is
+    renamed into place by ``finish``.
+    """
+    
+    def __init__(self, dataset_dir: Path, filename: str):
+        self.target = dataset_dir / filename
+        self.temporary = dataset_dir / f".upload-{uuid.uuid4().hex}.tmp"
+        self._file = open(self.temporary, 'wb')
+        self._sha256 = hashlib.sha256()
+        self._builder = RowOffsetBuilder()
+        self._pending = b""
+        self._batch: List[bytes] = []
+        self.header: Optional[List[str]] = None
+        self._stats: List[_ColumnStats] = []
+    
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._sha256.update(chunk)
+        data = self._pending + chunk
+        end = data.rfind(b"\n") + 1
+        self._pending = data[end:]
+        if end:
+            for line in io.BytesIO(data[:end]):
+                self._record(self._builder.feed(line))
+    
+    def _record(self, record: Optional[bytes]) -> None:
+        if record is None:
+            return
+        if self.header is None:
+            self.header = next(csv.reader([record.decode('utf-8')]), [])
+            self._stats = [_ColumnStats(name) for name in self.header]
+            return
+        self._batch.append(record)
+        if len(self._batch) >= UPLOAD_STATS_BATCH_ROWS:
+            self._update_stats()
+    
+    def _update_stats(self) -> None:
+        rows = csv.reader(io.StringIO(b"".join(self._batch).decode('utf-8'), newline=''))
+        self._batch = []
+        width = len(self._stats)
+        for stats, values in zip(self._stats, zip(*(row + [''] * (width - len(row)) for row in rows))):
+            stats.update(values)
+    
+    def finish(self) -> Dict[str, Any]:
+        """Move the upload into place and store its index and metadata; returns the metadata."""
+        if self._pending:
+            self._record(self._builder.feed(self._pending))
+            self._pending = b""
+        if self._batch:
+            self._update_stats()
+        if not self.header:
+            raise ValueError("Uploaded file has no CSV header")
+        
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temporary, self.target)
+        
+        file_stat = self.target.stat()
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        metadata = {
+            "columns": self.header,
+            "samples": len(self._builder.offsets),
+            "sha256": self._sha256.hexdigest(),
+            "columnStats": [stats.to_dict() for stats in self._stats],
+        }
+        write_index(self.target, self._builder.offsets, signature)
+        write_metadata(self.target, metadata, signature)
+        touch_datasets()
+        return metadata
+    
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            self.temporary.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _allocate(counts: Dict[str, int], n: int) -> Dict[str, int]:
+    """Split ``n`` across strata in proportion to their sizes (largest remainder method)."""
+    total = sum(counts.values())
+    n = min(n, total)
+    quotas = {key: n * count / total for key, count in counts.items()}
+    allocation = {key: int(quota) for key, quota in quotas.items()}
+    remaining = n - sum(allocation.values())
+    for key in sorted(quotas, key=lambda key: allocation[key] - quotas[key])[:remaining]:
+        allocation[key] += 1
+    return allocation
 
 class DatasetService:
     """Service for managing CSV datasets."""
@@ -24,6 +196,12 @@ class DatasetService:
     
     def list_datasets(self) -> List[Dict[str, Any]]:
         """List all available CSV datasets with metadata."""
+        # Concurrent listings of the same directory share one scan; the version keeps callers that
+        # arrive after an upload from joining a scan that started before it
+        key = ("datasets", str(self.dataset_dir.resolve()), versions.current(DATASETS_SCOPE))
+        return flights.do(key, self._scan_datasets)
+    
+    def _scan_datasets(self) -> List[Dict[str, Any]]:
         datasets = []
         
         if not self.dataset_dir.exists():
@@ -47,6 +225,11 @@ class DatasetService:
                 return dataset
         return None
     
+    def get_file_signature(self, dataset: Dict[str, Any]) -> Tuple[int, int]:
+        """(mtime_ns, size) of a dataset's file, which changes whenever the file does."""
+        file_stat = (self.dataset_dir / dataset["filename"]).stat()
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+    
     def get_dataset_content(self, dataset_id: str, limit: int = 100) -> Optional[Dict[str, Any]]:
         """Get dataset content with optional row limit."""
         dataset = self.get_dataset_by_id(dataset_id)
@@ -77,19 +260,215 @@ class DatasetService:
             print(f"Error reading dataset content: {e}")
             return None
     
+    def iter_rows(self, dataset: Dict[str, Any], columns: Optional[List[str]] = None,
+                  where: Optional[Dict[str, str]] = None, offset: int = 0,
+                  limit: Optional[int] = None) -> Iterator[List[str]]:
+        """Rows of a dataset as lists of ``columns`` values, read incrementally.
+        
+        ``where`` keeps rows whose columns equal the given values; ``offset`` and
+        ``limit`` apply to the rows that match.
+        """
+        header = dataset["columns"]
+        positions = [header.index(name) for name in (columns or header)]
+        conditions = [(header.index(name), value) for name, value in (where or {}).items()]
+        skipped = emitted = 0
+        with open(self.dataset_dir / dataset["filename"], 'r', encoding='utf-8', newline='',
+                  buffering=DATASET_STREAM_BUFFER_BYTES) as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for row in reader:
+                if limit is not None and emitted >= limit:
+                    break
+                if not row:
+                    # Empty lines are not rows, here and in the row-offset index
+                    continue
+                if len(row) < len(header):
+                    row += [''] * (len(header) - len(row))
+                if conditions and any(row[i] != value for i, value in conditions):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                emitted += 1
+                yield [row[i] for i in positions]
+    
+    def stream_dataset(self, dataset: Dict[str, Any], format: str = "ndjson",
+                       columns: Optional[List[str]] = None, where: Optional[Dict[str, str]] = None,
+                       offset: int = 0, limit: Optional[int] = None,
+                       batch_rows: int = DATASET_STREAM_BATCH_ROWS) -> Iterator[bytes]:
+        """Encoded chunks of a dataset, ``batch_rows`` rows at a time.
+        
+        ``ndjson`` emits one JSON object per row. ``columnar`` emits a header line
+        with the column names, then one line per batch holding an array per column.
+        """
+        columns = columns or dataset["columns"]
+        rows = self.iter_rows(dataset, columns, where, offset, limit)
+        if format == "columnar":
+            yield json.dumps({"columns": columns}).encode() + b"\n"
+        
+        batch: List[List[str]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield self._encode_batch(format, columns, batch)
+                batch = []
+        if batch:
+            yield self._encode_batch(format, columns, batch)
+    
+    @staticmethod
+    def _encode_batch(format: str, columns: List[str], batch: List[List[str]]) -> bytes:
+        if format == "columnar":
+            return json.dumps([list(values) for values in zip(*batch)], separators=(',', ':')).encode() + b"\n"
+        dumps = json.JSONEncoder(separators=(',', ':')).encode
+        return "".join(dumps(dict(zip(columns, row))) + "\n" for row in batch).encode()
+    
+    def is_valid_filename(self, filename: str) -> bool:
+        return Path(filename).name == filename and filename.endswith(".csv") and not filename.startswith(".")
+    
+    def dataset_file_exists(self, filename: str) -> bool:
+        return (self.dataset_dir / filename).exists()
+    
+    def start_upload(self, filename: str) -> DatasetUpload:
+        return DatasetUpload(self.dataset_dir, filename)
+    
+    def get_dataset_by_filename(self, filename: str) -> Dict[str, Any]:
+        return self._get_dataset_info(self.dataset_dir / filename)
+    
+    def has_index(self, dataset: Dict[str, Any]) -> bool:
+        return index_path(self.dataset_dir / dataset["filename"]).exists()
+    
+    def build_index(self, dataset: Dict[str, Any]) -> int:
+        """Write the row-offset index of a dataset; returns the number of indexed rows."""
+        csv_file = self.dataset_dir / dataset["filename"]
+        build_index(csv_file)
+        with open_index(csv_file) as index:
+            return index.rows
+    
+    def sample_dataset(self, dataset: Dict[str, Any], mode: str, n: int, seed: int,
+                       by: Optional[str] = None) -> Dict[str, Any]:
+        """Sample ``n`` rows of a dataset; the same seed gives the same sample of the same file.
+        
+        ``random`` is a uniform sample without replacement, ``systematic`` takes every
+        k-th row from a random start, and ``stratified`` samples each value of column
+        ``by`` in proportion to its share of the rows. With a current row-offset index,
+        random and systematic samples seek straight to the chosen rows; otherwise every
+        mode is one pass over the file (reservoir sampling for ``random``).
+        """
+        rng = random.Random(seed)
+        header = dataset["columns"]
+        strata = None
+        index = open_index(self.dataset_dir / dataset["filename"]) if mode != "stratified" else None
+        try:
+            if mode == "stratified":
+                population, picked, strata = self._stratified_sample(dataset, n, header.index(by), rng)
+            elif index is not None:
+                population = index.rows
+                if mode == "random":
+                    row_numbers = sorted(rng.sample(range(population), min(n, population)))
+                else:
+                    row_numbers = self._systematic_positions(population, n, rng)
+                picked = list(zip(row_numbers, index.read_rows(row_numbers)))
+            elif mode == "random":
+                population, picked = self._reservoir_sample(dataset, n, rng)
+            else:
+                population = dataset["samples"]
+                positions = set(self._systematic_positions(population, n, rng))
+                picked = [(i, row) for i, row in enumerate(self.iter_rows(dataset)) if i in positions]
+        finally:
+            if index is not None:
+                index.close()
+        
+        width = len(header)
+        result = {
+            "dataset": dataset,
+            "mode": mode,
+            "seed": seed,
+            "indexed": index is not None,
+            "population": population,
+            "sampled": len(picked),
+            "columns": header,
+            "rowNumbers": [i for i, _ in picked],
+            "rows": [dict(zip(header, row + [''] * (width - len(row)))) for _, row in picked],
+        }
+        if strata is not None:
+            result["by"] = by
+            result["strata"] = strata
+        return result
+    
+    @staticmethod
+    def _systematic_positions(population: int, n: int, rng: random.Random) -> List[int]:
+        n = min(n, population)
+        if n == 0:
+            return []
+        step = population / n
+        start = rng.random() * step
+        return [int(start + i * step) for i in range(n)]
+    
+    def _reservoir_sample(self, dataset: Dict[str, Any], n: int,
+                          rng: random.Random) -> Tuple[int, List[Tuple[int, List[str]]]]:
+        reservoir: List[Tuple[int, List[str]]] = []
+        seen = 0
+        for seen, row in enumerate(self.iter_rows(dataset), 1):
+            if len(reservoir) < n:
+                reservoir.append((seen - 1, row))
+            else:
+                slot = rng.randrange(seen)
+                if slot < n:
+                    reservoir[slot] = (seen - 1, row)
+        reservoir.sort(key=lambda item: item[0])
+        return seen, reservoir
+    
+    def _stratified_sample(self, dataset: Dict[str, Any], n: int, column: int, rng: random.Random):
+        # One reservoir of up to n rows per stratum; once sizes are known each is cut
+        # down to its proportional share, and a uniform subsample of a reservoir is uniform.
+        reservoirs: Dict[str, List[Tuple[int, List[str]]]] = {}
+        counts: Dict[str, int] = {}
+        population = 0
+        for i, row in enumerate(self.iter_rows(dataset)):
+            population += 1
+            key = row[column]
+            seen = counts[key] = counts.get(key, 0) + 1
+            reservoir = reservoirs.setdefault(key, [])
+            if len(reservoir) < n:
+                reservoir.append((i, row))
+            else:
+                slot = rng.randrange(seen)
+                if slot < n:
+                    reservoir[slot] = (i, row)
+        
+        allocation = _allocate(counts, n) if counts else {}
+        picked = []
+        for key, reservoir in reservoirs.items():
+            picked.extend(rng.sample(reservoir, allocation[key]))
+        picked.sort(key=lambda item: item[0])
+        strata = {key: {"population": counts[key], "sampled": allocation[key]} for key in counts}
+        return population, picked, strata
+    
     def _get_dataset_info(self, csv_file: Path) -> Dict[str, Any]:
-        """Extract metadata from a CSV file."""
+        """Extract metadata from a CSV file, reusing it until the file changes."""
         file_stat = csv_file.stat()
+        cache_key = str(csv_file.resolve())
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        cached = _dataset_info_cache.get(cache_key, signature)
+        if cached is not None:
+            return cached
         
-        # Read first few rows to get column information
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            header = next(reader, [])
-            
-            # Count total rows (including header)
-            row_count = 1  # Header row
-            for _ in reader:
-                row_count += 1
+        # Uploaded files come with metadata computed while they were written
+        metadata = read_metadata(csv_file, signature)
+        if metadata is not None:
+            header = metadata["columns"]
+            row_count = metadata["samples"] + 1
+        else:
+            # Read first few rows to get column information
+            with open(csv_file, 'r', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+                
+                # Count total rows (including header), skipping empty lines like the row-offset index
+                row_count = 1  # Header row
+                for row in reader:
+                    if row:
+                        row_count += 1
         
         # Generate unique ID based on filename and modification time
         id_string = f"{csv_file.name}_{file_stat.st_mtime}"
@@ -98,7 +477,7 @@ class DatasetService:
         # Create human-readable name from filename
         name = csv_file.stem.replace('_', ' ').title()
         
-        return {
+        info = {
             "id": dataset_id,
             "name": name,
             "filename": csv_file.name,
@@ -107,4 +486,9 @@ class DatasetService:
             "columns": header,
             "createdAt": datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
             "description": f"CSV dataset with {row_count - 1} samples and {len(header)} columns"
-        } 
\ No newline at end of file
+        }
+        if metadata is not None:
+            info["sha256"] = metadata["sha256"]
+            info["columnStats"] = metadata["columnStats"]
+        _dataset_info_cache.set(cache_key, signature, info)
+        return info
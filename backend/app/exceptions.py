@@ -21,6 +21,30 @@ def metric_not_found(metric_id: str) -> HTTPException:
     )
 
 
+def job_not_found(job_id: str) -> HTTPException:
+    """Create HTTP exception for background job not found."""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Job with id '{job_id}' not found; only the most recently finished jobs are kept"
+    )
+
+
+def retention_policy_not_found(project_id: str) -> HTTPException:
+    """Create HTTP exception for a project without a retention policy."""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Project with id '{project_id}' has no retention policy"
+    )
+
+
+def dataset_exists(filename: str) -> HTTPException:
+    """Create HTTP exception for an upload that would replace an existing dataset."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Dataset '{filename}' already exists; pass overwrite=true to replace it"
+    )
+
+
 def validation_error(message: str) -> HTTPException:
     """Create HTTP exception for validation error."""
     return HTTPException(
@@ -34,4 +58,20 @@ def bad_request_error(message: str) -> HTTPException:
     return HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail=message
-    ) 
\ No newline at end of file
+    )
+
+
+def conflict_error(message: str) -> HTTPException:
+    """Create HTTP exception for a request that conflicts with the current state of a resource."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=message
+    )
+
+
+def service_unavailable(message: str) -> HTTPException:
+    """Create HTTP exception for a request the server cannot take right now."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=message
+    )
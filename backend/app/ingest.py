@@ -0,0 +1,195 @@
+"""
+Write-behind ingestion queue with group commit.
+
+In ``queued`` ingest mode, validated metric records are handed to a single
+background writer instead of being committed by the request thread. The
+writer drains the queue into batches (up to a size limit, or whatever
+arrived within a short time window) and inserts each batch with one
+executemany and one commit, so a burst of single-record posts pays for one
+fsync instead of one per record.
+
+Each submitted record gets a ``Future`` that resolves once its batch is
+committed; callers decide whether to wait for it (ack on commit) or return
+immediately (ack on enqueue).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import INGEST_BATCH_SIZE, INGEST_MAX_DELAY_MS, INGEST_QUEUE_SIZE
+from .database import SessionLocal
+from .instrumentation import registry
+from .storage import create_metrics
+
+_STOP = object()
+
+
+class IngestQueueStopped(RuntimeError):
+    """Raised for rows submitted after the queue was stopped."""
+
+
+class IngestQueue:
+    """Bounded queue of metric rows drained by one group-committing writer thread."""
+
+    def __init__(self, session_factory: Callable[[], Session], batch_size: int = INGEST_BATCH_SIZE,
+                 max_delay_ms: float = INGEST_MAX_DELAY_MS, max_queue: int = INGEST_QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stopped = False
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._stopped:
+                raise IngestQueueStopped("The ingest queue is stopped")
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="chronology-ingest", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Commit everything already queued, then stop the writer; later submissions are refused."""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._stopping.set()
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                # A full queue means the writer is busy; it sees the stop event after its current batch
+                pass
+            thread.join(timeout)
+        if thread is None or not thread.is_alive():
+            # Rows queued while the writer was draining would never be committed
+            self._refuse_queued()
+
+    def submit(self, row: dict) -> Future:
+        """Queue a ``project_metrics`` row; blocks while the queue is full (backpressure).
+
+        Raises ``IngestQueueStopped`` once ``stop`` was called.
+        """
+        self.start()
+        future: Future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping and not self._stopping.is_set():
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # Gather a group: up to batch_size rows, or whatever arrives within the window
+            batch: List[Tuple[dict, Future]] = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+
+        # Drain whatever was queued behind the stop marker, or was still queued when stop was requested
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._commit(leftover[start:start + self.batch_size])
+
+    def _refuse_queued(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item[1].set_exception(IngestQueueStopped("The ingest queue stopped before the row was committed"))
+
+    def _commit(self, batch: List[Tuple[dict, Future]]) -> None:
+        db = self.session_factory()
+        try:
+            try:
+                create_metrics(db, [row for row, _ in batch])
+                self.batches += 1
+                self.committed += len(batch)
+                for row, future in batch:
+                    future.set_result(row)
+                return
+            except Exception as e:
+                db.rollback()
+                print(f"Warning: Group commit of {len(batch)} metric records failed, retrying one by one: {e}")
+
+            # Isolate the offending rows so one bad record does not fail its whole group
+            for row, future in batch:
+                try:
+                    create_metrics(db, [row])
+                    self.committed += 1
+                    future.set_result(row)
+                except Exception as e:
+                    db.rollback()
+                    self.failed += 1
+                    future.set_exception(e)
+        finally:
+            db.close()
+
+
+_ingest_queue: Optional[IngestQueue] = None
+_ingest_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue:
+    """The process-wide ingest queue, created on first use."""
+    global _ingest_queue
+    with _ingest_lock:
+        if _ingest_queue is None:
+            _ingest_queue = IngestQueue(SessionLocal)
+        return _ingest_queue
+
+
+def shutdown_ingest_queue(timeout: Optional[float] = None) -> None:
+    """Flush and stop the ingest queue if it was ever used."""
+    if _ingest_queue is not None:
+        _ingest_queue.stop(timeout)
+
+
+def _queue_stat(attr: str) -> Callable[[], float]:
+    """Sample an attribute of the ingest queue, 0 until the first queued post creates it."""
+    return lambda: getattr(_ingest_queue, attr) if _ingest_queue is not None else 0
+
+
+registry.register_gauge("chronology_ingest_queue_depth", "Metric records waiting for group commit.",
+                        _queue_stat("depth"))
+registry.register_gauge("chronology_ingest_committed_records", "Metric records committed by the writer.",
+                        _queue_stat("committed"))
+registry.register_gauge("chronology_ingest_batches", "Group commits performed by the writer.",
+                        _queue_stat("batches"))
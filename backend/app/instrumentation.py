@@ -0,0 +1,270 @@
+"""
+Low-overhead request and SQL instrumentation for the Chronology backend.
+
+This module provides:
+- An ASGI middleware that times every request by route template
+- SQLAlchemy engine hooks counting statements and SQL time per request
+- A sqlite3 connection factory counting the rows fetched per request
+- A Prometheus text renderer for the ``/metrics`` endpoint
+- Optional ``Server-Timing`` response headers
+
+Per-request state lives in a context variable, so it follows a request into
+FastAPI's threadpool without any locking. The shared registry is only locked
+once per request, when the totals are folded in.
+"""
+
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """Counters accumulated while a single request is being served."""
+    __slots__ = ("sql_count", "sql_time", "rows", "method", "_scope")
+
+    def __init__(self, scope: dict):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.rows = 0
+        self.method: str = scope.get("method", "")
+        self._scope = scope
+
+    @property
+    def route(self) -> str:
+        """Route template once routing has matched, e.g. ``/api/v1/projects/{project_id}``."""
+        route = self._scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("chronology_request_stats", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    """Stats of the request being served in this context, if any."""
+    return _current_request.get()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _RouteMetrics:
+    __slots__ = ("latency", "size", "statuses", "sql_count", "sql_time", "rows")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.size = _Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.rows = 0
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide aggregate of per-route request metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def observe(self, method: str, route: str, status: int, duration: float, size: int, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics()
+            metrics.latency.observe(duration)
+            metrics.size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.sql_count += stats.sql_count
+            metrics.sql_time += stats.sql_time
+            metrics.rows += stats.rows
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> None:
+        """Expose a value sampled at scrape time, e.g. a queue depth."""
+        self._gauges.append((name, help_text, callback))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = sorted(self._routes.items())
+            lines: List[str] = []
+
+            def histogram(name: str, help_text: str, attr: str) -> None:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), metrics in snapshot:
+                    hist: _Histogram = getattr(metrics, attr)
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} "
+                                     f"{cumulative}")
+                    lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(method=method, route=route)} {hist.total}")
+                    lines.append(f"{name}_count{_labels(method=method, route=route)} {hist.count}")
+
+            def counter(name: str, help_text: str, attr: str) -> None:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, route), metrics in snapshot:
+                    lines.append(f"{name}{_labels(method=method, route=route)} {getattr(metrics, attr)}")
+
+            histogram("chronology_http_request_duration_seconds", "Request latency by route template.", "latency")
+            histogram("chronology_http_response_size_bytes", "Response body size by route template.", "size")
+
+            lines.append("# HELP chronology_http_requests_total Requests by route template and status code.")
+            lines.append("# TYPE chronology_http_requests_total counter")
+            for (method, route), metrics in snapshot:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f"chronology_http_requests_total{_labels(method=method, route=route, status=status)} "
+                                 f"{count}")
+
+            counter("chronology_sql_statements_total", "SQL statements executed by route template.", "sql_count")
+            counter("chronology_sql_duration_seconds_total", "Time spent executing SQL by route template.", "sql_time")
+            counter("chronology_sql_rows_fetched_total", "Rows fetched from the database by route template.", "rows")
+
+        for name, help_text, callback in self._gauges:
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Warning: Failed to sample gauge {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# SQL instrumentation
+class _CountingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that adds every fetched row to the current request's stats."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            stats = _current_request.get()
+            if stats is not None:
+                stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.rows += len(rows)
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory handing out row-counting cursors.
+
+    Pass it as ``connect_args={"factory": InstrumentedConnection}``.
+    """
+
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+
+def install_sql_hooks(engine: "Engine") -> None:
+    """Attach statement count and timing hooks to an engine."""
+    # Imported here so the middleware can be installed before SQLAlchemy is loaded
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("chronology_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["chronology_query_start"].pop()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_time += elapsed
+
+
+# Request instrumentation
+class InstrumentationMiddleware:
+    """Pure ASGI middleware recording per-route latency, SQL work and response size."""
+
+    def __init__(self, app, metrics: MetricsRegistry = registry, server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    timing = (f'app;dur={elapsed_ms:.2f}, db;dur={stats.sql_time * 1000:.2f};'
+                              f'desc="{stats.sql_count} queries, {stats.rows} rows"')
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.observe(stats.method, stats.route, status, time.perf_counter() - started, size, stats)
+            _current_request.reset(token)
@@ -0,0 +1,329 @@
+"""
+Background jobs with progress reporting.
+
+Long-running maintenance work (purging large projects, imports, compaction)
+is submitted here so the request that started it can return immediately.
+Jobs run on a small thread pool of the process that submitted them and
+report progress through the ``Job`` object, which the ``/jobs`` routes expose.
+
+Every job is also recorded in the ``jobs`` table, at each status change and
+at most once per ``PROGRESS_SAVE_INTERVAL`` seconds of progress, so any
+worker can answer a status poll and finished jobs survive a restart. A job
+whose process is gone without finishing it is reported as failed. Jobs
+submitted for a ``resource`` are refused while another worker's unfinished
+job holds the same resource.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import JobDB, JobInfo
+
+MAX_WORKERS = 2
+MAX_FINISHED_JOBS = 100
+PROGRESS_SAVE_INTERVAL = 1.0
+
+INTERRUPTED_ERROR = "Interrupted: the worker running this job stopped before it finished"
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the process that runs a job still exists; processes on other hosts are assumed alive."""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    if int(pid) == os.getpid():
+        # This process would still hold the job in memory if it were running it
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Job:
+    """A unit of background work and its progress."""
+
+    def __init__(self, kind: str, description: str, total: Optional[int] = None, resource: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.description = description
+        self.resource = resource
+        self.status = "pending"
+        self.total = total
+        self.done = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.owner = _owner()
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._save: Optional[Callable[["Job"], None]] = None
+        self._saved_at = 0.0
+
+    def advance(self, amount: int = 1) -> None:
+        self.done += amount
+        if self._save is not None and time.monotonic() - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+            self._save(self)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_db(self) -> JobDB:
+        result = json.dumps(self.result, default=str) if self.result is not None else None
+        return JobDB(
+            id=self.id, kind=self.kind, description=self.description, status=self.status,
+            total=self.total, done=self.done, result=result, error=self.error, owner=self.owner,
+            resource=self.resource, created_at=self.created_at, started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+    @classmethod
+    def from_db(cls, row: JobDB) -> "Job":
+        job = cls(row.kind, row.description, row.total, row.resource)
+        job.id = row.id
+        job.status = row.status
+        job.done = row.done
+        job.result = json.loads(row.result) if row.result else None
+        job.error = row.error
+        job.owner = row.owner
+        job.created_at = row.created_at
+        job.started_at = row.started_at
+        job.finished_at = row.finished_at
+        return job
+
+    def to_model(self) -> JobInfo:
+        progress = None
+        if self.total:
+            progress = min(self.done / self.total, 1.0)
+        elif self.status == "completed":
+            progress = 1.0
+        return JobInfo(
+            id=self.id,
+            kind=self.kind,
+            description=self.description,
+            status=self.status,
+            total=self.total,
+            done=self.done,
+            progress=progress,
+            result=self.result,
+            error=self.error,
+            createdAt=self.created_at.isoformat(),
+            startedAt=self.started_at.isoformat() if self.started_at else None,
+            finishedAt=self.finished_at.isoformat() if self.finished_at else None,
+        )
+
+
+class JobConflict(RuntimeError):
+    """Raised when a job is submitted for a resource that an unfinished job still holds."""
+
+    def __init__(self, job: Job):
+        super().__init__(f"Job {job.id} ({job.kind}) is still running on {job.resource}")
+        self.job = job
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and records them in the ``jobs`` table."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_finished: int = MAX_FINISHED_JOBS,
+                 session_factory: Optional[Callable[[], Session]] = SessionLocal):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chronology-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_finished = max_finished
+        self._schedules: List[threading.Event] = []
+        self._session_factory = session_factory
+
+    def submit(self, kind: str, description: str, fn: Callable[[Job], Optional[Dict[str, Any]]],
+               total: Optional[int] = None, resource: Optional[str] = None) -> Job:
+        """Schedule ``fn(job)``; its return value becomes the job result.
+
+        With a ``resource`` the job is refused with ``JobConflict`` while an unfinished job of any
+        worker holds the same resource.
+        """
+        job = Job(kind, description, total, resource)
+        job._save = self._save
+        if resource is not None:
+            holder = self._claim(job)
+            if holder is not None:
+                raise JobConflict(holder)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._save(job, prune=True)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _claim(self, job: Job) -> Optional[Job]:
+        """Record ``job`` as holding its resource, or return the unfinished job that already does"""
+        with self._lock:
+            holder = next((other for other in self._jobs.values()
+                           if other.resource == job.resource and not other.finished), None)
+            if holder is None:
+                self._jobs[job.id] = job
+        if holder is not None or self._session_factory is None:
+            return holder
+
+        db = self._session_factory()
+        try:
+            rows = db.scalars(select(JobDB).where(JobDB.resource == job.resource, JobDB.finished_at.is_(None))).all()
+            with self._lock:
+                rows = [row for row in rows if row.id not in self._jobs]
+            # Jobs of processes that are gone are marked failed here, so they cannot hold a resource forever
+            holder = next((other for other in self._load(rows) if not other.finished), None)
+            if holder is None:
+                # Insert only if no unfinished job holds the resource, atomically against other workers
+                record = job.to_db()
+                columns = JobDB.__table__.columns
+                values = select(*(literal(getattr(record, column.key), column.type) for column in columns)).where(
+                    ~select(JobDB.id).where(JobDB.resource == job.resource, JobDB.finished_at.is_(None)).exists()
+                )
+                claimed = db.execute(insert(JobDB).from_select([column.key for column in columns], values)).rowcount
+                db.commit()
+                if not claimed:
+                    rows = db.scalars(select(JobDB).where(JobDB.resource == job.resource,
+                                                          JobDB.finished_at.is_(None))).all()
+                    holder = Job.from_db(rows[0]) if rows else None
+        finally:
+            db.close()
+        if holder is not None:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+        return holder
+
+    def _run(self, job: Job, fn: Callable[[Job], Optional[Dict[str, Any]]]) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        self._save(job)
+        try:
+            job.result = fn(job)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Error in background job {job.kind} {job.id}: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._save(job)
+
+    def _save(self, job: Job, prune: bool = False) -> None:
+        """Record a job's current state; a failure to record never fails the job itself."""
+        job._saved_at = time.monotonic()
+        if self._session_factory is None:
+            return
+        db = self._session_factory()
+        try:
+            db.merge(job.to_db())
+            if prune:
+                kept = (select(JobDB.id).where(JobDB.finished_at.isnot(None))
+                        .order_by(JobDB.created_at.desc()).limit(self._max_finished))
+                db.execute(delete(JobDB).where(JobDB.finished_at.isnot(None), JobDB.id.not_in(kept)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: Could not record background job {job.id}: {e}")
+        finally:
+            db.close()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self._max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def _load(self, rows: List[JobDB]) -> List[Job]:
+        """Jobs recorded by any process; unfinished ones whose process is gone are marked failed."""
+        loaded = []
+        for row in rows:
+            job = Job.from_db(row)
+            if not job.finished and not _owner_alive(job.owner):
+                job.status = "failed"
+                job.error = INTERRUPTED_ERROR
+                job.finished_at = datetime.utcnow()
+                self._save(job)
+            loaded.append(job)
+        return loaded
+
+    def every(self, interval: float, kind: str, description: str,
+              fn: Callable[[Job], Optional[Dict[str, Any]]]) -> None:
+        """Submit a job every ``interval`` seconds, skipping a run while the previous one is unfinished."""
+
+        stopped = threading.Event()
+
+        def loop():
+            current: Optional[Job] = None
+            while not stopped.wait(interval):
+                if current is None or current.finished:
+                    current = self.submit(kind, description, fn)
+
+        with self._lock:
+            self._schedules.append(stopped)
+        threading.Thread(target=loop, name=f"chronology-schedule-{kind}", daemon=True).start()
+
+    def stop_schedules(self) -> None:
+        """Stop all periodic submissions; running jobs are not affected."""
+        with self._lock:
+            schedules, self._schedules = self._schedules, []
+        for stopped in schedules:
+            stopped.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job of this process, or one recorded by another worker or an earlier run"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self._session_factory is None:
+            return job
+        db = self._session_factory()
+        try:
+            row = db.get(JobDB, job_id)
+            rows = [row] if row is not None else []
+        finally:
+            db.close()
+        loaded = self._load(rows)
+        return loaded[0] if loaded else None
+
+    def list(self) -> List[Job]:
+        """Recent jobs of every worker, oldest first, with this process's own jobs at their live state"""
+        with self._lock:
+            local = dict(self._jobs)
+        if self._session_factory is None:
+            return list(local.values())
+        db = self._session_factory()
+        try:
+            rows = db.scalars(select(JobDB).order_by(JobDB.created_at.desc()).limit(self._max_finished)).all()
+        finally:
+            db.close()
+        listed = {row.id: local.get(row.id) for row in rows}
+        recorded = self._load([row for row in rows if listed[row.id] is None])
+        for job in recorded:
+            listed[job.id] = job
+        for job_id, job in local.items():
+            listed.setdefault(job_id, job)
+        return sorted(listed.values(), key=lambda job: job.created_at)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.stop_schedules()
+        self._executor.shutdown(wait=wait)
+
+
+jobs = JobManager()
@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import router as project_router
-from .database import create_tables
-from .seed_data import seed_database
-from .config import APP_NAME, APP_VERSION, CORS_ORIGINS
+from .config import (
+    APP_NAME, APP_VERSION, CORS_ORIGINS, METRICS_ENABLED, SERVER_TIMING_ENABLED, SEED_ON_STARTUP,
+    RETENTION_COMPACT_INTERVAL_SECONDS
+)
+from .instrumentation import InstrumentationMiddleware, registry
+from .response_cache import response_cache
+from . import IMPORT_STARTED
+
+# The API routes, and with them SQLAlchemy, the models and the services, are imported on startup
+# instead of here, so importing the application stays cheap
 
 app = FastAPI(
     title=APP_NAME, 
@@ -20,15 +28,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL and response size metrics
+if METRICS_ENABLED:
+    app.add_middleware(InstrumentationMiddleware, server_timing=SERVER_TIMING_ENABLED)
+
+# Wall-clock milliseconds of each startup phase, reported by /health
+startup_timings = {"importMs": round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)}
+_routes_included = False
+
+def include_routes():
+    """Import and mount the API routes, once"""
+    global _routes_included
+    if _routes_included:
+        return
+    started = time.perf_counter()
+    from .routes import router as project_router
+    app.include_router(project_router)
+    _routes_included = True
+    startup_timings["routesMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+class RouteLoaderMiddleware:
+    """Mounts the API routes before the first request when no startup event ran, e.g. with lifespan off"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            include_routes()
+        await self.app(scope, receive, send)
+
+# Outermost, so every other middleware sees the mounted routes
+app.add_middleware(RouteLoaderMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database tables and seed with sample data on startup"""
+    """Load the API routes, create missing tables, and seed with sample data when enabled"""
+    started = time.perf_counter()
+    include_routes()
+    
+    from .database import create_tables, missing_indexes, SessionLocal
+    from .storage import has_projects, has_search_documents
+    tables_started = time.perf_counter()
     create_tables()
-    # Seed with sample data if database is empty
+    startup_timings["createTablesMs"] = round((time.perf_counter() - tables_started) * 1000, 1)
+    
+    # Upgrading a database from an older release reads all of its records, so it is an explicit job
+    # rather than work every worker repeats on boot; only the schema is checked here
+    pending = [index.name for index in missing_indexes()]
+    db = SessionLocal()
     try:
-        seed_database()
-    except Exception as e:
-        print(f"Warning: Could not seed database: {e}")
+        unindexed = has_projects(db) and not has_search_documents(db)
+    finally:
+        db.close()
+    if pending or unindexed:
+        print(f"Warning: The database lacks {len(pending)} indexes{' and the search index' if unindexed else ''}; "
+              "run POST /admin/schema-upgrade once to build them")
+    
+    # Seeding is opt-in; the sample data module is only imported when needed
+    if SEED_ON_STARTUP:
+        seed_started = time.perf_counter()
+        try:
+            from .seed_data import seed_database
+            seed_database(ensure_tables=False)
+        except Exception as e:
+            print(f"Warning: Could not seed database: {e}")
+        startup_timings["seedMs"] = round((time.perf_counter() - seed_started) * 1000, 1)
+    
+    if RETENTION_COMPACT_INTERVAL_SECONDS > 0:
+        from .jobs import jobs
+        from .services import RetentionService
+        jobs.every(RETENTION_COMPACT_INTERVAL_SECONDS, "retention_compaction", "Apply retention policies",
+                   RetentionService.compact)
+    
+    startup_timings["startupMs"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Startup timings (ms): {startup_timings}")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Commit metric records still waiting in the ingest queue and stop periodic jobs"""
+    from .ingest import shutdown_ingest_queue
+    from .jobs import jobs
+    shutdown_ingest_queue()
+    jobs.stop_schedules()
 
 @app.get("/")
 def root():
@@ -36,15 +118,79 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "startup": startup_timings}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of per-route request metrics"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/admin/slow-queries")
+def slow_queries_endpoint(limit: int = 50):
+    """Inspect the most recent slow statements with their query plans"""
+    from . import slow_queries
+    log = slow_queries.slow_query_log
+    if log is None:
+        return {"enabled": False, "entries": []}
+    return {
+        "enabled": True,
+        "thresholdMs": log.threshold_ms,
+        "capacity": log.capacity,
+        "totalRecorded": log.total_recorded,
+        "entries": log.entries(limit),
+    }
+
+@app.delete("/admin/slow-queries")
+def clear_slow_queries_endpoint():
+    """Empty the slow-query ring buffer"""
+    from . import slow_queries
+    if slow_queries.slow_query_log is not None:
+        slow_queries.slow_query_log.clear()
+    return {"message": "Slow-query log cleared"}
+
+@app.get("/admin/response-cache")
+def response_cache_endpoint():
+    """Hit/miss statistics of the response cache"""
+    return response_cache.stats()
+
+@app.delete("/admin/response-cache")
+def clear_response_cache_endpoint():
+    """Drop all cached responses"""
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
+
+@app.post("/admin/metric-indexes", status_code=202)
+def metric_indexes_endpoint():
+    """Build the ranking indexes of the standard and configured metrics and drop all others, on a background job"""
+    from .services import MetricRecordService
+    job = MetricRecordService.start_metric_index_sync()
+    return {"message": "Metric index build started", "jobId": job.id, "statusUrl": f"/api/v1/jobs/{job.id}"}
+
+@app.post("/admin/schema-upgrade", status_code=202)
+def schema_upgrade_endpoint():
+    """Build the indexes and search index a database from an older release lacks, on a background job"""
+    from .services import SchemaService
+    job = SchemaService.start_upgrade()
+    return {"message": "Schema upgrade started", "jobId": job.id, "statusUrl": f"/api/v1/jobs/{job.id}"}
+
+@app.post("/admin/search-index/rebuild")
+def rebuild_search_index_endpoint():
+    """Recreate the full-text search documents from the project, record and settings tables"""
+    from .database import SessionLocal
+    from .services import SearchService
+    db = SessionLocal()
+    try:
+        documents = SearchService.rebuild_index(db)
+    finally:
+        db.close()
+    return {"message": "Search index rebuilt", "documents": documents}
 
 @app.post("/seed")
 def seed_endpoint():
     """Manually trigger database seeding"""
+    from .seed_data import seed_database
     try:
         seed_database()
         return {"message": "Database seeded successfully"}
     except Exception as e:
         return {"error": str(e)}
-
-app.include_router(project_router)
@@ -10,7 +10,7 @@ This module contains:
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Float, Text, Boolean, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Float, Text, Boolean, Integer, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -27,15 +27,19 @@ class ProjectDB(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     color = Column(String)
     
-    # Relationship to metrics
-    metrics = relationship("ProjectMetricDB", back_populates="project", cascade="all, delete-orphan")
-    metrics_config = relationship("MetricSettingsDB", back_populates="project", cascade="all, delete-orphan")
+    # Relationship to metrics; child rows are removed by ON DELETE CASCADE, not loaded and deleted one by one
+    metrics = relationship("ProjectMetricDB", back_populates="project", cascade="all, delete-orphan",
+                           passive_deletes=True)
+    metrics_config = relationship("MetricSettingsDB", back_populates="project", cascade="all, delete-orphan",
+                                  passive_deletes=True, order_by="MetricSettingsDB.id")
+    rollups = relationship("MetricRollupDB", cascade="all, delete-orphan", passive_deletes=True,
+                           order_by="MetricRollupDB.bucket_start")
 
 class ProjectMetricDB(Base):
     __tablename__ = "project_metrics"
     
     id = Column(String, primary_key=True)
-    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     timestamp = Column(DateTime, nullable=False)
     model_name = Column(String, nullable=False)
     model_version = Column(String)
@@ -50,12 +54,17 @@ class ProjectMetricDB(Base):
     
     # Relationship
     project = relationship("ProjectDB", back_populates="metrics")
+    
+    __table_args__ = (
+        # Serves per-project filters by model, version and time range
+        Index("ix_project_metrics_project_model", "project_id", "model_name", "model_version", "timestamp"),
+    )
 
 class MetricSettingsDB(Base):
     __tablename__ = "metric_settings"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     metric_id = Column(String, nullable=False)  # e.g., 'accuracy', 'loss'
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)  # 'int', 'float', 'percentage', 'string'
@@ -68,6 +77,126 @@ class MetricSettingsDB(Base):
     
     # Relationship
     project = relationship("ProjectDB", back_populates="metrics_config")
+    
+    __table_args__ = (
+        Index("ix_metric_settings_project_metric", "project_id", "metric_id"),
+    )
+
+class RetentionPolicyDB(Base):
+    __tablename__ = "retention_policies"
+    
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    raw_retention_days = Column(Integer, nullable=False)  # raw records older than this are rolled up
+    rollup_interval = Column(String, nullable=False)  # 'hour' or 'day'
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MetricRollupDB(Base):
+    """Downsampled metric values: one row per project, model, version, bucket and metric"""
+    __tablename__ = "metric_rollups"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    model_name = Column(String, nullable=False)
+    model_version = Column(String, nullable=False, default="")  # '' for no version, so the unique key matches
+    bucket_start = Column(DateTime, nullable=False)
+    bucket_seconds = Column(Integer, nullable=False)
+    metric_key = Column(String, nullable=False)  # API metric id, e.g. 'f1Score' or an additionalMetrics key
+    count = Column(Integer, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("project_id", "model_name", "model_version", "bucket_start", "metric_key",
+                         name="uq_metric_rollups_bucket"),
+    )
+
+class MetricStreamStatsDB(Base):
+    """Streaming statistics per project, model and metric, updated as records are ingested"""
+    __tablename__ = "metric_stream_stats"
+    
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    model_name = Column(String, primary_key=True)
+    metric_key = Column(String, primary_key=True)  # API metric id, e.g. 'f1Score' or an additionalMetrics key
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)  # Welford running mean and sum of squared deviations
+    m2 = Column(Float, nullable=False)
+    ewma_mean = Column(Float, nullable=False)  # exponentially weighted recent level and variance
+    ewma_var = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MetricAnomalyDB(Base):
+    """A metric value that deviated from its model's rolling baseline when it was ingested"""
+    __tablename__ = "metric_anomalies"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    record_id = Column(String, nullable=False, index=True)  # the project_metrics row that was flagged
+    model_name = Column(String, nullable=False)
+    model_version = Column(String)
+    metric_key = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    value = Column(Float, nullable=False)
+    expected = Column(Float, nullable=False)
+    std = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+    regression = Column(Boolean, nullable=False)
+    detected_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_metric_anomalies_project_time", "project_id", "timestamp"),
+    )
+
+class ArchiveSegmentDB(Base):
+    """Catalog of archive segment files holding a project's cold records"""
+    __tablename__ = "archive_segments"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False)  # file name under the project's archive directory
+    record_count = Column(Integer, nullable=False)
+    compressed_bytes = Column(Integer, nullable=False)
+    min_timestamp = Column(DateTime)
+    max_timestamp = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SearchDocumentDB(Base):
+    """A searchable project, model, model version or metric setting; indexed by the ``search_index`` FTS5 table"""
+    __tablename__ = "search_documents"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # rowid of the document in search_index
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # 'project', 'model', 'version' or 'metric'
+    model_name = Column(String, nullable=False, default="")  # '' when not applicable, so the unique key matches
+    model_version = Column(String, nullable=False, default="")
+    metric_id = Column(String, nullable=False, default="")
+    title = Column(String, nullable=False)  # full-text indexed
+    body = Column(Text, nullable=False, default="")  # full-text indexed
+    
+    __table_args__ = (
+        UniqueConstraint("project_id", "kind", "model_name", "model_version", "metric_id",
+                         name="uq_search_documents_key"),
+    )
+
+class JobDB(Base):
+    """A background job, stored so that every worker can report it and it outlives the process running it"""
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # 'pending', 'running', 'completed', 'failed'
+    total = Column(Integer)
+    done = Column(Integer, nullable=False, default=0)
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    owner = Column(String, nullable=False)  # '<host>:<pid>' of the process running the job
+    resource = Column(String, index=True)  # e.g. 'project-archive:<id>'; held by one unfinished job at a time
+    created_at = Column(DateTime, nullable=False, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
 
 # Pydantic Models for API
 class MetricSettings(BaseModel):
@@ -93,6 +222,8 @@ class ProjectMetric(BaseModel):
     recall: Optional[float] = None
     f1Score: Optional[float] = None
     additionalMetrics: Optional[Dict[str, Any]] = None
+    rollup: Optional["MetricRollupStats"] = None  # set on records standing in for compacted raw records
+    anomalies: Optional[List["MetricAnomaly"]] = None  # set on create responses when values were flagged
 
 class Project(BaseModel):
     id: str
@@ -149,3 +280,170 @@ class UpdateMetricRequest(BaseModel):
     recall: Optional[float] = None
     f1Score: Optional[float] = None
     additionalMetrics: Optional[Dict[str, Any]] = None
+
+class MetricRecordFilter(BaseModel):
+    """Selects metric records of a project; all given criteria must match."""
+    modelName: Optional[str] = None
+    modelVersion: Optional[str] = None
+    start: Optional[str] = None  # ISO timestamp, inclusive
+    end: Optional[str] = None  # ISO timestamp, inclusive
+    ids: Optional[List[str]] = None
+
+class BulkDeleteMetricsRequest(BaseModel):
+    filter: MetricRecordFilter
+
+class BulkUpdateMetricsRequest(BaseModel):
+    filter: MetricRecordFilter
+    changes: UpdateMetricRequest
+
+class BulkOperationResponse(BaseModel):
+    affected: int
+
+class DatasetImportRequest(BaseModel):
+    """Maps the columns of a dataset onto the metric records of a project."""
+    datasetId: str
+    timestampColumn: str
+    timestampFormat: Optional[str] = None  # strptime format; ISO 8601 or epoch seconds when omitted
+    modelNameColumn: Optional[str] = None
+    modelName: Optional[str] = None  # used for every row when modelNameColumn is not set
+    modelVersionColumn: Optional[str] = None
+    metricColumns: Dict[str, str] = Field(default_factory=dict)  # accuracy/loss/precision/recall/f1Score -> column
+    additionalColumns: List[str] = Field(default_factory=list)  # stored in additionalMetrics under the column name
+
+class JobInfo(BaseModel):
+    id: str
+    kind: str
+    description: str
+    status: str  # 'pending', 'running', 'completed', 'failed'
+    total: Optional[int] = None
+    done: int = 0
+    progress: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    createdAt: str
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+
+class MetricSummary(BaseModel):
+    latest: Optional[float] = None
+    best: Optional[float] = None
+
+class ModelVersionSummary(BaseModel):
+    version: Optional[str] = None
+    recordCount: int
+    firstTimestamp: str
+    lastTimestamp: str
+    metrics: Dict[str, MetricSummary] = Field(default_factory=dict)
+
+class ModelCatalogEntry(BaseModel):
+    modelName: str
+    recordCount: int
+    firstTimestamp: str
+    lastTimestamp: str
+    versions: List[ModelVersionSummary] = Field(default_factory=list)
+    metrics: Dict[str, MetricSummary] = Field(default_factory=dict)
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    value: float
+    record: ProjectMetric
+
+class Leaderboard(BaseModel):
+    metric: str
+    direction: str  # 'asc' or 'desc'
+    partition: Optional[str] = None  # 'model', 'project' or None
+    entries: List[LeaderboardEntry] = Field(default_factory=list)
+
+class MetricComparison(BaseModel):
+    """Columnar comparison payload: one shared time axis and one value array per series."""
+    metric: str
+    method: str
+    timestamps: List[str] = Field(default_factory=list)
+    series: Dict[str, List[Optional[float]]] = Field(default_factory=dict)
+
+class MetricStats(BaseModel):
+    """Distribution, extremes and trend of one metric of one model."""
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    percentiles: Dict[str, float] = Field(default_factory=dict)  # "p50" -> value
+    best: float
+    bestTimestamp: str
+    worst: float
+    worstTimestamp: str
+    movingAverage: float  # mean of the last `window` values
+    movingAverageTimestamps: List[str] = Field(default_factory=list)
+    movingAverageValues: List[float] = Field(default_factory=list)
+    slopePerDay: Optional[float] = None  # least-squares trend
+
+class ModelStats(BaseModel):
+    modelName: str
+    recordCount: int
+    firstTimestamp: str
+    lastTimestamp: str
+    metrics: Dict[str, MetricStats] = Field(default_factory=dict)
+
+class ProjectStats(BaseModel):
+    projectId: str
+    window: int
+    percentiles: List[float] = Field(default_factory=list)
+    models: List[ModelStats] = Field(default_factory=list)
+
+class MetricAnomaly(BaseModel):
+    """A value more than the configured number of standard deviations from its rolling baseline."""
+    id: int
+    projectId: str
+    recordId: str
+    modelName: str
+    modelVersion: Optional[str] = None
+    metric: str
+    timestamp: str
+    value: float
+    expected: float  # rolling (EWMA) mean before this value
+    std: float  # rolling (EWMA) standard deviation before this value
+    zScore: float
+    regression: bool  # deviation in the metric's worse direction
+    detectedAt: str
+
+class SearchHit(BaseModel):
+    """A ranked search result; ``score`` is the negated BM25 rank, so higher is better."""
+    kind: str
+    projectId: str
+    projectName: str
+    modelName: Optional[str] = None
+    modelVersion: Optional[str] = None
+    metricId: Optional[str] = None
+    title: str
+    detail: Optional[str] = None
+    score: float
+
+class MetricRollupStats(BaseModel):
+    """Aggregates behind a compacted record; its metric values are the bucket means."""
+    bucketSeconds: int
+    count: int
+    min: Dict[str, float] = Field(default_factory=dict)
+    max: Dict[str, float] = Field(default_factory=dict)
+    last: Dict[str, float] = Field(default_factory=dict)
+
+class RetentionPolicy(BaseModel):
+    rawRetentionDays: int = Field(..., ge=1)
+    rollupInterval: str = "hour"
+
+class ArchiveSegmentInfo(BaseModel):
+    name: str
+    recordCount: int
+    compressedBytes: int
+    minTimestamp: Optional[str] = None
+    maxTimestamp: Optional[str] = None
+    createdAt: str
+
+class ArchiveInfo(BaseModel):
+    projectId: str
+    archived: bool
+    recordCount: int = 0
+    compressedBytes: int = 0
+    segments: List[ArchiveSegmentInfo] = Field(default_factory=list)
+
+ProjectMetric.model_rebuild()
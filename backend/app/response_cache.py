@@ -0,0 +1,106 @@
+"""
+Cache of encoded JSON responses for hot read endpoints.
+
+Entries hold the final response bytes, keyed by route and parameters and
+tagged with the data version they were rendered at (see ``cache.py``). A hit
+returns the bytes as-is, skipping the database, Pydantic validation and JSON
+encoding. Entries also expire after a TTL and the cache is bounded by total
+size, evicting the least recently used responses first.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from .config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS
+from .instrumentation import registry
+
+
+class ResponseCache:
+    """Thread-safe, size-bounded LRU of ``key -> (version, expires_at, body)``."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, version: Any, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous[2])
+            self._entries[key] = (version, time.monotonic() + self.ttl_seconds, body)
+            self.size_bytes += len(body)
+            while self.size_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "sizeBytes": self.size_bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": self.hits / lookups if lookups else None,
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+
+registry.register_gauge("chronology_response_cache_hits", "Response cache hits since start.",
+                        lambda: response_cache.hits)
+registry.register_gauge("chronology_response_cache_misses", "Response cache misses since start.",
+                        lambda: response_cache.misses)
+registry.register_gauge("chronology_response_cache_bytes", "Bytes held by the response cache.",
+                        lambda: response_cache.size_bytes)
+
+
+def cached_response(key: Hashable, version: Any, compute: Callable[[], Any]) -> Response:
+    """Serve ``key`` from the cache, or render ``compute()`` as JSON and cache the bytes.
+
+    Read ``version`` before anything ``compute`` depends on, so a concurrent
+    write makes the stored entry unreachable instead of stale. ``compute`` may
+    raise (e.g. a 404), in which case nothing is cached.
+    """
+    if RESPONSE_CACHE_ENABLED:
+        body = response_cache.get(key, version)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+    response = JSONResponse(content=jsonable_encoder(compute()))
+    if RESPONSE_CACHE_ENABLED:
+        response_cache.set(key, version, bytes(response.body))
+    return response
@@ -8,39 +8,105 @@ This module contains all the FastAPI route handlers for:
 - Utility endpoints
 """
 
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+import random
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from .models import (
     Project, ProjectMetric, MetricSettings,
     CreateProjectRequest, UpdateProjectRequest,
-    CreateMetricRecordRequest, CreateMetricRequest, UpdateMetricRequest
+    CreateMetricRecordRequest, CreateMetricRequest, UpdateMetricRequest,
+    MetricRecordFilter, BulkDeleteMetricsRequest, BulkUpdateMetricsRequest, BulkOperationResponse, JobInfo,
+    ModelCatalogEntry, Leaderboard, MetricComparison, RetentionPolicy, ArchiveInfo, DatasetImportRequest,
+    ProjectStats, MetricAnomaly, SearchHit
+)
+from .services import (
+    ProjectService, MetricRecordService, RetentionService, ArchiveService, DatasetImportService, SearchService
 )
-from .services import ProjectService, MetricRecordService
 from .storage import (
     update_project_metric_settings, create_metric_settings, delete_metric_setting,
-    pydantic_setting_to_db
+    pydantic_setting_to_db, project_exists, count_project_metrics, is_supported_metric, ROLLUP_INTERVALS,
+    PROJECT_FIELDS, PROJECT_INCLUDES, METRIC_FIELDS, is_metric_field
 )
+from .config import PROJECT_PURGE_ASYNC_THRESHOLD
+from .cache import versions, project_scope
+from .response_cache import cached_response
+from .jobs import jobs, JobConflict
+from .timeseries import RESAMPLE_METHODS
+from .search import SEARCH_KINDS
 from .database import get_db
-from .exceptions import project_not_found, metric_not_found, bad_request_error
-from .dataset_service import DatasetService
+from .exceptions import (
+    project_not_found, metric_not_found, bad_request_error, job_not_found, retention_policy_not_found,
+    dataset_exists, service_unavailable, conflict_error
+)
+from .ingest import IngestQueueStopped
+from .dataset_service import DatasetService, STREAM_FORMATS, SAMPLE_MODES
 
 router = APIRouter(prefix="/api/v1")
 
+# Sparse fieldsets
+def _parse_list(value: Optional[str], allowed, name: str) -> Optional[List[str]]:
+    """Parse a comma separated parameter, rejecting names ``allowed`` does not accept"""
+    if value is None:
+        return None
+    names = list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    unknown = [part for part in names if not (allowed(part) if callable(allowed) else part in allowed)]
+    if unknown:
+        raise bad_request_error(f"Unknown {name}: {', '.join(unknown)}")
+    return names
+
+def _project_fieldsets(fields: Optional[str], include: Optional[str], record_fields: Optional[str]):
+    """(fields, include, recordFields) with defaults, or None when no sparse fieldset was requested"""
+    if fields is None and include is None and record_fields is None:
+        return None
+    return (
+        _parse_list(fields, PROJECT_FIELDS, "fields") or list(PROJECT_FIELDS),
+        _parse_list(include, PROJECT_INCLUDES, "include") if include is not None else list(PROJECT_INCLUDES),
+        _parse_list(record_fields, is_metric_field, "recordFields") or list(METRIC_FIELDS),
+    )
+
 # Project routes
 @router.get("/projects", response_model=List[Project])
-def list_projects(db: Session = Depends(get_db)):
+def list_projects(
+    fields: Optional[str] = Query(None, description="Comma separated project fields, e.g. id,name"),
+    include: Optional[str] = Query(None, description="Embedded collections: records, metricsConfig, or empty"),
+    recordFields: Optional[str] = Query(None, description="Record fields or additionalMetrics keys"),
+    db: Session = Depends(get_db),
+):
     """Get all projects"""
-    return ProjectService.get_all_projects(db)
+    fieldsets = _project_fieldsets(fields, include, recordFields)
+    if fieldsets is None:
+        return ProjectService.get_all_projects(db)
+    return JSONResponse(content=ProjectService.get_project_fields(db, *fieldsets))
 
 @router.get("/projects/{project_id}", response_model=Project)
-def get_project_route(project_id: str, db: Session = Depends(get_db)):
+def get_project_route(
+    project_id: str,
+    fields: Optional[str] = Query(None, description="Comma separated project fields, e.g. id,name"),
+    include: Optional[str] = Query(None, description="Embedded collections: records, metricsConfig, or empty"),
+    recordFields: Optional[str] = Query(None, description="Record fields or additionalMetrics keys"),
+    db: Session = Depends(get_db),
+):
     """Get a specific project by ID"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise project_not_found(project_id)
-    return project
+    fieldsets = _project_fieldsets(fields, include, recordFields)
+    
+    def compute():
+        if fieldsets is not None:
+            projects = ProjectService.get_project_fields(db, *fieldsets, project_id=project_id)
+            if not projects:
+                raise project_not_found(project_id)
+            return projects[0]
+        project = ProjectService.get_project_by_id(db, project_id)
+        if not project:
+            raise project_not_found(project_id)
+        return project
+    
+    key = ("project", project_id) + (tuple(map(tuple, fieldsets)) if fieldsets else ())
+    return cached_response(key, versions.current(project_scope(project_id)), compute)
 
 @router.post("/projects", response_model=Project)
 def create_project_route(project_data: CreateProjectRequest, db: Session = Depends(get_db)):
@@ -57,7 +123,19 @@ def update_project_route(project_id: str, project_data: UpdateProjectRequest, db
 
 @router.delete("/projects/{project_id}")
 def delete_project_route(project_id: str, db: Session = Depends(get_db)):
-    """Delete a project"""
+    """Delete a project; very large projects are purged by a background job"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    
+    record_count = count_project_metrics(db, project_id)
+    if record_count > PROJECT_PURGE_ASYNC_THRESHOLD:
+        job = ProjectService.start_project_purge(project_id, record_count)
+        return JSONResponse(status_code=202, content={
+            "message": "Project deletion started",
+            "jobId": job.id,
+            "statusUrl": f"{router.prefix}/jobs/{job.id}",
+        })
+    
     success = ProjectService.delete_project(db, project_id)
     if not success:
         raise project_not_found(project_id)
@@ -65,21 +143,32 @@ def delete_project_route(project_id: str, db: Session = Depends(get_db)):
 
 # Metric record routes
 @router.get("/projects/{project_id}/metrics", response_model=List[ProjectMetric])
-def get_project_metrics_route(project_id: str, db: Session = Depends(get_db)):
+def get_project_metrics_route(
+    project_id: str,
+    fields: Optional[str] = Query(
+        None, description="Record fields or additionalMetrics keys, e.g. timestamp,modelName,loss"
+    ),
+    db: Session = Depends(get_db),
+):
     """Get all metric records for a project"""
-    # Verify project exists
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise project_not_found(project_id)
+    field_names = _parse_list(fields, is_metric_field, "fields")
+    
+    def compute():
+        # Verify project exists
+        if not project_exists(db, project_id):
+            raise project_not_found(project_id)
+        if field_names:
+            return MetricRecordService.get_project_metric_fields(db, project_id, field_names)
+        return MetricRecordService.get_project_metric_records(db, project_id)
     
-    return MetricRecordService.get_project_metric_records(db, project_id)
+    key = ("project-metrics", project_id) + (tuple(field_names) if field_names else ())
+    return cached_response(key, versions.current(project_scope(project_id)), compute)
 
 @router.post("/projects/{project_id}/metrics", response_model=ProjectMetric)
 def create_metric_route(project_id: str, metric_data: CreateMetricRecordRequest, db: Session = Depends(get_db)):
     """Add a new metric record to a project"""
     # Verify project exists
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
+    if not project_exists(db, project_id):
         raise project_not_found(project_id)
     
     # Validate additional metrics if provided
@@ -91,10 +180,14 @@ def create_metric_route(project_id: str, metric_data: CreateMetricRecordRequest,
         except (TypeError, ValueError) as e:
             raise bad_request_error(f"Invalid additional metrics format: {str(e)}")
     
-    return MetricRecordService.create_metric_record(db, project_id, metric_data)
+    try:
+        return MetricRecordService.create_metric_record(db, project_id, metric_data)
+    except IngestQueueStopped:
+        raise service_unavailable("The server is shutting down and no longer accepts metric records; retry")
 
 @router.put("/projects/{project_id}/metrics/{metric_id}", response_model=ProjectMetric)
-def update_metric_route(project_id: str, metric_id: str, metric_data: UpdateMetricRequest, db: Session = Depends(get_db)):
+def update_metric_route(project_id: str, metric_id: str, metric_data: UpdateMetricRequest,
+                        db: Session = Depends(get_db)):
     """Update a metric record"""
     # Verify project exists
     project = ProjectService.get_project_by_id(db, project_id)
@@ -105,6 +198,7 @@ def update_metric_route(project_id: str, metric_id: str, metric_data: UpdateMetr
     from .storage import get_metric_by_id
     db_metric = get_metric_by_id(db, metric_id)
     if not db_metric or db_metric.project_id != project_id:
+        _raise_if_archived(db, project_id, metric_id)
         raise metric_not_found(metric_id)
     
     # Validate additional metrics if provided
@@ -134,6 +228,7 @@ def delete_metric_route(project_id: str, metric_id: str, db: Session = Depends(g
     from .storage import get_metric_by_id
     db_metric = get_metric_by_id(db, metric_id)
     if not db_metric or db_metric.project_id != project_id:
+        _raise_if_archived(db, project_id, metric_id)
         raise metric_not_found(metric_id)
     
     success = MetricRecordService.delete_metric_record(db, metric_id)
@@ -142,19 +237,82 @@ def delete_metric_route(project_id: str, metric_id: str, db: Session = Depends(g
     
     return {"message": "Metric record deleted successfully"}
 
+def _raise_if_archived(db: Session, project_id: str, metric_id: str):
+    """Archived records are read-only; say so instead of reporting them as missing"""
+    if ArchiveService.is_archived_record(db, project_id, metric_id):
+        raise conflict_error(f"Metric record '{metric_id}' is archived; restore project {project_id} to change it")
+
+def _raise_if_filter_archived(db: Session, project_id: str, record_filter: MetricRecordFilter):
+    archived = ArchiveService.count_filter_matches(db, project_id, record_filter)
+    if archived:
+        raise conflict_error(f"The filter matches {archived} archived records, which are read-only; "
+                             f"restore project {project_id} first")
+
+def _validate_record_filter(record_filter: MetricRecordFilter):
+    """Reject empty filters and malformed timestamps before touching the database"""
+    if not any(value is not None for value in record_filter.model_dump().values()):
+        raise bad_request_error("Filter must specify at least one of modelName, modelVersion, start, end or ids")
+    for value in (record_filter.start, record_filter.end):
+        if value is not None:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise bad_request_error(f"Invalid timestamp in filter: {value}")
+
+@router.post("/projects/{project_id}/metrics/bulk-delete", response_model=BulkOperationResponse)
+def bulk_delete_metrics_route(project_id: str, request: BulkDeleteMetricsRequest, db: Session = Depends(get_db)):
+    """Delete all metric records matching a filter in a single statement"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    _validate_record_filter(request.filter)
+    _raise_if_filter_archived(db, project_id, request.filter)
+    
+    affected = MetricRecordService.bulk_delete_metric_records(db, project_id, request.filter)
+    return BulkOperationResponse(affected=affected)
+
+@router.post("/projects/{project_id}/metrics/bulk-update", response_model=BulkOperationResponse)
+def bulk_update_metrics_route(project_id: str, request: BulkUpdateMetricsRequest, db: Session = Depends(get_db)):
+    """Patch all metric records matching a filter in a single statement"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    _validate_record_filter(request.filter)
+    
+    if not request.changes.model_dump(exclude_none=True):
+        raise bad_request_error("Changes must set at least one field")
+    if request.changes.timestamp is not None:
+        try:
+            datetime.fromisoformat(request.changes.timestamp)
+        except ValueError:
+            raise bad_request_error(f"Invalid timestamp: {request.changes.timestamp}")
+    if request.changes.additionalMetrics is not None:
+        try:
+            import json
+            # Validate that additional metrics can be serialized to JSON
+            json.dumps(request.changes.additionalMetrics)
+        except (TypeError, ValueError) as e:
+            raise bad_request_error(f"Invalid additional metrics format: {str(e)}")
+    _raise_if_filter_archived(db, project_id, request.filter)
+    # Rollups hold aggregates of many records, which a patch of single values cannot be applied to
+    summarized = MetricRecordService.count_rollup_matches(db, project_id, request.filter)
+    if summarized:
+        raise conflict_error(f"The filter matches {summarized} rollup records, which cannot be updated; "
+                             "narrow it to raw records or delete the rollups")
+    
+    affected = MetricRecordService.bulk_update_metric_records(db, project_id, request.filter, request.changes)
+    return BulkOperationResponse(affected=affected)
+
 # Metric settings routes
 @router.put("/projects/{project_id}/metrics-config")
 def update_project_metrics_config(project_id: str, metrics_config: List[MetricSettings], db: Session = Depends(get_db)):
     """Update metric configuration for a project"""
     # Verify project exists
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
+    if not project_exists(db, project_id):
         raise project_not_found(project_id)
     
     # Convert settings to database format
     settings_data = [pydantic_setting_to_db(setting, project_id) for setting in metrics_config]
     
-    # Update settings
+    # Apply only the differences against the stored settings
     update_project_metric_settings(db, project_id, settings_data)
     
     return {"message": "Metric configuration updated successfully"}
@@ -206,13 +364,269 @@ def delete_metric_definition(project_id: str, metric_id: str, db: Session = Depe
 def get_available_models(project_id: str, db: Session = Depends(get_db)):
     """Get available models for a project"""
     # Verify project exists
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
+    if not project_exists(db, project_id):
         raise project_not_found(project_id)
     
     model_names = MetricRecordService.get_models(db, project_id)
     return {"models": model_names}
 
+@router.get("/projects/{project_id}/models/catalog", response_model=List[ModelCatalogEntry])
+def get_model_catalog_route(project_id: str, db: Session = Depends(get_db)):
+    """Get versions, record counts, time range and latest/best metric values per model"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    
+    return MetricRecordService.get_model_catalog(db, project_id)
+
+@router.get("/projects/{project_id}/stats", response_model=ProjectStats)
+def get_project_stats_route(
+    project_id: str,
+    metrics: Optional[str] = Query(None, description="Comma separated metric ids; defaults to the enabled metrics"),
+    percentiles: str = Query("5,25,50,75,95", description="Comma separated percentiles between 0 and 100"),
+    window: int = Query(10, ge=1, le=100000, description="Records per moving average"),
+    points: int = Query(50, ge=1, le=10000, description="Moving average values returned per metric"),
+    db: Session = Depends(get_db),
+):
+    """Get percentiles, mean/std, best/worst, moving average and trend of each metric per model"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    metric_ids = _parse_list(metrics, is_supported_metric, "metrics")
+    try:
+        quantiles = [float(part) for part in percentiles.split(",") if part.strip()]
+    except ValueError:
+        raise bad_request_error("percentiles must be numbers between 0 and 100")
+    if any(not 0 <= q <= 100 for q in quantiles):
+        raise bad_request_error("percentiles must be numbers between 0 and 100")
+    
+    return MetricRecordService.get_project_stats(db, project_id, metric_ids, quantiles, window, points)
+
+@router.get("/projects/{project_id}/anomalies", response_model=List[MetricAnomaly])
+def get_anomalies_route(
+    project_id: str,
+    modelName: Optional[str] = None,
+    metric: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    regressionsOnly: bool = False,
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    """Get metric values flagged as anomalous when they were ingested, newest first"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    try:
+        start_dt = datetime.fromisoformat(start) if start else None
+        end_dt = datetime.fromisoformat(end) if end else None
+    except ValueError as e:
+        raise bad_request_error(f"Invalid timestamp: {e}")
+    
+    return MetricRecordService.get_anomalies(db, project_id, modelName, metric, start_dt, end_dt,
+                                             regressionsOnly, limit)
+
+# Search routes
+@router.get("/search", response_model=List[SearchHit])
+def search_route(
+    q: str = Query(..., max_length=500, description="Terms, each matched as a word prefix"),
+    kinds: Optional[str] = Query(None, description="Comma separated: project, model, version, metric"),
+    projectId: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Search project names and descriptions, model names, model versions and metric names, best match first"""
+    kind_list = _parse_list(kinds, SEARCH_KINDS, "kinds")
+    return SearchService.search(db, q, kind_list, projectId, limit)
+
+# Comparison routes
+@router.get("/projects/{project_id}/compare", response_model=MetricComparison)
+def compare_models_route(
+    project_id: str,
+    metric: str,
+    models: List[str] = Query(..., description="Model names, optionally pinned to a version as name@version"),
+    points: Optional[int] = Query(None, ge=2, le=10000),
+    method: str = "linear",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Align a metric of several models on a shared time grid as columnar arrays"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    if not is_supported_metric(metric):
+        raise bad_request_error(f"Unsupported metric: {metric}")
+    if method not in RESAMPLE_METHODS:
+        raise bad_request_error(f"method must be one of {', '.join(RESAMPLE_METHODS)}")
+    try:
+        start_time = datetime.fromisoformat(start) if start else None
+        end_time = datetime.fromisoformat(end) if end else None
+    except ValueError as e:
+        raise bad_request_error(f"Invalid timestamp: {e}")
+    
+    return MetricRecordService.compare_models(db, project_id, metric, models, points, method, start_time, end_time)
+
+# Leaderboard routes
+def _leaderboard(db: Session, metric: str, k: int, project_id: Optional[str], partition: Optional[str],
+                 per_group: int, direction: Optional[str], start: Optional[str], end: Optional[str]) -> Leaderboard:
+    if not is_supported_metric(metric):
+        raise bad_request_error(f"Unsupported metric: {metric}")
+    if partition not in (None, "model", "project"):
+        raise bad_request_error("partition must be 'model' or 'project'")
+    if direction not in (None, "asc", "desc"):
+        raise bad_request_error("direction must be 'asc' or 'desc'")
+    try:
+        start_time = datetime.fromisoformat(start) if start else None
+        end_time = datetime.fromisoformat(end) if end else None
+    except ValueError as e:
+        raise bad_request_error(f"Invalid timestamp: {e}")
+    
+    return MetricRecordService.get_leaderboard(
+        db, metric, k=k, project_id=project_id, partition=partition, per_group=per_group,
+        direction=direction, start=start_time, end=end_time,
+    )
+
+@router.get("/leaderboard", response_model=Leaderboard)
+def leaderboard_route(
+    metric: str,
+    k: int = Query(10, ge=1, le=1000),
+    projectId: Optional[str] = None,
+    partition: Optional[str] = None,
+    perGroup: int = Query(1, ge=1, le=1000),
+    direction: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Top-k records by a metric across all projects (or one), optionally the best per model or project"""
+    return _leaderboard(db, metric, k, projectId, partition, perGroup, direction, start, end)
+
+@router.get("/projects/{project_id}/leaderboard", response_model=Leaderboard)
+def project_leaderboard_route(
+    project_id: str,
+    metric: str,
+    k: int = Query(10, ge=1, le=1000),
+    partition: Optional[str] = None,
+    perGroup: int = Query(1, ge=1, le=1000),
+    direction: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Top-k records of one project by a metric, optionally the best per model"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    return _leaderboard(db, metric, k, project_id, partition, perGroup, direction, start, end)
+
+# Retention routes
+def _job_started(message: str, job) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "message": message,
+        "jobId": job.id,
+        "statusUrl": f"{router.prefix}/jobs/{job.id}",
+    })
+
+@router.get("/projects/{project_id}/retention", response_model=RetentionPolicy)
+def get_retention_policy_route(project_id: str, db: Session = Depends(get_db)):
+    """Get the retention policy of a project"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    policy = RetentionService.get_policy(db, project_id)
+    if not policy:
+        raise retention_policy_not_found(project_id)
+    return policy
+
+@router.put("/projects/{project_id}/retention", response_model=RetentionPolicy)
+def set_retention_policy_route(project_id: str, policy: RetentionPolicy, db: Session = Depends(get_db)):
+    """Keep raw records for a number of days, then keep per-bucket min/max/mean/last"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    if policy.rollupInterval not in ROLLUP_INTERVALS:
+        raise bad_request_error(f"rollupInterval must be one of {', '.join(ROLLUP_INTERVALS)}")
+    return RetentionService.set_policy(db, project_id, policy)
+
+@router.delete("/projects/{project_id}/retention")
+def delete_retention_policy_route(project_id: str, db: Session = Depends(get_db)):
+    """Remove the retention policy of a project; existing rollups are kept"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    if not RetentionService.delete_policy(db, project_id):
+        raise retention_policy_not_found(project_id)
+    return {"message": "Retention policy deleted successfully"}
+
+@router.post("/projects/{project_id}/retention/compact")
+def compact_project_route(project_id: str, db: Session = Depends(get_db)):
+    """Apply the project's retention policy now on a background job"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    return _job_started("Retention compaction started", RetentionService.start_compaction([project_id]))
+
+@router.post("/retention/compact")
+def compact_all_route():
+    """Apply every project's retention policy now on a background job"""
+    return _job_started("Retention compaction started", RetentionService.start_compaction())
+
+# Archive routes
+@router.get("/projects/{project_id}/archive", response_model=ArchiveInfo)
+def get_archive_route(project_id: str, db: Session = Depends(get_db)):
+    """Describe the archive segments holding a project's cold records"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    return ArchiveService.get_archive_info(db, project_id)
+
+@router.post("/projects/{project_id}/archive")
+def archive_project_route(project_id: str, db: Session = Depends(get_db)):
+    """Move a project's records to compressed archive segments on a background job"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    record_count = count_project_metrics(db, project_id)
+    if record_count == 0:
+        raise bad_request_error(f"Project {project_id} has no records to archive")
+    try:
+        job = ArchiveService.start_archive(project_id, record_count)
+    except JobConflict as e:
+        raise conflict_error(f"Project {project_id} already has a running archive or restore job {e.job.id}")
+    return _job_started("Project archiving started", job)
+
+@router.post("/projects/{project_id}/restore")
+def restore_project_route(project_id: str, db: Session = Depends(get_db)):
+    """Move a project's archived records back into the database on a background job"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    info = ArchiveService.get_archive_info(db, project_id)
+    if not info.archived:
+        raise bad_request_error(f"Project {project_id} is not archived")
+    try:
+        job = ArchiveService.start_restore(project_id, info.recordCount)
+    except JobConflict as e:
+        raise conflict_error(f"Project {project_id} already has a running archive or restore job {e.job.id}")
+    return _job_started("Project restore started", job)
+
+# Dataset import routes
+@router.post("/projects/{project_id}/import")
+def import_dataset_route(project_id: str, request: DatasetImportRequest, db: Session = Depends(get_db)):
+    """Insert the rows of a dataset as metric records of a project on a background job"""
+    if not project_exists(db, project_id):
+        raise project_not_found(project_id)
+    dataset = DatasetService().get_dataset_by_id(request.datasetId)
+    if not dataset:
+        raise project_not_found(request.datasetId)  # Reuse existing exception
+    problem = DatasetImportService.validate(request, dataset)
+    if problem:
+        raise bad_request_error(problem)
+    return _job_started("Dataset import started", DatasetImportService.start_import(project_id, request, dataset))
+
+# Background job routes
+@router.get("/jobs", response_model=List[JobInfo])
+def list_jobs_route():
+    """List recent background jobs"""
+    return [job.to_model() for job in jobs.list()]
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+def get_job_route(job_id: str):
+    """Get the status and progress of a background job"""
+    job = jobs.get(job_id)
+    if not job:
+        raise job_not_found(job_id)
+    return job.to_model()
+
 # Dataset routes
 @router.get("/datasets")
 def list_datasets():
@@ -220,6 +634,33 @@ def list_datasets():
     dataset_service = DatasetService()
     return dataset_service.list_datasets()
 
+@router.post("/datasets", status_code=201)
+async def upload_dataset_route(
+    request: Request,
+    filename: str = Query(..., description="Name to store the dataset under, e.g. results.csv"),
+    overwrite: bool = Query(False, description="Replace an existing dataset with the same name"),
+):
+    """Upload a CSV dataset as the raw request body, indexed while it streams in"""
+    dataset_service = DatasetService()
+    if not dataset_service.is_valid_filename(filename):
+        raise bad_request_error(f"Invalid dataset filename '{filename}', expected a plain name ending in .csv")
+    if dataset_service.dataset_file_exists(filename) and not overwrite:
+        raise dataset_exists(filename)
+    
+    upload = dataset_service.start_upload(filename)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(upload.write, chunk)
+        await run_in_threadpool(upload.finish)
+    except (ValueError, UnicodeDecodeError) as e:
+        upload.abort()
+        raise bad_request_error(f"Invalid CSV upload: {e}")
+    except BaseException:
+        upload.abort()
+        raise
+    return dataset_service.get_dataset_by_filename(filename)
+
 @router.get("/datasets/{dataset_id}")
 def get_dataset(dataset_id: str):
     """Get a specific dataset by ID"""
@@ -233,7 +674,83 @@ def get_dataset(dataset_id: str):
 def get_dataset_content(dataset_id: str, limit: int = 100):
     """Get dataset content with optional row limit"""
     dataset_service = DatasetService()
-    content = dataset_service.get_dataset_content(dataset_id, limit)
-    if not content:
+    dataset = dataset_service.get_dataset_by_id(dataset_id)
+    if not dataset:
+        raise project_not_found(dataset_id)  # Reuse existing exception
+    
+    def compute():
+        content = dataset_service.get_dataset_content(dataset_id, limit)
+        if not content:
+            raise project_not_found(dataset_id)  # Reuse existing exception
+        return content
+    
+    # The file's (mtime, size) signature is the version, so edits to the file invalidate the entry
+    version = dataset_service.get_file_signature(dataset)
+    return cached_response(("dataset-content", dataset_id, limit), version, compute)
+
+@router.get("/datasets/{dataset_id}/stream")
+def stream_dataset_route(
+    dataset_id: str,
+    format: str = Query("ndjson", description="ndjson (one object per row) or columnar (header, then column arrays)"),
+    columns: Optional[str] = Query(None, description="Comma separated columns to emit"),
+    where: Optional[List[str]] = Query(None, description="column:value equality filters, repeatable"),
+    offset: int = Query(0, ge=0, description="Matching rows to skip"),
+    limit: Optional[int] = Query(None, ge=0, description="Maximum rows to emit"),
+):
+    """Stream a whole dataset, or a filtered slice, as JSON lines of rows or of column arrays"""
+    dataset_service = DatasetService()
+    dataset = dataset_service.get_dataset_by_id(dataset_id)
+    if not dataset:
+        raise project_not_found(dataset_id)  # Reuse existing exception
+    if format not in STREAM_FORMATS:
+        raise bad_request_error(f"Unsupported format '{format}', expected one of: {', '.join(STREAM_FORMATS)}")
+    
+    selected = _parse_list(columns, dataset["columns"], "columns")
+    conditions = {}
+    for condition in where or []:
+        name, separator, value = condition.partition(":")
+        if not separator or name not in dataset["columns"]:
+            raise bad_request_error(f"Invalid filter '{condition}', expected column:value")
+        conditions[name] = value
+    
+    chunks = dataset_service.stream_dataset(dataset, format, selected, conditions, offset, limit)
+    return StreamingResponse(chunks, media_type=STREAM_FORMATS[format])
+
+@router.get("/datasets/{dataset_id}/sample")
+def sample_dataset_route(
+    dataset_id: str,
+    mode: str = Query("random", description="random (reservoir), stratified or systematic"),
+    n: int = Query(100, ge=1, le=100000, description="Number of rows to sample"),
+    seed: Optional[int] = Query(None, description="Random seed; returned in the response when omitted"),
+    by: Optional[str] = Query(None, description="Categorical column to stratify by"),
+):
+    """Draw a reproducible sample of a dataset's rows"""
+    dataset_service = DatasetService()
+    dataset = dataset_service.get_dataset_by_id(dataset_id)
+    if not dataset:
+        raise project_not_found(dataset_id)  # Reuse existing exception
+    if mode not in SAMPLE_MODES:
+        raise bad_request_error(f"Unsupported mode '{mode}', expected one of: {', '.join(SAMPLE_MODES)}")
+    if mode == "stratified" and by not in dataset["columns"]:
+        raise bad_request_error("Stratified sampling needs 'by' set to one of the dataset's columns")
+    
+    def compute():
+        return dataset_service.sample_dataset(dataset, mode, n, seed, by if mode == "stratified" else None)
+    
+    # A fresh seed would make a cache key no later request repeats, so unseeded samples are not cached
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+        return compute()
+    
+    # Building an index changes how rows are picked, so it is part of the version
+    version = (dataset_service.get_file_signature(dataset), dataset_service.has_index(dataset))
+    return cached_response(("dataset-sample", dataset_id, mode, n, seed, by), version, compute)
+
+@router.post("/datasets/{dataset_id}/index")
+def build_dataset_index_route(dataset_id: str):
+    """Build the row-offset index used for random access into a dataset"""
+    dataset_service = DatasetService()
+    dataset = dataset_service.get_dataset_by_id(dataset_id)
+    if not dataset:
         raise project_not_found(dataset_id)  # Reuse existing exception
-    return content
+    return {"datasetId": dataset_id, "rows": dataset_service.build_index(dataset)}
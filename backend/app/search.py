@@ -0,0 +1,57 @@
+"""
+Full-text search over projects, models, model versions and metric settings.
+
+``search_documents`` holds one row per searchable thing and is maintained by
+the write paths in ``storage.py``. ``search_index`` is an FTS5 table over its
+``title`` and ``body`` columns using the external-content pattern: triggers
+copy every insert, update and delete of a document into the index, so the
+text is stored once and the index can never drift from its documents.
+
+Queries are split on whitespace and every term becomes a quoted prefix
+phrase, so ``res v2`` matches ``ResNet`` version ``v2.1`` and user input can
+never produce FTS5 syntax errors. Hits are ranked by BM25 with matches in the
+title weighted above matches in the body, through the FTS5 ``rank`` column,
+so every match is scored and FTS5 keeps only the best while sorting.
+"""
+
+from typing import Optional
+
+SEARCH_KINDS = ("project", "model", "version", "metric")
+
+# BM25 weights of the indexed columns (title, body)
+TITLE_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+# Longer queries are cut to this many terms
+MAX_QUERY_TERMS = 16
+
+_DDL = (
+    # Prefix indexes answer prefixes of 2 to 6 characters without merging the doclists of every
+    # term they cover, which dominates the cost of short queries over many documents
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, content='search_documents', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_index(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_index(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+)
+
+
+def create_search_index(connection) -> None:
+    """Create the FTS5 table and the triggers that keep it in sync with ``search_documents``."""
+    for statement in _DDL:
+        connection.exec_driver_sql(statement)
+
+
+def match_query(text: str) -> Optional[str]:
+    """An FTS5 MATCH expression requiring every term of ``text`` as a prefix, or None if it has no terms."""
+    terms = []
+    for part in text.split():
+        part = part.replace('"', "")
+        if any(char.isalnum() for char in part):
+            terms.append(f'"{part}"*')
+    return " ".join(terms[:MAX_QUERY_TERMS]) or None
@@ -1,9 +1,10 @@
 from .database import SessionLocal, create_tables
 from .storage import (
-    create_project, create_metric, create_metric_settings,
+    has_projects, create_projects, create_metrics, create_metric_settings_batch,
     pydantic_project_to_db, pydantic_metric_to_db, pydantic_setting_to_db
 )
 from .models import Project, ProjectMetric, MetricSettings
+from .cache import touch_projects
 
 # Sample data from frontend
 SAMPLE_PROJECTS = [
@@ -234,38 +235,40 @@ SAMPLE_PROJECTS = [
     }
 ]
 
-def seed_database():
+def seed_database(ensure_tables: bool = True):
     """Seed the database with sample data"""
-    create_tables()
+    if ensure_tables:
+        create_tables()
     
     db = SessionLocal()
     try:
         # Check if data already exists
-        from .storage import get_all_projects
-        existing_projects = get_all_projects(db)
-        if existing_projects:
+        if has_projects(db):
             print("Database already contains data. Skipping seed.")
             return
         
         print("Seeding database with sample data...")
         
+        projects = []
+        settings = []
+        metrics = []
         for project_data in SAMPLE_PROJECTS:
-            # Create project
-            project_dict = pydantic_project_to_db(Project(**project_data))
-            db_project = create_project(db, project_dict)
-            print(f"Created project: {db_project.name}")
-            
-            # Create metric settings
-            for setting_data in project_data["metricsConfig"]:
-                setting_dict = pydantic_setting_to_db(MetricSettings(**setting_data), project_data["id"])
-                create_metric_settings(db, setting_dict)
-            
-            # Create metrics
-            for metric_data in project_data["records"]:
-                metric_dict = pydantic_metric_to_db(ProjectMetric(**metric_data))
-                create_metric(db, metric_dict)
-            
-            print(f"Added {len(project_data['records'])} metrics to project {db_project.name}")
+            projects.append(pydantic_project_to_db(Project(**project_data)))
+            settings.extend(
+                pydantic_setting_to_db(MetricSettings(**setting_data), project_data["id"])
+                for setting_data in project_data["metricsConfig"]
+            )
+            metrics.extend(
+                pydantic_metric_to_db(ProjectMetric(**metric_data)) for metric_data in project_data["records"]
+            )
+            print(f"Prepared project {project_data['name']} with {len(project_data['records'])} metrics")
+        
+        # One executemany per table, committed together so a failure leaves no half-seeded database
+        create_projects(db, projects, commit=False)
+        create_metric_settings_batch(db, settings, commit=False)
+        create_metrics(db, metrics, commit=False)
+        db.commit()
+        touch_projects(*(project['id'] for project in projects))
         
         print("Database seeding completed successfully!")
         
@@ -2,32 +2,233 @@
 Service layer for business logic operations.
 """
 
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from datetime import datetime, timedelta
+from itertools import compress, groupby, repeat
+from operator import is_not, itemgetter
 import uuid
 import json
 
 from sqlalchemy.orm import Session
 
 from .models import (
-    Project, ProjectMetric, CreateProjectRequest, UpdateProjectRequest,
-    CreateMetricRecordRequest, UpdateMetricRequest
+    Project, ProjectMetric, RetentionPolicy, CreateProjectRequest, UpdateProjectRequest,
+    CreateMetricRecordRequest, UpdateMetricRequest, MetricRecordFilter,
+    MetricSummary, ModelVersionSummary, ModelCatalogEntry, Leaderboard, LeaderboardEntry, MetricComparison,
+    ArchiveInfo, ArchiveSegmentInfo, DatasetImportRequest, MetricStats, ModelStats, ProjectStats, MetricAnomaly,
+    SearchHit
 )
+from .timeseries import (
+    to_epoch, from_epoch, uniform_grid, union_grid, resample,
+    percentile, mean_and_std, moving_averages, linear_slope, SECONDS_PER_DAY
+)
+from .cache import VersionedCache, versions, project_scope, PROJECTS_SCOPE
+from .singleflight import flights
+from .anomaly import lower_is_better
+from .search import match_query
+from .config import (
+    ANOMALY_DETECTION_ENABLED, ARCHIVE_SEGMENT_ROWS, DATASET_IMPORT_CHUNK_ROWS, PROJECT_PURGE_CHUNK_SIZE,
+    RETENTION_BATCH_SIZE, INGEST_MODE, INGEST_ACK, INGEST_COMMIT_TIMEOUT_SECONDS
+)
+from .ingest import get_ingest_queue
+from .archive import (
+    project_archive_dir, new_segment_name, write_segment, read_archived_rows, remove_segment, remove_project_archive
+)
+from .database import SessionLocal, upgrade_schema
+from .dataset_service import DatasetService
+from .jobs import Job, jobs
 from .storage import (
     create_project, get_all_projects, get_project_by_id, update_project, delete_project,
-    create_metric, get_project_metrics, update_metric, delete_metric,
-    update_project_metric_settings, create_metric_settings, db_project_to_pydantic, pydantic_setting_to_db
+    purge_project_metrics_chunk, get_project_metric_settings, get_model_names, get_model_version_summaries,
+    get_rollup_version_summaries, get_top_rollups,
+    STANDARD_METRIC_COLUMNS, is_supported_metric, get_configured_metric_ids, sync_metric_indexes, get_top_metrics,
+    db_metric_to_pydantic,
+    get_metric_series, get_metric_columns, get_rollup_metric_columns, get_project_rollups, rollups_to_pydantic,
+    get_archive_segments, get_archived_segment_names, fetch_metric_rows, commit_archived_segment,
+    commit_restored_segment, metric_row_to_pydantic,
+    get_project_field_rows, get_metric_field_rows, project_metric_fields, get_metric_settings, db_setting_to_pydantic,
+    get_retention_policy, get_retention_policies, set_retention_policy, delete_retention_policy,
+    count_metrics_before, compact_project_metrics_batch, reclaim_free_pages, ROLLUP_INTERVALS,
+    create_metric, insert_metric_columns, get_project_metrics,
+    get_anomalies, get_record_anomalies, anomaly_to_pydantic, update_metric, delete_metric,
+    delete_metrics_by_filter, update_metrics_by_filter, get_rollup_buckets_by_filter,
+    update_project_metric_settings, db_project_to_pydantic, pydantic_setting_to_db,
+    has_projects, has_search_documents, search_index_in_sync, rebuild_search_documents, search_documents
 )
 
 
+_catalog_cache = VersionedCache(max_entries=256)
+_stats_cache = VersionedCache(max_entries=256)
+
+
+def _as_float(value) -> Optional[float]:
+    """Coerce a raw SQL value (possibly from JSON) to float, ignoring non-numeric values."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _iso(timestamp_text: str) -> str:
+    """API form of a timestamp read as stored text."""
+    return datetime.fromisoformat(timestamp_text).isoformat()
+
+
+def _metric_stats(metric_id: str, timestamps: Sequence[str], times: Sequence[float], values: List[float],
+                  percentiles: List[float], window: int, points: int) -> MetricStats:
+    """Statistics of one metric series (sorted by time, no missing values)."""
+    count = len(values)
+    ordered = sorted(values)
+    mean, std = mean_and_std(values)
+    low, high = ordered[0], ordered[-1]
+    best, worst = (low, high) if lower_is_better(metric_id) else (high, low)
+    
+    # The moving average is reported at up to ``points`` evenly spaced records, always including the last
+    step = -(-count // points)
+    indices = list(range(count - 1, -1, -step))[::-1]
+    averages = moving_averages(values, window, indices)
+    slope = linear_slope(times, values)
+    
+    return MetricStats(
+        count=count,
+        mean=mean,
+        std=std,
+        min=low,
+        max=high,
+        percentiles={f"p{q:g}": percentile(ordered, q) for q in percentiles},
+        best=best,
+        bestTimestamp=_iso(timestamps[values.index(best)]),
+        worst=worst,
+        worstTimestamp=_iso(timestamps[values.index(worst)]),
+        movingAverage=averages[-1],
+        movingAverageTimestamps=[_iso(timestamps[i]) for i in indices],
+        movingAverageValues=averages,
+        slopePerDay=slope * SECONDS_PER_DAY if slope is not None else None,
+    )
+
+
+def _merge_version_summaries(summaries: List[dict], metrics: List[tuple]) -> List[dict]:
+    """Combine version summaries of the same model version read from different tiers, sorted by model and version."""
+    merged: Dict[tuple, dict] = {}
+    for summary in summaries:
+        key = (summary['model_name'], summary['model_version'])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = summary
+            continue
+        newer = summary if summary['last_timestamp'] > current['last_timestamp'] else current
+        combined = {
+            'model_name': summary['model_name'],
+            'model_version': summary['model_version'],
+            'record_count': current['record_count'] + summary['record_count'],
+            'first_timestamp': min(current['first_timestamp'], summary['first_timestamp']),
+            'last_timestamp': newer['last_timestamp'],
+            'metrics': {},
+        }
+        for metric_id, lower in metrics:
+            candidates = [_as_float(part['metrics'][metric_id]['best']) for part in (current, summary)]
+            candidates = [value for value in candidates if value is not None]
+            combined['metrics'][metric_id] = {
+                'latest': newer['metrics'][metric_id]['latest'],
+                'best': (min(candidates) if lower else max(candidates)) if candidates else None,
+            }
+        merged[key] = combined
+    return [merged[key] for key in sorted(merged, key=lambda key: (key[0], key[1] or ''))]
+
+
+def _top_candidates(candidates: List[tuple], descending: bool, limit: int, per_group: Optional[int]) -> List[tuple]:
+    """The first ``limit`` of ``(value, timestamp, id, group, item)`` candidates in leaderboard order.
+    
+    That is by value, then newest first, then by id, with at most ``per_group`` candidates of each
+    group when ``per_group`` is given. Merging the top ``limit`` of several tiers this way gives the
+    top ``limit`` of their union.
+    """
+    ordered = sorted(candidates, key=itemgetter(2))
+    ordered.sort(key=itemgetter(1), reverse=True)
+    ordered.sort(key=itemgetter(0), reverse=descending)
+    if per_group is None:
+        return ordered[:limit]
+    
+    top, taken = [], {}
+    for candidate in ordered:
+        group = candidate[3]
+        if taken.get(group, 0) < per_group:
+            taken[group] = taken.get(group, 0) + 1
+            top.append(candidate)
+            if len(top) == limit:
+                break
+    return top
+
+
+def _leaderboard_group(partition: Optional[str], project_id: str, model_name: str) -> tuple:
+    return (project_id, model_name) if partition == 'model' else (project_id,)
+
+
+def _archived_records(project_id: str, segment_names: List[str]) -> List[ProjectMetric]:
+    """Records of a project that live in archive segments"""
+    return [metric_row_to_pydantic(project_id, row) for row in read_archived_rows(project_id, segment_names)]
+
+
+def _with_archived_records(db: Session, project: Project) -> Project:
+    segment_names = [segment.name for segment in get_archive_segments(db, project.id)]
+    if segment_names:
+        project.records = _archived_records(project.id, segment_names) + project.records
+    return project
+
+
+def _derived_record_fields(db: Session, project_id: str, fields: List[str],
+                           segment_names: Optional[List[str]]) -> List[dict]:
+    """Sparse fieldsets of a project's rollup and archived records"""
+    records = rollups_to_pydantic(get_project_rollups(db, project_id))
+    if segment_names:
+        records += _archived_records(project_id, segment_names)
+    return [project_metric_fields(record, fields) for record in records]
+
+
 class ProjectService:
     """Service for project operations."""
     
+    @staticmethod
+    def get_project_fields(db: Session, fields: List[str], include: List[str], record_fields: List[str],
+                           project_id: Optional[str] = None) -> List[dict]:
+        """Projects reduced to the requested fields and embedded collections (all projects, or one)."""
+        projects = get_project_field_rows(db, fields, project_id)
+        if not projects:
+            return []
+        project_ids = [project_id] if project_id is not None else None
+        
+        if 'records' in include:
+            archived = get_archived_segment_names(db)
+            records = {id_: [] for id_, _ in projects}
+            for id_, record in get_metric_field_rows(db, record_fields, project_ids):
+                records[id_].append(record)
+            for id_, values in projects:
+                values['records'] = _derived_record_fields(db, id_, record_fields, archived.get(id_)) + records[id_]
+        
+        if 'metricsConfig' in include:
+            settings = {id_: [] for id_, _ in projects}
+            for db_setting in get_metric_settings(db, project_ids):
+                settings[db_setting.project_id].append(db_setting_to_pydantic(db_setting).model_dump())
+            for id_, values in projects:
+                values['metricsConfig'] = settings[id_]
+        
+        return [values for _, values in projects]
+    
     @staticmethod
     def get_all_projects(db: Session) -> List[Project]:
         """Get all projects."""
-        db_projects = get_all_projects(db)
-        return [db_project_to_pydantic(project) for project in db_projects]
+        def load():
+            archived = get_archived_segment_names(db)
+            projects = [db_project_to_pydantic(project) for project in get_all_projects(db)]
+            for project in projects:
+                if project.id in archived:
+                    project.records = _archived_records(project.id, archived[project.id]) + project.records
+            return projects
+        
+        # Concurrent identical listings share one scan; the version keeps post-write callers apart
+        return flights.do(("projects", versions.current(PROJECTS_SCOPE)), load)
     
     @staticmethod
     def get_project_by_id(db: Session, project_id: str) -> Optional[Project]:
@@ -35,7 +236,7 @@ class ProjectService:
         db_project = get_project_by_id(db, project_id)
         if not db_project:
             return None
-        return db_project_to_pydantic(db_project)
+        return _with_archived_records(db, db_project_to_pydantic(db_project))
     
     @staticmethod
     def create_project(db: Session, project_data: CreateProjectRequest) -> Project:
@@ -57,9 +258,8 @@ class ProjectService:
         
         # Create metric settings if provided
         if project_data.metricsConfig:
-            for setting in project_data.metricsConfig:
-                setting_data = pydantic_setting_to_db(setting, project_id)
-                create_metric_settings(db, setting_data)
+            settings_data = [pydantic_setting_to_db(setting, project_id) for setting in project_data.metricsConfig]
+            update_project_metric_settings(db, project_id, settings_data)
         
         return db_project_to_pydantic(db_project)
     
@@ -86,17 +286,47 @@ class ProjectService:
             settings_data = [pydantic_setting_to_db(setting, project_id) for setting in project_data.metricsConfig]
             update_project_metric_settings(db, project_id, settings_data)
         
-        return db_project_to_pydantic(updated_project)
+        return _with_archived_records(db, db_project_to_pydantic(updated_project))
     
     @staticmethod
     def delete_project(db: Session, project_id: str) -> bool:
         """Delete a project."""
-        return delete_project(db, project_id)
+        deleted = delete_project(db, project_id)
+        if deleted:
+            remove_project_archive(project_id)
+        return deleted
+    
+    @staticmethod
+    def start_project_purge(project_id: str, record_count: int) -> Job:
+        """Delete a large project in bounded chunks on a background job."""
+        def purge(job: Job) -> dict:
+            db = SessionLocal()
+            try:
+                while True:
+                    deleted = purge_project_metrics_chunk(db, project_id, PROJECT_PURGE_CHUNK_SIZE)
+                    job.advance(deleted)
+                    if deleted < PROJECT_PURGE_CHUNK_SIZE:
+                        break
+                # Removes the settings, the project row and anything inserted while purging
+                delete_project(db, project_id)
+                remove_project_archive(project_id)
+                return {'projectId': project_id, 'deletedRecords': job.done}
+            finally:
+                db.close()
+        
+        return jobs.submit("project_purge", f"Delete project {project_id}", purge, total=record_count)
 
 
 class MetricRecordService:
     """Service for metric record operations."""
     
+    @staticmethod
+    def get_project_metric_fields(db: Session, project_id: str, fields: List[str]) -> List[dict]:
+        """Metric records of a project reduced to the requested fields."""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        records = [record for _, record in get_metric_field_rows(db, fields, [project_id])]
+        return _derived_record_fields(db, project_id, fields, segment_names) + records
+    
     @staticmethod
     def get_project_metric_records(db: Session, project_id: str) -> List[ProjectMetric]:
         """Get metric records for a project."""
@@ -117,7 +347,9 @@ class MetricRecordService:
                 'additionalMetrics': json.loads(db_metric.additional_metrics) if db_metric.additional_metrics else None
             }
             metrics.append(ProjectMetric(**metric_dict))
-        return metrics
+        # Compacted ranges are represented by their rollup records, archived ones are read from segments
+        archived = _archived_records(project_id, [segment.name for segment in get_archive_segments(db, project_id)])
+        return rollups_to_pydantic(get_project_rollups(db, project_id)) + archived + metrics
     
     @staticmethod
     def create_metric_record(db: Session, project_id: str, metric_data: CreateMetricRecordRequest) -> ProjectMetric:
@@ -139,6 +371,30 @@ class MetricRecordService:
             'additional_metrics': json.dumps(metric_data.additionalMetrics) if metric_data.additionalMetrics else None
         }
         
+        if INGEST_MODE == 'queued':
+            # Group-committed by the background writer; optionally wait until the batch is durable
+            future = get_ingest_queue().submit(db_metric_data)
+            if INGEST_ACK == 'commit':
+                # Return the pooled connection first, or waiting requests could starve the writer of one
+                db.close()
+                future.result(timeout=INGEST_COMMIT_TIMEOUT_SECONDS)
+            metric = ProjectMetric(
+                id=metric_id,
+                projectId=project_id,
+                timestamp=db_metric_data['timestamp'].isoformat(),
+                modelName=metric_data.modelName,
+                modelVersion=metric_data.modelVersion,
+                accuracy=metric_data.accuracy,
+                loss=metric_data.loss,
+                precision=metric_data.precision,
+                recall=metric_data.recall,
+                f1Score=metric_data.f1Score,
+                additionalMetrics=metric_data.additionalMetrics or None,
+            )
+            if INGEST_ACK == 'commit':
+                metric.anomalies = MetricRecordService._record_anomalies(db, metric_id)
+            return metric
+        
         db_metric = create_metric(db, db_metric_data)
         
         # Convert back to Pydantic model
@@ -153,34 +409,31 @@ class MetricRecordService:
             'precision': db_metric.precision,
             'recall': db_metric.recall,
             'f1Score': db_metric.f1_score,
-            'additionalMetrics': json.loads(db_metric.additional_metrics) if db_metric.additional_metrics else None
+            'additionalMetrics': json.loads(db_metric.additional_metrics) if db_metric.additional_metrics else None,
+            'anomalies': MetricRecordService._record_anomalies(db, metric_id),
         }
         
         return ProjectMetric(**metric_dict)
     
+    @staticmethod
+    def _record_anomalies(db: Session, metric_id: str) -> Optional[List[MetricAnomaly]]:
+        """Anomalies flagged when a record was ingested, or None."""
+        if not ANOMALY_DETECTION_ENABLED:
+            return None
+        return [anomaly_to_pydantic(anomaly) for anomaly in get_record_anomalies(db, metric_id)] or None
+    
+    @staticmethod
+    def get_anomalies(db: Session, project_id: str, model_name: Optional[str] = None, metric: Optional[str] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      regressions_only: bool = False, limit: int = 100) -> List[MetricAnomaly]:
+        """Anomalies flagged on ingest, newest first."""
+        anomalies = get_anomalies(db, project_id, model_name, metric, start, end, regressions_only, limit)
+        return [anomaly_to_pydantic(anomaly) for anomaly in anomalies]
+    
     @staticmethod
     def update_metric_record(db: Session, metric_id: str, metric_data: UpdateMetricRequest) -> Optional[ProjectMetric]:
         """Update a metric record."""
-        # Prepare update data
-        update_data = {}
-        if metric_data.timestamp is not None:
-            update_data['timestamp'] = datetime.fromisoformat(metric_data.timestamp)
-        if metric_data.modelName is not None:
-            update_data['model_name'] = metric_data.modelName
-        if metric_data.modelVersion is not None:
-            update_data['model_version'] = metric_data.modelVersion
-        if metric_data.accuracy is not None:
-            update_data['accuracy'] = metric_data.accuracy
-        if metric_data.loss is not None:
-            update_data['loss'] = metric_data.loss
-        if metric_data.precision is not None:
-            update_data['precision'] = metric_data.precision
-        if metric_data.recall is not None:
-            update_data['recall'] = metric_data.recall
-        if metric_data.f1Score is not None:
-            update_data['f1_score'] = metric_data.f1Score
-        if metric_data.additionalMetrics is not None:
-            update_data['additional_metrics'] = json.dumps(metric_data.additionalMetrics)
+        update_data = MetricRecordService._update_request_to_db(metric_data)
         
         updated_metric = update_metric(db, metric_id, update_data)
         if not updated_metric:
@@ -198,11 +451,67 @@ class MetricRecordService:
             'precision': updated_metric.precision,
             'recall': updated_metric.recall,
             'f1Score': updated_metric.f1_score,
-            'additionalMetrics': json.loads(updated_metric.additional_metrics) if updated_metric.additional_metrics else None
+            'additionalMetrics': (
+                json.loads(updated_metric.additional_metrics) if updated_metric.additional_metrics else None
+            )
         }
         
         return ProjectMetric(**metric_dict)
     
+    @staticmethod
+    def _update_request_to_db(metric_data: UpdateMetricRequest) -> dict:
+        """Collect the fields set on an update request as database column values."""
+        update_data = {}
+        if metric_data.timestamp is not None:
+            update_data['timestamp'] = datetime.fromisoformat(metric_data.timestamp)
+        if metric_data.modelName is not None:
+            update_data['model_name'] = metric_data.modelName
+        if metric_data.modelVersion is not None:
+            update_data['model_version'] = metric_data.modelVersion
+        if metric_data.accuracy is not None:
+            update_data['accuracy'] = metric_data.accuracy
+        if metric_data.loss is not None:
+            update_data['loss'] = metric_data.loss
+        if metric_data.precision is not None:
+            update_data['precision'] = metric_data.precision
+        if metric_data.recall is not None:
+            update_data['recall'] = metric_data.recall
+        if metric_data.f1Score is not None:
+            update_data['f1_score'] = metric_data.f1Score
+        if metric_data.additionalMetrics is not None:
+            update_data['additional_metrics'] = json.dumps(metric_data.additionalMetrics)
+        return update_data
+    
+    @staticmethod
+    def _filter_to_db(record_filter: MetricRecordFilter) -> dict:
+        """Convert an API record filter to storage filter arguments."""
+        return {
+            'model_name': record_filter.modelName,
+            'model_version': record_filter.modelVersion,
+            'start': datetime.fromisoformat(record_filter.start) if record_filter.start else None,
+            'end': datetime.fromisoformat(record_filter.end) if record_filter.end else None,
+            'ids': record_filter.ids,
+        }
+    
+    @staticmethod
+    def bulk_delete_metric_records(db: Session, project_id: str, record_filter: MetricRecordFilter) -> int:
+        """Delete every record of a project matching the filter in one transaction."""
+        return delete_metrics_by_filter(db, project_id, MetricRecordService._filter_to_db(record_filter))
+    
+    @staticmethod
+    def count_rollup_matches(db: Session, project_id: str, record_filter: MetricRecordFilter) -> int:
+        """Number of rollup records of a project the filter selects; these can be deleted but not patched."""
+        return len(get_rollup_buckets_by_filter(db, project_id, MetricRecordService._filter_to_db(record_filter)))
+    
+    @staticmethod
+    def bulk_update_metric_records(db: Session, project_id: str, record_filter: MetricRecordFilter,
+                                   changes: UpdateMetricRequest) -> int:
+        """Patch every record of a project matching the filter in one transaction."""
+        return update_metrics_by_filter(
+            db, project_id, MetricRecordService._filter_to_db(record_filter),
+            MetricRecordService._update_request_to_db(changes)
+        )
+    
     @staticmethod
     def delete_metric_record(db: Session, metric_id: str) -> bool:
         """Delete a metric record."""
@@ -210,7 +519,701 @@ class MetricRecordService:
     
     @staticmethod
     def get_models(db: Session, project_id: str) -> List[str]:
-        """Get unique model names for a project."""
-        db_metrics = get_project_metrics(db, project_id)
-        model_names = list(set(metric.model_name for metric in db_metrics if metric.model_name))
-        return model_names 
\ No newline at end of file
+        """Get unique model names for a project, sorted by name."""
+        archived = ArchiveService.model_names(db, project_id)
+        if not archived:
+            return get_model_names(db, project_id)
+        return sorted({name for name in archived if name} | set(get_model_names(db, project_id)))
+    
+    @staticmethod
+    def get_model_catalog(db: Session, project_id: str) -> List[ModelCatalogEntry]:
+        """Get every model of a project with its versions and per-metric summaries."""
+        version = versions.current(project_scope(project_id))
+        catalog = _catalog_cache.get(project_id, version)
+        if catalog is not None:
+            return catalog
+        
+        settings = get_project_metric_settings(db, project_id)
+        metric_ids = [setting.metric_id for setting in settings if setting.enabled] if settings \
+            else list(STANDARD_METRIC_COLUMNS)
+        metrics = [(metric_id, lower_is_better(metric_id))
+                   for metric_id in metric_ids if is_supported_metric(metric_id)]
+        directions = dict(metrics)
+        
+        catalog = []
+        # Compacted ranges contribute their rollups, archived ones are read from segments
+        summaries = get_model_version_summaries(db, project_id, metrics)
+        summaries += get_rollup_version_summaries(db, project_id, metrics)
+        summaries = _merge_version_summaries(summaries + ArchiveService.version_summaries(db, project_id, metrics),
+                                             metrics)
+        for summary in summaries:
+            version_summary = ModelVersionSummary(
+                version=summary['model_version'],
+                recordCount=summary['record_count'],
+                firstTimestamp=summary['first_timestamp'].isoformat(),
+                lastTimestamp=summary['last_timestamp'].isoformat(),
+                metrics={metric_id: MetricSummary(latest=_as_float(values['latest']), best=_as_float(values['best']))
+                         for metric_id, values in summary['metrics'].items()},
+            )
+            if not catalog or catalog[-1].modelName != summary['model_name']:
+                catalog.append(ModelCatalogEntry(
+                    modelName=summary['model_name'], recordCount=0,
+                    firstTimestamp=version_summary.firstTimestamp, lastTimestamp=version_summary.lastTimestamp,
+                ))
+            entry = catalog[-1]
+            entry.versions.append(version_summary)
+            entry.recordCount += version_summary.recordCount
+            entry.firstTimestamp = min(entry.firstTimestamp, version_summary.firstTimestamp)
+            entry.lastTimestamp = max(entry.lastTimestamp, version_summary.lastTimestamp)
+        
+        # Roll version summaries up to the model: latest from the most recent version, best overall
+        for entry in catalog:
+            newest = max(entry.versions, key=lambda v: v.lastTimestamp)
+            for metric_id, lower in directions.items():
+                candidates = [v.metrics[metric_id].best
+                              for v in entry.versions if v.metrics[metric_id].best is not None]
+                best = (min(candidates) if lower else max(candidates)) if candidates else None
+                entry.metrics[metric_id] = MetricSummary(latest=newest.metrics[metric_id].latest, best=best)
+        
+        _catalog_cache.set(project_id, version, catalog)
+        return catalog
+    
+    @staticmethod
+    def get_project_stats(db: Session, project_id: str, metric_ids: Optional[List[str]] = None,
+                          percentiles: Optional[List[float]] = None, window: int = 10,
+                          points: int = 50) -> ProjectStats:
+        """Per-model distribution, extremes, moving average and trend of each metric; cached per project version."""
+        if metric_ids is None:
+            settings = get_project_metric_settings(db, project_id)
+            metric_ids = [setting.metric_id for setting in settings if setting.enabled] if settings \
+                else list(STANDARD_METRIC_COLUMNS)
+            metric_ids = [metric_id for metric_id in metric_ids if is_supported_metric(metric_id)]
+        percentiles = percentiles if percentiles is not None else [5, 25, 50, 75, 95]
+        
+        key = (project_id, tuple(metric_ids), tuple(percentiles), window, points)
+        version = versions.current(project_scope(project_id))
+        stats = _stats_cache.get(key, version)
+        if stats is not None:
+            return stats
+        
+        stats = ProjectStats(projectId=project_id, window=window, percentiles=percentiles)
+        rows = get_metric_columns(db, project_id, metric_ids)
+        # Compacted buckets count as one value (their mean) each, archived records as themselves
+        older = get_rollup_metric_columns(db, project_id, metric_ids)
+        older += ArchiveService.metric_columns(db, project_id, metric_ids)
+        if older:
+            rows = sorted(rows + older, key=lambda row: (row[0], row[2]))
+        for model_name, group in groupby(rows, key=itemgetter(0)):
+            # Transpose the model's rows into one array per column
+            _, timestamps, times, counts, *columns = zip(*group)
+            model = ModelStats(
+                modelName=model_name,
+                recordCount=sum(counts),
+                firstTimestamp=_iso(timestamps[0]),
+                lastTimestamp=_iso(timestamps[-1]),
+            )
+            for metric_id, column in zip(metric_ids, columns):
+                if None in column:
+                    present = list(map(is_not, column, repeat(None)))
+                    if not any(present):
+                        continue
+                    series = (list(compress(timestamps, present)), list(compress(times, present)),
+                              list(map(float, compress(column, present))))
+                else:
+                    series = (timestamps, times, list(map(float, column)))
+                model.metrics[metric_id] = _metric_stats(metric_id, *series, percentiles, window, points)
+            stats.models.append(model)
+        
+        _stats_cache.set(key, version, stats)
+        return stats
+    
+    @staticmethod
+    def get_leaderboard(
+        db: Session,
+        metric: str,
+        k: int = 10,
+        project_id: Optional[str] = None,
+        partition: Optional[str] = None,
+        per_group: int = 1,
+        direction: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Leaderboard:
+        """Get the top-k records by a metric, optionally only the best per model or project."""
+        if direction is None:
+            direction = 'asc' if lower_is_better(metric) else 'desc'
+        
+        ranking = dict(descending=direction == 'desc', limit=k, project_id=project_id, partition=partition,
+                       per_group=per_group, start=start, end=end)
+        # Compacted buckets compete with raw records by their mean, archived records by their value
+        pairs = [(db_metric_to_pydantic(db_metric), value)
+                 for db_metric, value in get_top_metrics(db, metric, **ranking)]
+        pairs += get_top_rollups(db, metric, **ranking)
+        pairs += ArchiveService.top_records(db, metric, **ranking)
+        candidates = [
+            (value, datetime.fromisoformat(record.timestamp), record.id,
+             _leaderboard_group(partition, record.projectId, record.modelName), record)
+            for record, value in pairs
+        ]
+        top = _top_candidates(candidates, direction == 'desc', k, per_group if partition else None)
+        entries = [
+            LeaderboardEntry(rank=rank, value=value, record=record)
+            for rank, (value, _, _, _, record) in enumerate(top, start=1)
+        ]
+        return Leaderboard(metric=metric, direction=direction, partition=partition, entries=entries)
+    
+    @staticmethod
+    def start_metric_index_sync() -> Job:
+        """Build the ranking indexes of the standard and configured metrics and drop all others, as a job"""
+        def sync(job: Job) -> dict:
+            db = SessionLocal()
+            try:
+                metric_ids = sorted(set(STANDARD_METRIC_COLUMNS) | set(get_configured_metric_ids(db)))
+                return {'metrics': metric_ids, **sync_metric_indexes(db, metric_ids)}
+            finally:
+                db.close()
+        
+        return jobs.submit("metric_indexes", "Build ranking indexes of the standard and configured metrics", sync)
+    
+    @staticmethod
+    def compare_models(
+        db: Session,
+        project_id: str,
+        metric: str,
+        models: List[str],
+        points: Optional[int] = None,
+        method: str = 'linear',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> MetricComparison:
+        """Resample a metric of several models (``name`` or ``name@version``) onto a shared time grid.
+        
+        The grid holds ``points`` evenly spaced instants over the combined range, or every observed
+        instant when ``points`` is not given.
+        """
+        specs = []
+        for model in models:
+            name, _, version = model.partition('@')
+            specs.append((model, name, version or None))
+        
+        model_names = sorted({name for _, name, _ in specs})
+        rows = get_metric_series(db, project_id, metric, model_names, start, end)
+        archived = ArchiveService.metric_series(db, project_id, metric, model_names, start, end)
+        if archived:
+            rows = sorted(rows + archived, key=lambda row: (row[0], row[2]))
+        
+        series_data = {}
+        for label, name, version in specs:
+            times, values = [], []
+            for model_name, model_version, timestamp, value in rows:
+                if model_name == name and (version is None or model_version == version):
+                    times.append(to_epoch(timestamp))
+                    values.append(float(value))
+            series_data[label] = (times, values)
+        
+        observed = [times for times, _ in series_data.values() if times]
+        if not observed:
+            return MetricComparison(metric=metric, method=method, series={label: [] for label in series_data})
+        
+        if points:
+            grid = uniform_grid(min(times[0] for times in observed), max(times[-1] for times in observed), points)
+        else:
+            grid = union_grid(observed)
+        
+        return MetricComparison(
+            metric=metric,
+            method=method,
+            timestamps=[from_epoch(instant).isoformat() for instant in grid],
+            series={label: resample(times, values, grid, method) for label, (times, values) in series_data.items()},
+        )
+
+
+class RetentionService:
+    """Service for retention policies and compaction of old raw records."""
+    
+    @staticmethod
+    def _to_model(policy) -> RetentionPolicy:
+        return RetentionPolicy(rawRetentionDays=policy.raw_retention_days, rollupInterval=policy.rollup_interval)
+    
+    @staticmethod
+    def get_policy(db: Session, project_id: str) -> Optional[RetentionPolicy]:
+        policy = get_retention_policy(db, project_id)
+        return RetentionService._to_model(policy) if policy else None
+    
+    @staticmethod
+    def set_policy(db: Session, project_id: str, policy: RetentionPolicy) -> RetentionPolicy:
+        db_policy = set_retention_policy(db, project_id, policy.rawRetentionDays, policy.rollupInterval)
+        return RetentionService._to_model(db_policy)
+    
+    @staticmethod
+    def delete_policy(db: Session, project_id: str) -> bool:
+        return delete_retention_policy(db, project_id)
+    
+    @staticmethod
+    def compact(job: Job, project_ids: Optional[List[str]] = None) -> dict:
+        """Apply retention policies: roll up and delete expired raw records in batches, then vacuum."""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            policies = [policy for policy in get_retention_policies(db)
+                        if project_ids is None or policy.project_id in project_ids]
+            plans = [
+                (policy.project_id, now - timedelta(days=policy.raw_retention_days),
+                 ROLLUP_INTERVALS[policy.rollup_interval])
+                for policy in policies
+            ]
+            job.total = sum(count_metrics_before(db, project_id, cutoff) for project_id, cutoff, _ in plans)
+            
+            compacted = {}
+            for project_id, cutoff, bucket_seconds in plans:
+                compacted[project_id] = 0
+                while True:
+                    count = compact_project_metrics_batch(db, project_id, cutoff, bucket_seconds, RETENTION_BATCH_SIZE)
+                    compacted[project_id] += count
+                    job.advance(count)
+                    if count < RETENTION_BATCH_SIZE:
+                        break
+            
+            vacuum = reclaim_free_pages(db) if job.done else None
+            return {'compactedRecords': compacted, 'vacuum': vacuum}
+        finally:
+            db.close()
+    
+    @staticmethod
+    def start_compaction(project_ids: Optional[List[str]] = None) -> Job:
+        """Run compaction for some projects (default: every project with a policy) on a background job."""
+        description = "Apply retention policies" + (f" to {', '.join(project_ids)}" if project_ids else "")
+        return jobs.submit("retention_compaction", description,
+                           lambda job: RetentionService.compact(job, project_ids))
+
+
+class ArchiveService:
+    """Service for moving project records to and from the cold-tier archive."""
+    
+    @staticmethod
+    def get_archive_info(db: Session, project_id: str) -> ArchiveInfo:
+        segments = get_archive_segments(db, project_id)
+        return ArchiveInfo(
+            projectId=project_id,
+            archived=bool(segments),
+            recordCount=sum(segment.record_count for segment in segments),
+            compressedBytes=sum(segment.compressed_bytes for segment in segments),
+            segments=[
+                ArchiveSegmentInfo(
+                    name=segment.name,
+                    recordCount=segment.record_count,
+                    compressedBytes=segment.compressed_bytes,
+                    minTimestamp=segment.min_timestamp.isoformat() if segment.min_timestamp else None,
+                    maxTimestamp=segment.max_timestamp.isoformat() if segment.max_timestamp else None,
+                    createdAt=segment.created_at.isoformat(),
+                )
+                for segment in segments
+            ],
+        )
+    
+    @staticmethod
+    def _column(metric: str) -> str:
+        """The segment column holding a metric"""
+        return STANDARD_METRIC_COLUMNS[metric].key if metric in STANDARD_METRIC_COLUMNS else 'additional_metrics'
+    
+    @staticmethod
+    def _value(row: dict, metric: str, column: str) -> Optional[float]:
+        """A metric's value in an archived row read with its column, None when missing or not numeric"""
+        value = row[column]
+        if column == 'additional_metrics':
+            value = _as_float(json.loads(value).get(metric)) if value else None
+        return value
+    
+    @staticmethod
+    def metric_series(db: Session, project_id: str, metric: str, model_names: List[str],
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[tuple]:
+        """Archived ``(model_name, model_version, timestamp, value)`` rows, decompressing only the needed columns."""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        if not segment_names:
+            return []
+        
+        column = ArchiveService._column(metric)
+        wanted = set(model_names)
+        series = []
+        for row in read_archived_rows(project_id, segment_names, ['model_name', 'model_version', 'timestamp', column]):
+            if row['model_name'] not in wanted:
+                continue
+            if (start is not None and row['timestamp'] < start) or (end is not None and row['timestamp'] > end):
+                continue
+            value = ArchiveService._value(row, metric, column)
+            if value is not None:
+                series.append((row['model_name'], row['model_version'], row['timestamp'], value))
+        return series
+    
+    @staticmethod
+    def metric_columns(db: Session, project_id: str, metric_ids: List[str]) -> List[tuple]:
+        """Archived records as ``get_metric_columns`` rows, in segment order."""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        if not segment_names:
+            return []
+        
+        columns = [ArchiveService._column(metric_id) for metric_id in metric_ids]
+        wanted = ['model_name', 'timestamp'] + sorted(set(columns))
+        return [
+            (row['model_name'], row['timestamp'].isoformat(), to_epoch(row['timestamp']), 1,
+             *(ArchiveService._value(row, metric_id, column) for metric_id, column in zip(metric_ids, columns)))
+            for row in read_archived_rows(project_id, segment_names, wanted)
+        ]
+    
+    @staticmethod
+    def model_names(db: Session, project_id: str) -> set:
+        """Names of the models with archived records"""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        return {row['model_name'] for row in read_archived_rows(project_id, segment_names, ['model_name'])}
+    
+    @staticmethod
+    def version_summaries(db: Session, project_id: str, metrics: List[tuple]) -> List[dict]:
+        """Archived records summarised like ``get_model_version_summaries`` rows."""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        if not segment_names:
+            return []
+        
+        columns = {metric_id: ArchiveService._column(metric_id) for metric_id, _ in metrics}
+        wanted = ['model_name', 'model_version', 'timestamp'] + sorted(set(columns.values()))
+        summaries: Dict[tuple, dict] = {}
+        for row in read_archived_rows(project_id, segment_names, wanted):
+            values = {metric_id: ArchiveService._value(row, metric_id, column) for metric_id, column in columns.items()}
+            key = (row['model_name'], row['model_version'])
+            summary = summaries.get(key)
+            if summary is None:
+                summary = summaries[key] = {
+                    'model_name': row['model_name'],
+                    'model_version': row['model_version'],
+                    'record_count': 0,
+                    'first_timestamp': row['timestamp'],
+                    'last_timestamp': row['timestamp'],
+                    'metrics': {metric_id: {'latest': values[metric_id], 'best': None} for metric_id in columns},
+                }
+            summary['record_count'] += 1
+            summary['first_timestamp'] = min(summary['first_timestamp'], row['timestamp'])
+            if row['timestamp'] >= summary['last_timestamp']:
+                summary['last_timestamp'] = row['timestamp']
+                for metric_id, value in values.items():
+                    summary['metrics'][metric_id]['latest'] = value
+            for metric_id, lower in metrics:
+                value, best = values[metric_id], summary['metrics'][metric_id]['best']
+                if value is not None and (best is None or (value < best if lower else value > best)):
+                    summary['metrics'][metric_id]['best'] = value
+        return list(summaries.values())
+    
+    @staticmethod
+    def top_records(db: Session, metric: str, descending: bool, limit: int, project_id: Optional[str] = None,
+                    partition: Optional[str] = None, per_group: int = 1, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> List[tuple]:
+        """Top archived records by a metric as ``(ProjectMetric, value)`` pairs, ranked like ``get_top_metrics``.
+        
+        Only the ranking columns are decompressed; whole rows are read for the winners' projects alone.
+        """
+        archived = get_archived_segment_names(db)
+        if project_id is not None:
+            archived = {project_id: archived[project_id]} if project_id in archived else {}
+        
+        column = ArchiveService._column(metric)
+        candidates = []
+        for archived_project, segment_names in archived.items():
+            for row in read_archived_rows(archived_project, segment_names, ['id', 'model_name', 'timestamp', column]):
+                if (start is not None and row['timestamp'] < start) or (end is not None and row['timestamp'] > end):
+                    continue
+                value = ArchiveService._value(row, metric, column)
+                if value is not None:
+                    group = _leaderboard_group(partition, archived_project, row['model_name'])
+                    candidates.append((value, row['timestamp'], row['id'], group, archived_project))
+        top = _top_candidates(candidates, descending, limit, per_group if partition else None)
+        
+        records = {}
+        for archived_project in {candidate[4] for candidate in top}:
+            ids = {record_id for _, _, record_id, _, owner in top if owner == archived_project}
+            for row in read_archived_rows(archived_project, archived[archived_project]):
+                if row['id'] in ids:
+                    records[(archived_project, row['id'])] = metric_row_to_pydantic(archived_project, row)
+        return [(records[(owner, record_id)], value) for value, _, record_id, _, owner in top]
+    
+    @staticmethod
+    def job_resource(project_id: str) -> str:
+        """What archive and restore jobs of a project hold, so only one of them runs at a time"""
+        return f"project-archive:{project_id}"
+    
+    @staticmethod
+    def _matches(row: dict, filters: dict) -> bool:
+        """Whether an archived row matches storage filter arguments"""
+        return ((filters['ids'] is None or row['id'] in filters['ids'])
+                and (filters['model_name'] is None or row['model_name'] == filters['model_name'])
+                and (filters['model_version'] is None or row['model_version'] == filters['model_version'])
+                and (filters['start'] is None or row['timestamp'] >= filters['start'])
+                and (filters['end'] is None or row['timestamp'] <= filters['end']))
+    
+    @staticmethod
+    def count_filter_matches(db: Session, project_id: str, record_filter: MetricRecordFilter) -> int:
+        """Archived records a bulk operation filter selects, reading only segments in its time range."""
+        filters = MetricRecordService._filter_to_db(record_filter)
+        if filters['ids'] is not None:
+            filters['ids'] = set(filters['ids'])
+        segment_names = [
+            segment.name for segment in get_archive_segments(db, project_id)
+            if (filters['start'] is None or segment.max_timestamp is None or segment.max_timestamp >= filters['start'])
+            and (filters['end'] is None or segment.min_timestamp is None or segment.min_timestamp <= filters['end'])
+        ]
+        if not segment_names:
+            return 0
+        rows = read_archived_rows(project_id, segment_names, ['id', 'model_name', 'model_version', 'timestamp'])
+        return sum(1 for row in rows if ArchiveService._matches(row, filters))
+    
+    @staticmethod
+    def is_archived_record(db: Session, project_id: str, metric_id: str) -> bool:
+        """Whether a record of a project lives in one of its archive segments."""
+        segment_names = [segment.name for segment in get_archive_segments(db, project_id)]
+        return any(row['id'] == metric_id for row in read_archived_rows(project_id, segment_names, ['id']))
+    
+    @staticmethod
+    def start_archive(project_id: str, record_count: int) -> Job:
+        """Move a project's records into archive segments on a background job."""
+        def archive(job: Job) -> dict:
+            db = SessionLocal()
+            try:
+                # Bounded by the count at start, so records posted meanwhile cannot keep the job running
+                segments = 0
+                while job.done < record_count:
+                    rows = fetch_metric_rows(db, project_id, min(ARCHIVE_SEGMENT_ROWS, record_count - job.done))
+                    if not rows:
+                        break
+                    # The file is written first; until the catalog commit lists it, it is ignored
+                    name = new_segment_name()
+                    size = write_segment(project_archive_dir(project_id) / name, rows)
+                    try:
+                        commit_archived_segment(db, project_id, name, rows, size)
+                    except Exception:
+                        remove_segment(project_id, name)
+                        raise
+                    segments += 1
+                    job.advance(len(rows))
+                return {'projectId': project_id, 'archivedRecords': job.done, 'segments': segments}
+            finally:
+                db.close()
+        
+        return jobs.submit("project_archive", f"Archive project {project_id}", archive, total=record_count,
+                           resource=ArchiveService.job_resource(project_id))
+    
+    @staticmethod
+    def start_restore(project_id: str, record_count: int) -> Job:
+        """Move a project's archived records back into the database on a background job."""
+        def restore(job: Job) -> dict:
+            db = SessionLocal()
+            try:
+                segments = [(segment.id, segment.name) for segment in get_archive_segments(db, project_id)]
+                for segment_id, name in segments:
+                    rows = read_archived_rows(project_id, [name])
+                    commit_restored_segment(db, project_id, segment_id, rows)
+                    # Only unlinked once the catalog no longer lists it
+                    remove_segment(project_id, name)
+                    job.advance(len(rows))
+                return {'projectId': project_id, 'restoredRecords': job.done}
+            finally:
+                db.close()
+        
+        return jobs.submit("project_restore", f"Restore project {project_id}", restore, total=record_count,
+                           resource=ArchiveService.job_resource(project_id))
+
+
+# Record fields a dataset column can be imported into
+IMPORT_METRIC_FIELDS = {
+    'accuracy': 'accuracy',
+    'loss': 'loss',
+    'precision': 'precision',
+    'recall': 'recall',
+    'f1Score': 'f1_score',
+}
+
+
+def _parse_number(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if number == number else None
+
+
+def _timestamp_parser(timestamp_format: Optional[str]) -> Callable[[str], Optional[datetime]]:
+    """Parser for one timestamp cell; returns None for cells it cannot read."""
+    def parse(value: str) -> Optional[datetime]:
+        try:
+            if timestamp_format:
+                return datetime.strptime(value, timestamp_format)
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return datetime.utcfromtimestamp(float(value))
+        except (ValueError, OverflowError, OSError):
+            return None
+    return parse
+
+
+class DatasetImportService:
+    """Service for loading dataset rows into project metric records."""
+    
+    @staticmethod
+    def validate(request: DatasetImportRequest, dataset: Dict[str, Any]) -> Optional[str]:
+        """Why the request cannot be applied to the dataset, or None if it can."""
+        mapped = [request.timestampColumn, request.modelNameColumn, request.modelVersionColumn]
+        mapped += list(request.metricColumns.values()) + request.additionalColumns
+        unknown = [column for column in mapped if column is not None and column not in dataset['columns']]
+        if unknown:
+            return f"Unknown dataset columns: {', '.join(unknown)}"
+        fields = [field for field in request.metricColumns if field not in IMPORT_METRIC_FIELDS]
+        if fields:
+            return f"Unknown metric fields: {', '.join(fields)}; expected {', '.join(IMPORT_METRIC_FIELDS)}"
+        if not request.modelNameColumn and not request.modelName:
+            return "Either modelNameColumn or modelName is required"
+        return None
+    
+    @staticmethod
+    def convert_chunk(project_id: str, request: DatasetImportRequest, chunk: List[List[str]],
+                      parse_timestamp: Callable[[str], Optional[datetime]]) -> Dict[str, list]:
+        """Turn dataset rows (in ``import_columns`` order) into ``project_metrics`` columns.
+        
+        Conversion runs column by column over the whole chunk, so each column's parser is
+        applied in one tight ``map`` instead of per-cell dispatch. Rows without a readable
+        timestamp or model name are dropped.
+        """
+        source = iter(zip(*chunk))
+        size = len(chunk)
+        timestamps = list(map(parse_timestamp, next(source)))
+        model_names = list(next(source)) if request.modelNameColumn else [request.modelName] * size
+        model_versions = [value or None for value in next(source)] if request.modelVersionColumn else [None] * size
+        columns = {
+            'timestamp': timestamps,
+            'model_name': model_names,
+            'model_version': model_versions,
+        }
+        for field in request.metricColumns:
+            columns[IMPORT_METRIC_FIELDS[field]] = list(map(_parse_number, next(source)))
+        if request.additionalColumns:
+            extras = [[_parse_number(value) if value else None for value in next(source)]
+                      for _ in request.additionalColumns]
+            encode = json.JSONEncoder().encode
+            columns['additional_metrics'] = [
+                encode(additional) if additional else None
+                for additional in ({name: value for name, value in zip(request.additionalColumns, values)
+                                    if value is not None} for values in zip(*extras))
+            ]
+        
+        keep = [timestamp is not None and bool(model_name) for timestamp, model_name in zip(timestamps, model_names)]
+        if not all(keep):
+            columns = {name: list(compress(values, keep)) for name, values in columns.items()}
+        count = len(columns['timestamp'])
+        # One random id per chunk with a row suffix; a uuid4 per row would dominate conversion time
+        chunk_id = f"{project_id}-{uuid.uuid4()}"
+        columns['id'] = [f"{chunk_id}-{i}" for i in range(count)]
+        columns['project_id'] = [project_id] * count
+        return columns
+    
+    @staticmethod
+    def import_columns(request: DatasetImportRequest) -> List[str]:
+        """Dataset columns read by an import, in the order ``convert_chunk`` expects."""
+        columns = [request.timestampColumn]
+        if request.modelNameColumn:
+            columns.append(request.modelNameColumn)
+        if request.modelVersionColumn:
+            columns.append(request.modelVersionColumn)
+        return columns + list(request.metricColumns.values()) + list(request.additionalColumns)
+    
+    @staticmethod
+    def start_import(project_id: str, request: DatasetImportRequest, dataset: Dict[str, Any]) -> Job:
+        """Insert a dataset's rows as metric records of a project on a background job."""
+        def run_import(job: Job) -> dict:
+            dataset_service = DatasetService()
+            parse_timestamp = _timestamp_parser(request.timestampFormat)
+            rows = dataset_service.iter_rows(dataset, DatasetImportService.import_columns(request))
+            db = SessionLocal()
+            imported = skipped = 0
+            try:
+                while True:
+                    chunk = [row for _, row in zip(range(DATASET_IMPORT_CHUNK_ROWS), rows)]
+                    if not chunk:
+                        break
+                    columns = DatasetImportService.convert_chunk(project_id, request, chunk, parse_timestamp)
+                    # One transaction per chunk, so a failure keeps every chunk committed before it
+                    count = insert_metric_columns(db, project_id, columns)
+                    imported += count
+                    skipped += len(chunk) - count
+                    job.advance(len(chunk))
+                return {'projectId': project_id, 'datasetId': request.datasetId,
+                        'importedRecords': imported, 'skippedRows': skipped}
+            finally:
+                db.close()
+        
+        return jobs.submit("dataset_import", f"Import dataset {dataset['filename']} into project {project_id}",
+                           run_import, total=dataset['samples'])
+
+
+class SearchService:
+    """Service for full-text search over projects, models, model versions and metric settings."""
+    
+    @staticmethod
+    def search(db: Session, query: str, kinds: Optional[List[str]] = None, project_id: Optional[str] = None,
+               limit: int = 20) -> List[SearchHit]:
+        """Projects, models, versions and metric settings matching every term of ``query`` as a prefix."""
+        match = match_query(query)
+        if match is None:
+            return []
+        return [
+            SearchHit(
+                kind=kind,
+                projectId=hit_project_id,
+                projectName=project_name,
+                modelName=model_name or None,
+                modelVersion=model_version or None,
+                metricId=metric_id or None,
+                title=title,
+                detail=body or None,
+                score=-rank,
+            )
+            for kind, hit_project_id, project_name, model_name, model_version, metric_id, title, body, rank
+            in search_documents(db, match, kinds, project_id, limit)
+        ]
+    
+    @staticmethod
+    def rebuild_index(db: Session) -> int:
+        """Recreate every search document, including models that only exist in archived segments."""
+        archived_models = set()
+        for project_id, segment_names in get_archived_segment_names(db).items():
+            for row in read_archived_rows(project_id, segment_names, ['model_name', 'model_version']):
+                archived_models.add((project_id, row['model_name'], row['model_version']))
+        return rebuild_search_documents(db, list(archived_models))
+    
+    @staticmethod
+    def ensure_index(db: Session) -> bool:
+        """Rebuild the search documents and index when they are missing or out of step; returns whether it did.
+        
+        Databases from before search existed have projects but no documents, and databases written
+        without the FTS5 triggers have documents the index does not hold.
+        """
+        if (has_search_documents(db) or not has_projects(db)) and search_index_in_sync(db):
+            return False
+        SearchService.rebuild_index(db)
+        return True
+
+
+class SchemaService:
+    """Service for bringing databases created by older releases up to date."""
+    
+    @staticmethod
+    def start_upgrade() -> Job:
+        """Bring a database created by an older release up to date on a background job
+        
+        Builds the indexes ``create_tables`` leaves out for existing tables and the search documents
+        and index when they are missing or out of step. Searches and queries keep working meanwhile.
+        """
+        def upgrade(job: Job) -> dict:
+            indexes = upgrade_schema()
+            db = SessionLocal()
+            try:
+                return {'indexes': indexes, 'searchIndexRebuilt': SearchService.ensure_index(db)}
+            finally:
+                db.close()
+        
+        return jobs.submit("schema_upgrade", "Build missing indexes and the search index", upgrade)
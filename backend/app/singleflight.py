@@ -0,0 +1,94 @@
+"""
+Single-flight coalescing of concurrent identical computations.
+
+When many identical requests arrive at once (a dashboard reloading for many
+viewers), the first caller for a key runs the computation and every caller
+that arrives while it is in flight waits for and shares its result, so the
+work runs once instead of once per request. Waiting is a plain thread
+``Event``, which suits the sync routes FastAPI runs in its threadpool.
+"""
+
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .config import SINGLE_FLIGHT_TIMEOUT_SECONDS
+from .instrumentation import registry
+
+
+class _Call:
+    """One in-flight computation and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces calls with equal keys that overlap in time.
+
+    Only calls that overlap are shared; nothing is cached once a call
+    finishes. Include a data version in the key so that a caller arriving
+    after a write does not join a computation that started before it. A
+    waiter that times out runs the computation itself rather than failing.
+    """
+
+    def __init__(self, timeout: Optional[float] = SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``fn()`` unless an identical call is in flight, then share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            return fn()
+        with self._lock:
+            self.shared += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def wrap(self, key: Callable[..., Hashable], timeout: Optional[float] = None):
+        """Decorator form; ``key`` maps the call's arguments to its coalescing key."""
+
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                return self.do(key(*args, **kwargs), lambda: fn(*args, **kwargs), timeout)
+
+            return wrapper
+
+        return decorator
+
+
+flights = SingleFlight()
+
+registry.register_gauge("chronology_single_flight_executions", "Coalesced computations actually executed.",
+                        lambda: flights.executions)
+registry.register_gauge("chronology_single_flight_shared", "Callers served by another caller's in-flight computation.",
+                        lambda: flights.shared)
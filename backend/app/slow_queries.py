@@ -0,0 +1,133 @@
+"""
+Opt-in slow-query log for the Chronology database engine.
+
+Statements slower than a configurable threshold are recorded together with
+their redacted parameters, the route that issued them and SQLite's
+``EXPLAIN QUERY PLAN`` output. Entries are kept in a bounded ring buffer that
+the admin endpoint exposes, so full table scans show up as data grows
+without attaching a profiler.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .instrumentation import current_request
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")  # a scan without "USING ... INDEX" reads the whole table
+
+
+def _redact(parameters: Any) -> Any:
+    """Replace parameter values by their type names, keeping the shape."""
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def _redact_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, dict)):
+        return _redact(value)
+    return f"<{type(value).__name__}>"
+
+
+def _query_plan(raw_connection: sqlite3.Connection, statement: str, parameters: Any) -> List[str]:
+    """Run EXPLAIN QUERY PLAN on the raw connection, bypassing engine events."""
+    cursor = sqlite3.Cursor(raw_connection)
+    try:
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    finally:
+        cursor.close()
+
+    # Indent each step under its parent to keep the tree readable
+    depth: Dict[int, int] = {}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node_id] + detail)
+    return plan
+
+
+class SlowQueryLog:
+    """Bounded, thread-safe ring buffer of slow statements."""
+
+    def __init__(self, threshold_ms: float, capacity: int):
+        self.threshold_ms = threshold_ms
+        self.capacity = capacity
+        self._entries: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.total_recorded = 0
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.total_recorded += 1
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent entries first."""
+        with self._lock:
+            snapshot = list(self._entries)
+        snapshot.reverse()
+        return snapshot[:limit] if limit else snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def install(self, engine: Engine) -> None:
+        """Attach the timing hooks to an engine."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("chronology_slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed_ms = (time.perf_counter() - conn.info["chronology_slow_query_start"].pop()) * 1000
+            if elapsed_ms < self.threshold_ms:
+                return
+
+            # executemany passes a list of parameter sets; the first one is representative
+            sample = parameters[0] if executemany and parameters else parameters
+            plan: List[str] = []
+            if _EXPLAINABLE.match(statement):
+                try:
+                    plan = _query_plan(cursor.connection, statement, sample)
+                except sqlite3.Error as e:
+                    plan = [f"<explain failed: {e}>"]
+
+            request = current_request()
+            self.record({
+                "timestamp": datetime.utcnow().isoformat(),
+                "durationMs": round(elapsed_ms, 3),
+                "sql": statement,
+                "parameters": _redact(sample),
+                "executemany": executemany,
+                "route": f"{request.method} {request.route}" if request else None,
+                "plan": plan,
+                "fullScans": sorted({m.group(1) for m in (_FULL_SCAN.match(step.strip()) for step in plan) if m}),
+            })
+
+
+slow_query_log: Optional[SlowQueryLog] = None
+
+
+def enable_slow_query_log(engine: Engine, threshold_ms: float, capacity: int) -> SlowQueryLog:
+    """Create the process-wide slow-query log and hook it into ``engine``."""
+    global slow_query_log
+    slow_query_log = SlowQueryLog(threshold_ms, capacity)
+    slow_query_log.install(engine)
+    return slow_query_log
@@ -9,25 +9,71 @@ This module contains all database operations for:
 """
 
 import json
+import re
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from .models import ProjectDB, ProjectMetricDB, MetricSettingsDB, Project, ProjectMetric, MetricSettings
+from typing import Dict, List, Optional
+from sqlalchemy import (
+    insert, update, delete, select, union, func, literal, literal_column, Index, case, cast, String, tuple_, text,
+    bindparam
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.schema import CreateIndex
+from .models import (
+    ProjectDB, ProjectMetricDB, MetricSettingsDB, RetentionPolicyDB, MetricRollupDB, ArchiveSegmentDB,
+    MetricStreamStatsDB, MetricAnomalyDB, SearchDocumentDB, Project, ProjectMetric, MetricSettings, MetricRollupStats,
+    MetricAnomaly
+)
+from .anomaly import new_state, observe, is_regression
+from .search import TITLE_WEIGHT, BODY_WEIGHT
+from .config import ANOMALY_DETECTION_ENABLED, ANOMALY_Z_THRESHOLD
+from .timeseries import to_epoch, from_epoch
+from .cache import touch_projects
 
 # Database operations for projects
 def create_project(db: Session, project_data: dict) -> ProjectDB:
     db_project = ProjectDB(**project_data)
     db.add(db_project)
+    db.flush()
+    _index_projects(db, [project_data])
     db.commit()
+    touch_projects(project_data['id'])
     db.refresh(db_project)
     return db_project
 
+def create_projects(db: Session, projects_data: List[dict], commit: bool = True) -> int:
+    """Insert many projects with a single executemany and one commit
+    
+    With ``commit=False`` the caller commits, and then calls ``touch_projects`` itself.
+    """
+    if not projects_data:
+        return 0
+
+    db.execute(insert(ProjectDB), projects_data)
+    _index_projects(db, projects_data)
+    if commit:
+        db.commit()
+        touch_projects(*{project['id'] for project in projects_data})
+    return len(projects_data)
+
 def get_all_projects(db: Session) -> List[ProjectDB]:
     return db.query(ProjectDB).all()
 
 def get_project_by_id(db: Session, project_id: str) -> Optional[ProjectDB]:
     return db.query(ProjectDB).filter(ProjectDB.id == project_id).first()
 
+def has_projects(db: Session) -> bool:
+    """Whether any project exists, without loading them"""
+    return db.query(ProjectDB.id).limit(1).first() is not None
+
+def get_project_ids_with_prefix(db: Session, prefix: str) -> List[str]:
+    rows = db.execute(select(ProjectDB.id).where(ProjectDB.id.startswith(prefix, autoescape=True)))
+    return [project_id for (project_id,) in rows]
+
+def project_exists(db: Session, project_id: str) -> bool:
+    """Cheap primary key probe that does not load the project's records"""
+    return db.query(ProjectDB.id).filter(ProjectDB.id == project_id).first() is not None
+
 def update_project(db: Session, project_id: str, project_data: dict) -> Optional[ProjectDB]:
     db_project = get_project_by_id(db, project_id)
     if not db_project:
@@ -38,27 +84,101 @@ def update_project(db: Session, project_id: str, project_data: dict) -> Optional
             setattr(db_project, key, value)
     
     db_project.updated_at = datetime.utcnow()
+    _index_projects(db, [{'id': project_id, 'name': db_project.name, 'description': db_project.description}])
     db.commit()
+    touch_projects(project_id)
     db.refresh(db_project)
     return db_project
 
 def delete_project(db: Session, project_id: str) -> bool:
-    db_project = get_project_by_id(db, project_id)
-    if not db_project:
-        return False
-    
-    db.delete(db_project)
+    """Delete a project and its children with set-based statements in one transaction"""
+    try:
+        # Children are deleted explicitly so databases created before ON DELETE CASCADE behave the same
+        db.execute(delete(ProjectMetricDB).where(ProjectMetricDB.project_id == project_id)
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(MetricSettingsDB).where(MetricSettingsDB.project_id == project_id)
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(MetricAnomalyDB).where(MetricAnomalyDB.project_id == project_id)
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(MetricStreamStatsDB).where(MetricStreamStatsDB.project_id == project_id)
+                   .execution_options(synchronize_session=False))
+        db.execute(delete(SearchDocumentDB).where(SearchDocumentDB.project_id == project_id)
+                   .execution_options(synchronize_session=False))
+        deleted = db.execute(delete(ProjectDB).where(ProjectDB.id == project_id)
+                             .execution_options(synchronize_session=False)).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    touch_projects(project_id)
+    return deleted > 0
+
+def count_project_metrics(db: Session, project_id: str) -> int:
+    return db.query(func.count(ProjectMetricDB.id)).filter(ProjectMetricDB.project_id == project_id).scalar()
+
+def purge_project_metrics_chunk(db: Session, project_id: str, chunk_size: int) -> int:
+    """Delete up to ``chunk_size`` records of a project in its own short transaction"""
+    chunk = select(ProjectMetricDB.id).where(ProjectMetricDB.project_id == project_id).limit(chunk_size)
+    deleted = db.execute(delete(ProjectMetricDB).where(ProjectMetricDB.id.in_(chunk))
+                         .execution_options(synchronize_session=False)).rowcount
     db.commit()
-    return True
+    touch_projects(project_id)
+    return deleted
 
 # Database operations for metrics
 def create_metric(db: Session, metric_data: dict) -> ProjectMetricDB:
     db_metric = ProjectMetricDB(**metric_data)
     db.add(db_metric)
+    db.flush()
+    update_stream_stats(db, [metric_data])
+    _index_models(db, [_model_key(metric_data)])
     db.commit()
+    touch_projects(metric_data['project_id'])
     db.refresh(db_metric)
     return db_metric
 
+def create_metrics(db: Session, metrics_data: List[dict], commit: bool = True) -> int:
+    """Insert many metric records with a single executemany and one commit (see ``create_projects``)"""
+    if not metrics_data:
+        return 0
+
+    db.execute(insert(ProjectMetricDB), metrics_data)
+    update_stream_stats(db, metrics_data)
+    _index_models(db, map(_model_key, metrics_data))
+    if commit:
+        db.commit()
+        touch_projects(*{metric['project_id'] for metric in metrics_data})
+    return len(metrics_data)
+
+def insert_metric_columns(db: Session, project_id: str, columns: Dict[str, list]) -> int:
+    """Insert metric records given column by column (``project_metrics`` column -> values) in one commit
+    
+    Each column passes through its type's bind processor in one pass and the rows go to the driver
+    as a single executemany, skipping the ORM's per-row parameter handling.
+    """
+    table = ProjectMetricDB.__table__
+    names = list(columns)
+    count = len(columns[names[0]]) if names else 0
+    if not count:
+        return 0
+    
+    connection = db.connection()
+    values = []
+    for name in names:
+        processor = table.c[name].type.bind_processor(connection.dialect)
+        values.append(list(map(processor, columns[name])) if processor else columns[name])
+    quote = connection.dialect.identifier_preparer.quote
+    statement = (f"INSERT INTO {quote(table.name)} ({', '.join(map(quote, names))}) "
+                 f"VALUES ({', '.join('?' * len(names))})")
+    connection.exec_driver_sql(statement, list(zip(*values)))
+    update_stream_stats(db, (dict(zip(names, row)) for row in zip(*columns.values())))
+    model_versions = columns.get('model_version') or [None] * count
+    _index_models(db, ((project_id, model_name, model_version)
+                       for model_name, model_version in zip(columns['model_name'], model_versions)))
+    db.commit()
+    touch_projects(project_id)
+    return count
+
 def get_project_metrics(db: Session, project_id: str) -> List[ProjectMetricDB]:
     return db.query(ProjectMetricDB).filter(ProjectMetricDB.project_id == project_id).all()
 
@@ -74,7 +194,13 @@ def update_metric(db: Session, metric_id: str, metric_data: dict) -> Optional[Pr
         if hasattr(db_metric, key):
             setattr(db_metric, key, value)
     
+    project_id = db_metric.project_id
+    if 'model_name' in metric_data or 'model_version' in metric_data:
+        db.flush()
+        _index_models(db, [(project_id, db_metric.model_name, db_metric.model_version)])
+        _prune_model_documents(db, project_id)
     db.commit()
+    touch_projects(project_id)
     db.refresh(db_metric)
     return db_metric
 
@@ -83,33 +209,199 @@ def delete_metric(db: Session, metric_id: str) -> bool:
     if not db_metric:
         return False
     
+    project_id = db_metric.project_id
     db.delete(db_metric)
+    db.flush()
+    _prune_model_documents(db, project_id)
     db.commit()
+    touch_projects(project_id)
     return True
 
+# Set-based operations on metric records selected by a filter
+BULK_ID_CHUNK_SIZE = 10000  # stays well below SQLite's bound parameter limit
+
+def _metric_filter_clauses(project_id: str, filters: dict) -> list:
+    clauses = [ProjectMetricDB.project_id == project_id]
+    if filters.get('model_name') is not None:
+        clauses.append(ProjectMetricDB.model_name == filters['model_name'])
+    if filters.get('model_version') is not None:
+        clauses.append(ProjectMetricDB.model_version == filters['model_version'])
+    if filters.get('start') is not None:
+        clauses.append(ProjectMetricDB.timestamp >= filters['start'])
+    if filters.get('end') is not None:
+        clauses.append(ProjectMetricDB.timestamp <= filters['end'])
+    return clauses
+
+def rollup_record_id(project_id: str, model_name: str, model_version: str, bucket_start: datetime) -> str:
+    """Id of the record a rollup bucket is served as"""
+    return f"{project_id}-rollup-{model_name}-{model_version}-{int(to_epoch(bucket_start))}"
+
+def get_rollup_buckets_by_filter(db: Session, project_id: str, filters: dict) -> List[tuple]:
+    """``(model_name, model_version, bucket_start)`` of the rollup buckets matching ``filters``
+    
+    A bucket matches like the record it is served as: by its start and by its record id.
+    """
+    clauses = [MetricRollupDB.project_id == project_id]
+    if filters.get('model_name') is not None:
+        clauses.append(MetricRollupDB.model_name == filters['model_name'])
+    if filters.get('model_version') is not None:
+        clauses.append(MetricRollupDB.model_version == filters['model_version'])
+    if filters.get('start') is not None:
+        clauses.append(MetricRollupDB.bucket_start >= filters['start'])
+    if filters.get('end') is not None:
+        clauses.append(MetricRollupDB.bucket_start <= filters['end'])
+    buckets = [tuple(row) for row in db.execute(
+        select(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start)
+        .where(*clauses).distinct()
+    )]
+    if filters.get('ids') is not None:
+        ids = set(filters['ids'])
+        buckets = [bucket for bucket in buckets if rollup_record_id(project_id, *bucket) in ids]
+    return buckets
+
+def _delete_rollup_buckets(db: Session, project_id: str, buckets: List[tuple]) -> None:
+    key = tuple_(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start)
+    step = BULK_ID_CHUNK_SIZE // 3  # three bound parameters per bucket
+    for offset in range(0, len(buckets), step):
+        db.execute(
+            delete(MetricRollupDB)
+            .where(MetricRollupDB.project_id == project_id, key.in_(buckets[offset:offset + step]))
+            .execution_options(synchronize_session=False)
+        )
+
+def _apply_metric_filter(db: Session, project_id: str, filters: dict, build_statement,
+                         models_changed: bool = False, delete_rollups: bool = False) -> int:
+    """Run one set-based statement per id chunk (or just one without ids) in a single transaction
+
+    ``models_changed`` says the statement may remove or rename models, so the search documents of
+    the project's models are brought up to date before committing. ``delete_rollups`` also deletes
+    the matching rollup buckets, each counted as the one record it is served as.
+    """
+    clauses = _metric_filter_clauses(project_id, filters)
+    ids = filters.get('ids')
+    affected = 0
+    try:
+        if ids is None:
+            affected = db.execute(build_statement(clauses)).rowcount
+        else:
+            for offset in range(0, len(ids), BULK_ID_CHUNK_SIZE):
+                chunk = ids[offset:offset + BULK_ID_CHUNK_SIZE]
+                statement = build_statement(clauses + [ProjectMetricDB.id.in_(chunk)])
+                affected += db.execute(statement).rowcount
+        if delete_rollups:
+            buckets = get_rollup_buckets_by_filter(db, project_id, filters)
+            _delete_rollup_buckets(db, project_id, buckets)
+            affected += len(buckets)
+        if affected and models_changed:
+            _refresh_model_documents(db, project_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    touch_projects(project_id)
+    return affected
+
+def delete_metrics_by_filter(db: Session, project_id: str, filters: dict) -> int:
+    """Delete all metric records and rollup buckets of a project matching ``filters``; returns the affected count"""
+    return _apply_metric_filter(
+        db, project_id, filters,
+        lambda clauses: delete(ProjectMetricDB).where(*clauses).execution_options(synchronize_session=False),
+        models_changed=True, delete_rollups=True
+    )
+
+def update_metrics_by_filter(db: Session, project_id: str, filters: dict, values: dict) -> int:
+    """Apply ``values`` to all metric records of a project matching ``filters``; returns the affected count"""
+    if not values:
+        return 0
+    return _apply_metric_filter(
+        db, project_id, filters,
+        lambda clauses: update(ProjectMetricDB).where(*clauses).values(**values).execution_options(
+            synchronize_session=False),
+        models_changed='model_name' in values or 'model_version' in values
+    )
+
 # Database operations for metric settings
 def create_metric_settings(db: Session, settings_data: dict) -> MetricSettingsDB:
     db_settings = MetricSettingsDB(**settings_data)
     db.add(db_settings)
+    db.flush()
+    _sync_metric_documents(db, settings_data['project_id'])
     db.commit()
+    touch_projects(settings_data['project_id'])
     db.refresh(db_settings)
     return db_settings
 
+def create_metric_settings_batch(db: Session, settings_list: List[dict], commit: bool = True) -> int:
+    """Insert many metric settings with a single executemany and one commit (see ``create_projects``)"""
+    if not settings_list:
+        return 0
+
+    db.execute(insert(MetricSettingsDB), settings_list)
+    for project_id in {settings['project_id'] for settings in settings_list}:
+        _sync_metric_documents(db, project_id)
+    if commit:
+        db.commit()
+        touch_projects(*{settings['project_id'] for settings in settings_list})
+    return len(settings_list)
+
 def get_project_metric_settings(db: Session, project_id: str) -> List[MetricSettingsDB]:
-    return db.query(MetricSettingsDB).filter(MetricSettingsDB.project_id == project_id).all()
+    return db.query(MetricSettingsDB).filter(MetricSettingsDB.project_id == project_id).order_by(
+        MetricSettingsDB.id).all()
+
+SETTING_FIELDS = ('name', 'type', 'color', 'unit', 'enabled', 'min_value', 'max_value', 'description')
 
 def update_project_metric_settings(db: Session, project_id: str, settings_list: List[dict]) -> List[MetricSettingsDB]:
-    # Delete existing settings for this project
-    db.query(MetricSettingsDB).filter(MetricSettingsDB.project_id == project_id).delete()
+    """Make a project's settings match ``settings_list`` by diffing on metric_id.
     
-    # Create new settings
-    new_settings = []
+    Only changed rows are updated, new ones inserted and missing ones deleted, all in one
+    transaction; unchanged settings keep their row and cost no writes. Settings are read back in
+    row order, so when the request reorders them every row is rewritten in the requested order.
+    """
+    desired = {}
     for settings_data in settings_list:
-        settings_data['project_id'] = project_id
-        db_settings = create_metric_settings(db, settings_data)
-        new_settings.append(db_settings)
+        desired[settings_data['metric_id']] = dict(settings_data, project_id=project_id)
+    
+    existing = {}
+    stale_ids = []
+    for db_setting in get_project_metric_settings(db, project_id):
+        if db_setting.metric_id in desired and db_setting.metric_id not in existing:
+            existing[db_setting.metric_id] = db_setting
+        else:
+            stale_ids.append(db_setting.id)  # removed from the config, or a duplicate row
+    
+    # The diff keeps existing rows in place and appends new ones; any other order needs new rows
+    if list(desired) != list(existing) + [metric_id for metric_id in desired if metric_id not in existing]:
+        stale_ids.extend(db_setting.id for db_setting in existing.values())
+        existing = {}
     
-    return new_settings
+    try:
+        if stale_ids:
+            db.execute(delete(MetricSettingsDB).where(MetricSettingsDB.id.in_(stale_ids))
+                       .execution_options(synchronize_session=False))
+        
+        result = []
+        for metric_id, settings_data in desired.items():
+            db_setting = existing.get(metric_id)
+            if db_setting is None:
+                db_setting = MetricSettingsDB(**settings_data)
+                db.add(db_setting)
+            else:
+                for field in SETTING_FIELDS:
+                    value = settings_data.get(field)
+                    if getattr(db_setting, field) != value:
+                        setattr(db_setting, field, value)
+            result.append(db_setting)
+        
+        if stale_ids or db.new or db.dirty:
+            db.flush()
+            _sync_metric_documents(db, project_id)
+            db.commit()
+            touch_projects(project_id)
+    except Exception:
+        db.rollback()
+        raise
+    
+    return result
 
 def delete_metric_setting(db: Session, project_id: str, metric_id: str) -> bool:
     """Delete a specific metric setting from a project"""
@@ -122,10 +414,1034 @@ def delete_metric_setting(db: Session, project_id: str, metric_id: str) -> bool:
         return False
     
     db.delete(db_setting)
+    db.flush()
+    _sync_metric_documents(db, project_id)
     db.commit()
+    touch_projects(project_id)
     return True
 
+# Aggregate queries over metric records
+STANDARD_METRIC_COLUMNS = {
+    'accuracy': ProjectMetricDB.accuracy,
+    'loss': ProjectMetricDB.loss,
+    'precision': ProjectMetricDB.precision,
+    'recall': ProjectMetricDB.recall,
+    'f1Score': ProjectMetricDB.f1_score,
+}
+
+_METRIC_KEY = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+def is_supported_metric(metric_id: str) -> bool:
+    """Standard columns, or additionalMetrics keys safe to inline into a JSON path"""
+    return metric_id in STANDARD_METRIC_COLUMNS or bool(_METRIC_KEY.match(metric_id))
+
+def metric_value_expression(metric_id: str):
+    """SQL expression for a metric: its own column, or its key inside additional_metrics.
+    
+    The JSON path is rendered inline (not as a bound parameter) so it can match an expression index.
+    """
+    column = STANDARD_METRIC_COLUMNS.get(metric_id)
+    if column is not None:
+        return column
+    if not is_supported_metric(metric_id):
+        raise ValueError(f"Unsupported metric id: {metric_id}")
+    return func.json_extract(ProjectMetricDB.additional_metrics, literal_column(f"'$.\"{metric_id}\"'"))
+
+RANK_INDEX_PREFIX = "ix_project_metrics_rank_"
+
+def rank_index_names(metric_id: str) -> tuple:
+    """Names of the per-project and cross-project ranking indexes of a metric.
+    
+    ``_`` and ``-`` are escaped and the two kinds have disjoint prefixes, so no two metric ids share
+    an index name.
+    """
+    suffix = metric_id.replace("_", "__").replace("-", "_h")
+    return f"{RANK_INDEX_PREFIX}project_{suffix}", f"{RANK_INDEX_PREFIX}all_{suffix}"
+
+def get_configured_metric_ids(db: Session) -> List[str]:
+    """Distinct metric ids of every project's settings that can be ranked"""
+    rows = db.execute(select(MetricSettingsDB.metric_id).distinct().order_by(MetricSettingsDB.metric_id))
+    return [metric_id for (metric_id,) in rows if is_supported_metric(metric_id)]
+
+def sync_metric_indexes(db: Session, metric_ids: List[str]) -> dict:
+    """Create the ranking indexes of ``metric_ids`` and drop the ranking indexes of every other metric.
+    
+    ``(project_id, <metric>)`` serves per-project rankings and ``(<metric>)`` cross-project ones.
+    Every index is a full build and adds to the cost of each write, so this is only run as an
+    explicit maintenance step, never by a read.
+    """
+    wanted = {}
+    for metric_id in metric_ids:
+        value = metric_value_expression(metric_id)
+        project_index, all_index = rank_index_names(metric_id)
+        wanted[project_index] = Index(project_index, ProjectMetricDB.project_id, value)
+        wanted[all_index] = Index(all_index, value)
+    
+    with db.get_bind().begin() as connection:
+        existing = {
+            name for (name,) in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+            if name.startswith(RANK_INDEX_PREFIX)
+        }
+        dropped = sorted(existing - set(wanted))
+        for name in dropped:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+        created = sorted(set(wanted) - existing)
+        for name in created:
+            connection.execute(CreateIndex(wanted[name], if_not_exists=True))
+    return {'created': created, 'dropped': dropped}
+
+def get_top_metrics(
+    db: Session,
+    metric_id: str,
+    descending: bool,
+    limit: int,
+    project_id: Optional[str] = None,
+    partition: Optional[str] = None,
+    per_group: int = 1,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[tuple]:
+    """Top ``limit`` records by a metric as ``(ProjectMetricDB, value)`` pairs.
+    
+    With ``partition`` set to ``'model'`` or ``'project'`` only the best ``per_group`` records of
+    each model (within its project) or project compete, ranked by a ROW_NUMBER window.
+    """
+    value = metric_value_expression(metric_id)
+    clauses = [value.isnot(None)]
+    if metric_id not in STANDARD_METRIC_COLUMNS:
+        # JSON values may be text; SQLite sorts text above every number
+        clauses.append(func.typeof(value).in_(['integer', 'real']))
+    if project_id is not None:
+        clauses.append(ProjectMetricDB.project_id == project_id)
+    if start is not None:
+        clauses.append(ProjectMetricDB.timestamp >= start)
+    if end is not None:
+        clauses.append(ProjectMetricDB.timestamp <= end)
+    
+    def ordering(column, timestamp, record_id):
+        return [column.desc() if descending else column.asc(), timestamp.desc(), record_id.asc()]
+    
+    if partition is None:
+        statement = (
+            select(ProjectMetricDB, value.label('value')).where(*clauses)
+            .order_by(*ordering(value, ProjectMetricDB.timestamp, ProjectMetricDB.id)).limit(limit)
+        )
+        return [(row[0], row[1]) for row in db.execute(statement)]
+    
+    partition_by = [ProjectMetricDB.project_id]
+    if partition == 'model':
+        partition_by.append(ProjectMetricDB.model_name)
+    group_rank = func.row_number().over(
+        partition_by=partition_by, order_by=ordering(value, ProjectMetricDB.timestamp, ProjectMetricDB.id)
+    )
+    ranked = select(ProjectMetricDB, value.label('value'), group_rank.label('group_rank')).where(*clauses).subquery()
+    ranked_metric = aliased(ProjectMetricDB, ranked)
+    statement = (
+        select(ranked_metric, ranked.c.value).where(ranked.c.group_rank <= per_group)
+        .order_by(*ordering(ranked.c.value, ranked.c.timestamp, ranked.c.id)).limit(limit)
+    )
+    return [(row[0], row[1]) for row in db.execute(statement)]
+
+def get_top_rollups(
+    db: Session,
+    metric_id: str,
+    descending: bool,
+    limit: int,
+    project_id: Optional[str] = None,
+    partition: Optional[str] = None,
+    per_group: int = 1,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[tuple]:
+    """Top ``limit`` compacted buckets by their mean of a metric as ``(ProjectMetric, value)`` pairs.
+    
+    Buckets compete the way ``get_top_metrics`` ranks raw records, so the two lists can be merged.
+    Each bucket is returned as its full rollup record, with the means of all its metrics.
+    """
+    mean = MetricRollupDB.sum_value / MetricRollupDB.count
+    clauses = [MetricRollupDB.metric_key == metric_id]
+    if project_id is not None:
+        clauses.append(MetricRollupDB.project_id == project_id)
+    if start is not None:
+        clauses.append(MetricRollupDB.bucket_start >= start)
+    if end is not None:
+        clauses.append(MetricRollupDB.bucket_start <= end)
+    
+    def ordering(column, bucket_start, rollup_id):
+        return [column.desc() if descending else column.asc(), bucket_start.desc(), rollup_id.asc()]
+    
+    if partition is None:
+        statement = (
+            select(MetricRollupDB, mean.label('value')).where(*clauses)
+            .order_by(*ordering(mean, MetricRollupDB.bucket_start, MetricRollupDB.id)).limit(limit)
+        )
+    else:
+        partition_by = [MetricRollupDB.project_id]
+        if partition == 'model':
+            partition_by.append(MetricRollupDB.model_name)
+        group_rank = func.row_number().over(
+            partition_by=partition_by, order_by=ordering(mean, MetricRollupDB.bucket_start, MetricRollupDB.id)
+        )
+        ranked = select(MetricRollupDB, mean.label('value'), group_rank.label('group_rank')).where(*clauses).subquery()
+        ranked_rollup = aliased(MetricRollupDB, ranked)
+        statement = (
+            select(ranked_rollup, ranked.c.value).where(ranked.c.group_rank <= per_group)
+            .order_by(*ordering(ranked.c.value, ranked.c.bucket_start, ranked.c.id)).limit(limit)
+        )
+    winners = [(row[0], row[1]) for row in db.execute(statement)]
+    if not winners:
+        return []
+    
+    # The other metrics of each winning bucket make up the rest of its record
+    def bucket(rollup):
+        return (rollup.project_id, rollup.model_name, rollup.model_version, rollup.bucket_start)
+    
+    buckets: Dict[tuple, List[MetricRollupDB]] = {}
+    siblings = db.scalars(select(MetricRollupDB).where(
+        tuple_(MetricRollupDB.project_id, MetricRollupDB.model_name, MetricRollupDB.model_version,
+               MetricRollupDB.bucket_start).in_([bucket(rollup) for rollup, _ in winners])
+    ))
+    for rollup in siblings:
+        buckets.setdefault(bucket(rollup), []).append(rollup)
+    return [(rollups_to_pydantic(buckets[bucket(rollup)])[0], value) for rollup, value in winners]
+
+def get_model_names(db: Session, project_id: str) -> List[str]:
+    """Distinct model names of a project's raw records and rollups, sorted"""
+    names = union(
+        select(ProjectMetricDB.model_name).where(ProjectMetricDB.project_id == project_id),
+        select(MetricRollupDB.model_name).where(MetricRollupDB.project_id == project_id),
+    ).subquery()
+    rows = db.execute(select(names.c.model_name).order_by(names.c.model_name))
+    return [name for (name,) in rows if name]
+
+def get_model_version_summaries(db: Session, project_id: str, metrics: List[tuple]) -> List[dict]:
+    """One row per (model, version) with counts, time range and latest/best value per metric.
+    
+    ``metrics`` holds ``(metric_id, lower_is_better)`` pairs. Everything is computed by a single
+    windowed query over the (project_id, model_name, model_version, timestamp) index.
+    """
+    partition = [ProjectMetricDB.model_name, ProjectMetricDB.model_version]
+    columns = [
+        ProjectMetricDB.model_name,
+        ProjectMetricDB.model_version,
+        func.count().over(partition_by=partition).label('record_count'),
+        func.min(ProjectMetricDB.timestamp).over(partition_by=partition).label('first_timestamp'),
+        func.max(ProjectMetricDB.timestamp).over(partition_by=partition).label('last_timestamp'),
+        func.row_number().over(partition_by=partition, order_by=ProjectMetricDB.timestamp.desc()).label('recency'),
+    ]
+    for i, (metric_id, lower_is_better) in enumerate(metrics):
+        value = metric_value_expression(metric_id)
+        best = func.min(value) if lower_is_better else func.max(value)
+        columns.append(value.label(f'latest_{i}'))
+        columns.append(best.over(partition_by=partition).label(f'best_{i}'))
+    
+    windowed = select(*columns).where(ProjectMetricDB.project_id == project_id).subquery()
+    statement = (
+        select(windowed).where(windowed.c.recency == 1)
+        .order_by(windowed.c.model_name, windowed.c.model_version)
+    )
+    
+    summaries = []
+    for row in db.execute(statement).mappings():
+        summaries.append({
+            'model_name': row['model_name'],
+            'model_version': row['model_version'],
+            'record_count': row['record_count'],
+            'first_timestamp': row['first_timestamp'],
+            'last_timestamp': row['last_timestamp'],
+            'metrics': {
+                metric_id: {'latest': row[f'latest_{i}'], 'best': row[f'best_{i}']}
+                for i, (metric_id, _) in enumerate(metrics)
+            },
+        })
+    return summaries
+
+def get_rollup_version_summaries(db: Session, project_id: str, metrics: List[tuple]) -> List[dict]:
+    """Summaries of a project's compacted ranges, shaped like ``get_model_version_summaries`` rows.
+    
+    A bucket counts as many records as its most frequent metric. A metric's best is the extreme of
+    its bucket minimums or maximums; its latest is the last value of the newest bucket, if that
+    bucket's newest record carried the metric.
+    """
+    directions = dict(metrics)
+    statement = (
+        select(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start,
+               MetricRollupDB.metric_key, MetricRollupDB.count, MetricRollupDB.min_value,
+               MetricRollupDB.max_value, MetricRollupDB.last_value, MetricRollupDB.last_timestamp)
+        .where(MetricRollupDB.project_id == project_id)
+        .order_by(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start)
+    )
+    
+    summaries: Dict[tuple, dict] = {}
+    bucket_counts: Dict[tuple, int] = {}
+    latest: Dict[tuple, tuple] = {}
+    for row in db.execute(statement):
+        key = (row.model_name, row.model_version or None)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = {
+                'model_name': row.model_name,
+                'model_version': row.model_version or None,
+                'record_count': 0,
+                'first_timestamp': row.bucket_start,
+                'last_timestamp': row.last_timestamp,
+                'metrics': {metric_id: {'latest': None, 'best': None} for metric_id in directions},
+            }
+        summary['last_timestamp'] = max(summary['last_timestamp'], row.last_timestamp)
+        bucket = key + (row.bucket_start,)
+        bucket_counts[bucket] = max(bucket_counts.get(bucket, 0), row.count)
+        
+        values = summary['metrics'].get(row.metric_key)
+        if values is None:
+            continue
+        lower = directions[row.metric_key]
+        extreme = row.min_value if lower else row.max_value
+        if values['best'] is None or (extreme < values['best'] if lower else extreme > values['best']):
+            values['best'] = extreme
+        newest = latest.get(key + (row.metric_key,))
+        if newest is None or row.last_timestamp >= newest[0]:
+            latest[key + (row.metric_key,)] = (row.last_timestamp, row.last_value)
+    
+    for (model_name, model_version, _), count in bucket_counts.items():
+        summaries[(model_name, model_version)]['record_count'] += count
+    for (model_name, model_version, metric_id), (timestamp, value) in latest.items():
+        summary = summaries[(model_name, model_version)]
+        if timestamp == summary['last_timestamp']:
+            summary['metrics'][metric_id]['latest'] = value
+    return list(summaries.values())
+
+def get_metric_series(
+    db: Session,
+    project_id: str,
+    metric_id: str,
+    model_names: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[tuple]:
+    """``(model_name, model_version, timestamp, value)`` rows of a metric for some models.
+    
+    Only the four needed columns are read, ordered by model and time, in a single query.
+    """
+    value = metric_value_expression(metric_id)
+    clauses = [ProjectMetricDB.project_id == project_id, ProjectMetricDB.model_name.in_(model_names),
+               value.isnot(None)]
+    if metric_id not in STANDARD_METRIC_COLUMNS:
+        clauses.append(func.typeof(value).in_(['integer', 'real']))
+    if start is not None:
+        clauses.append(ProjectMetricDB.timestamp >= start)
+    if end is not None:
+        clauses.append(ProjectMetricDB.timestamp <= end)
+    
+    statement = (
+        select(ProjectMetricDB.model_name, ProjectMetricDB.model_version, ProjectMetricDB.timestamp, value)
+        .where(*clauses).order_by(ProjectMetricDB.model_name, ProjectMetricDB.timestamp)
+    )
+    rows = [tuple(row) for row in db.execute(statement)]
+    
+    # Compacted ranges contribute their bucket means
+    rollup_clauses = [MetricRollupDB.project_id == project_id, MetricRollupDB.model_name.in_(model_names),
+                      MetricRollupDB.metric_key == metric_id]
+    if start is not None:
+        rollup_clauses.append(MetricRollupDB.bucket_start >= start)
+    if end is not None:
+        rollup_clauses.append(MetricRollupDB.bucket_start <= end)
+    rollup_rows = [
+        (model_name, model_version or None, bucket_start, sum_value / count)
+        for model_name, model_version, bucket_start, sum_value, count in db.execute(
+            select(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start,
+                   MetricRollupDB.sum_value, MetricRollupDB.count).where(*rollup_clauses)
+        )
+    ]
+    if rollup_rows:
+        rows = sorted(rows + rollup_rows, key=lambda row: (row[0], row[2]))
+    return rows
+
+def get_metric_columns(db: Session, project_id: str, metric_ids: List[str]) -> List[tuple]:
+    """``(model_name, timestamp_text, epoch_seconds, 1, *metric values)`` for every raw record, one query.
+    
+    Rows are ordered by model and time. The epoch is computed in SQL and the timestamp is returned as
+    stored text, so no per-row datetime parsing happens in Python. Non-numeric values of
+    additionalMetrics keys come back as None. The constant is the number of records a row stands for,
+    as in ``get_rollup_metric_columns``.
+    """
+    values = []
+    for metric_id in metric_ids:
+        value = metric_value_expression(metric_id)
+        if metric_id not in STANDARD_METRIC_COLUMNS:
+            value = case((func.typeof(value).in_(['integer', 'real']), value), else_=None)
+        values.append(value)
+    epoch = (func.julianday(ProjectMetricDB.timestamp) - 2440587.5) * 86400.0
+    statement = (
+        select(ProjectMetricDB.model_name, cast(ProjectMetricDB.timestamp, String), epoch, literal(1), *values)
+        .where(ProjectMetricDB.project_id == project_id)
+        .order_by(ProjectMetricDB.model_name, ProjectMetricDB.timestamp)
+    )
+    # Executed on the connection: plain Core rows, without the ORM's per-row result handling
+    return db.connection().execute(statement).all()
+
+def get_rollup_metric_columns(db: Session, project_id: str, metric_ids: List[str]) -> List[tuple]:
+    """``get_metric_columns`` rows for a project's compacted ranges, one per model, version and bucket.
+    
+    A bucket's values are its metric means, timed at the bucket start, and it stands for as many
+    records as its most frequent metric has values.
+    """
+    mean = MetricRollupDB.sum_value / MetricRollupDB.count
+    values = [func.max(case((MetricRollupDB.metric_key == metric_id, mean), else_=None)) for metric_id in metric_ids]
+    epoch = (func.julianday(MetricRollupDB.bucket_start) - 2440587.5) * 86400.0
+    statement = (
+        select(MetricRollupDB.model_name, cast(MetricRollupDB.bucket_start, String), epoch,
+               func.max(MetricRollupDB.count), *values)
+        .where(MetricRollupDB.project_id == project_id)
+        .group_by(MetricRollupDB.model_name, MetricRollupDB.model_version, MetricRollupDB.bucket_start)
+        .order_by(MetricRollupDB.model_name, MetricRollupDB.bucket_start)
+    )
+    return db.connection().execute(statement).all()
+
+# Streaming statistics and anomaly detection on ingest
+def update_stream_stats(db: Session, rows) -> int:
+    """Fold newly inserted records (``project_metrics`` row dicts, in arrival order) into the streaming
+    state of their (project, model, metric) and store the anomalies found; returns how many.
+    
+    Call it after inserting ``rows`` and before committing. The insert holds SQLite's write lock, so the
+    state read here cannot be changed by another writer before this transaction commits. Each value
+    costs O(1); history is never rescanned.
+    """
+    if not ANOMALY_DETECTION_ENABLED:
+        return 0
+    observations = [(row, metric_key, value) for row in rows
+                    for metric_key, value in _numeric_metric_values(row).items()]
+    if not observations:
+        return 0
+    
+    keys = {(row['project_id'], row['model_name'], metric_key) for row, metric_key, _ in observations}
+    states = {
+        (state.project_id, state.model_name, state.metric_key): {
+            'count': state.count, 'mean': state.mean, 'm2': state.m2,
+            'ewma_mean': state.ewma_mean, 'ewma_var': state.ewma_var,
+        }
+        for state in db.execute(select(MetricStreamStatsDB).where(
+            tuple_(MetricStreamStatsDB.project_id, MetricStreamStatsDB.model_name,
+                   MetricStreamStatsDB.metric_key).in_(list(keys))
+        )).scalars()
+    }
+    
+    anomalies = []
+    for row, metric_key, value in observations:
+        key = (row['project_id'], row['model_name'], metric_key)
+        state = states.get(key)
+        if state is None:
+            state = states[key] = new_state()
+        scored = observe(state, value)
+        if scored is not None and abs(scored[0]) >= ANOMALY_Z_THRESHOLD:
+            z_score, expected, std = scored
+            anomalies.append({
+                'project_id': row['project_id'], 'record_id': row['id'], 'model_name': row['model_name'],
+                'model_version': row.get('model_version'), 'metric_key': metric_key,
+                'timestamp': row['timestamp'], 'value': value, 'expected': expected, 'std': std,
+                'z_score': z_score, 'regression': is_regression(metric_key, z_score),
+                'detected_at': datetime.utcnow(),
+            })
+    
+    upsert = sqlite_insert(MetricStreamStatsDB)
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=['project_id', 'model_name', 'metric_key'],
+            set_={column: upsert.excluded[column]
+                  for column in ('count', 'mean', 'm2', 'ewma_mean', 'ewma_var', 'updated_at')},
+        ),
+        [{'project_id': project_id, 'model_name': model_name, 'metric_key': metric_key,
+          'updated_at': datetime.utcnow(), **state}
+         for (project_id, model_name, metric_key), state in states.items()],
+    )
+    if anomalies:
+        db.execute(insert(MetricAnomalyDB), anomalies)
+    return len(anomalies)
+
+def get_anomalies(db: Session, project_id: str, model_name: Optional[str] = None, metric_key: Optional[str] = None,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  regressions_only: bool = False, limit: int = 100) -> List[MetricAnomalyDB]:
+    query = db.query(MetricAnomalyDB).filter(MetricAnomalyDB.project_id == project_id)
+    if model_name is not None:
+        query = query.filter(MetricAnomalyDB.model_name == model_name)
+    if metric_key is not None:
+        query = query.filter(MetricAnomalyDB.metric_key == metric_key)
+    if start is not None:
+        query = query.filter(MetricAnomalyDB.timestamp >= start)
+    if end is not None:
+        query = query.filter(MetricAnomalyDB.timestamp <= end)
+    if regressions_only:
+        query = query.filter(MetricAnomalyDB.regression.is_(True))
+    return query.order_by(MetricAnomalyDB.timestamp.desc(), MetricAnomalyDB.id.desc()).limit(limit).all()
+
+def get_record_anomalies(db: Session, record_id: str) -> List[MetricAnomalyDB]:
+    return db.query(MetricAnomalyDB).filter(MetricAnomalyDB.record_id == record_id).order_by(MetricAnomalyDB.id).all()
+
+def anomaly_to_pydantic(anomaly: MetricAnomalyDB) -> MetricAnomaly:
+    return MetricAnomaly(
+        id=anomaly.id,
+        projectId=anomaly.project_id,
+        recordId=anomaly.record_id,
+        modelName=anomaly.model_name,
+        modelVersion=anomaly.model_version,
+        metric=anomaly.metric_key,
+        timestamp=anomaly.timestamp.isoformat(),
+        value=anomaly.value,
+        expected=anomaly.expected,
+        std=anomaly.std,
+        zScore=anomaly.z_score,
+        regression=anomaly.regression,
+        detectedAt=anomaly.detected_at.isoformat(),
+    )
+
+# Retention policies and downsampled rollups
+ROLLUP_INTERVALS = {'hour': 3600, 'day': 86400}
+
+def get_retention_policy(db: Session, project_id: str) -> Optional[RetentionPolicyDB]:
+    return db.get(RetentionPolicyDB, project_id)
+
+def get_retention_policies(db: Session) -> List[RetentionPolicyDB]:
+    return db.query(RetentionPolicyDB).order_by(RetentionPolicyDB.project_id).all()
+
+def set_retention_policy(db: Session, project_id: str, raw_retention_days: int,
+                         rollup_interval: str) -> RetentionPolicyDB:
+    policy = get_retention_policy(db, project_id)
+    if policy is None:
+        policy = RetentionPolicyDB(project_id=project_id)
+        db.add(policy)
+    policy.raw_retention_days = raw_retention_days
+    policy.rollup_interval = rollup_interval
+    db.commit()
+    db.refresh(policy)
+    return policy
+
+def delete_retention_policy(db: Session, project_id: str) -> bool:
+    deleted = db.execute(delete(RetentionPolicyDB).where(RetentionPolicyDB.project_id == project_id)
+                         .execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return deleted > 0
+
+def count_metrics_before(db: Session, project_id: str, cutoff: datetime) -> int:
+    return db.query(func.count(ProjectMetricDB.id)).filter(
+        ProjectMetricDB.project_id == project_id, ProjectMetricDB.timestamp < cutoff
+    ).scalar()
+
+def _numeric_metric_values(row) -> Dict[str, float]:
+    """Numeric metric values of a raw record keyed by API metric id"""
+    values = {
+        metric_id: float(row[column.key])
+        for metric_id, column in STANDARD_METRIC_COLUMNS.items() if row.get(column.key) is not None
+    }
+    if row.get('additional_metrics'):
+        try:
+            additional = json.loads(row['additional_metrics'])
+        except (json.JSONDecodeError, TypeError):
+            additional = {}
+        for key, value in additional.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key not in values:
+                values[key] = float(value)
+    return values
+
+def compact_project_metrics_batch(db: Session, project_id: str, cutoff: datetime, bucket_seconds: int,
+                                  batch_size: int) -> int:
+    """Roll up and delete up to ``batch_size`` raw records older than ``cutoff`` in one transaction.
+    
+    The records are removed with DELETE ... RETURNING and their aggregates merged into the rollup
+    rows in the same transaction, so concurrent compactions can never count a record twice.
+    """
+    batch = (
+        select(ProjectMetricDB.id)
+        .where(ProjectMetricDB.project_id == project_id, ProjectMetricDB.timestamp < cutoff)
+        .limit(batch_size)
+    )
+    try:
+        deleted = db.execute(
+            delete(ProjectMetricDB).where(ProjectMetricDB.id.in_(batch))
+            .returning(*(getattr(ProjectMetricDB, column) for column in (
+                'model_name', 'model_version', 'timestamp', 'accuracy', 'loss', 'precision', 'recall', 'f1_score',
+                'additional_metrics')))
+            .execution_options(synchronize_session=False)
+        ).mappings().all()
+        if not deleted:
+            db.rollback()
+            return 0
+        
+        buckets: Dict[tuple, dict] = {}
+        for row in sorted(deleted, key=lambda r: r['timestamp']):
+            epoch = to_epoch(row['timestamp'])
+            bucket_start = from_epoch(epoch - epoch % bucket_seconds)
+            for metric_key, value in _numeric_metric_values(row).items():
+                key = (row['model_name'], row['model_version'] or '', bucket_start, metric_key)
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = {'count': 1, 'min_value': value, 'max_value': value, 'sum_value': value,
+                                    'last_value': value, 'last_timestamp': row['timestamp']}
+                else:
+                    agg['count'] += 1
+                    agg['min_value'] = min(agg['min_value'], value)
+                    agg['max_value'] = max(agg['max_value'], value)
+                    agg['sum_value'] += value
+                    agg['last_value'] = value
+                    agg['last_timestamp'] = row['timestamp']
+        
+        if buckets:
+            statement = sqlite_insert(MetricRollupDB)
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=['project_id', 'model_name', 'model_version', 'bucket_start', 'metric_key'],
+                set_={
+                    'count': MetricRollupDB.count + excluded.count,
+                    'min_value': func.min(MetricRollupDB.min_value, excluded.min_value),
+                    'max_value': func.max(MetricRollupDB.max_value, excluded.max_value),
+                    'sum_value': MetricRollupDB.sum_value + excluded.sum_value,
+                    'last_value': case((excluded.last_timestamp >= MetricRollupDB.last_timestamp, excluded.last_value),
+                                       else_=MetricRollupDB.last_value),
+                    'last_timestamp': func.max(MetricRollupDB.last_timestamp, excluded.last_timestamp),
+                },
+            )
+            db.execute(statement, [
+                {'project_id': project_id, 'model_name': model_name, 'model_version': model_version,
+                 'bucket_start': bucket_start, 'bucket_seconds': bucket_seconds, 'metric_key': metric_key, **agg}
+                for (model_name, model_version, bucket_start, metric_key), agg in buckets.items()
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    touch_projects(project_id)
+    return len(deleted)
+
+def get_project_rollups(db: Session, project_id: str) -> List[MetricRollupDB]:
+    return db.query(MetricRollupDB).filter(MetricRollupDB.project_id == project_id).order_by(
+        MetricRollupDB.bucket_start).all()
+
+def rollups_to_pydantic(rollups: List[MetricRollupDB]) -> List[ProjectMetric]:
+    """One record per model, version and bucket, carrying bucket means and the aggregates behind them"""
+    grouped: Dict[tuple, List[MetricRollupDB]] = {}
+    for rollup in rollups:
+        grouped.setdefault((rollup.model_name, rollup.model_version, rollup.bucket_start), []).append(rollup)
+    
+    records = []
+    for (model_name, model_version, bucket_start), group in grouped.items():
+        project_id = group[0].project_id
+        values = {'accuracy': None, 'loss': None, 'precision': None, 'recall': None, 'f1Score': None}
+        additional = {}
+        for rollup in group:
+            mean = rollup.sum_value / rollup.count
+            if rollup.metric_key in values:
+                values[rollup.metric_key] = mean
+            else:
+                additional[rollup.metric_key] = mean
+        records.append(ProjectMetric(
+            id=rollup_record_id(project_id, model_name, model_version, bucket_start),
+            projectId=project_id,
+            timestamp=bucket_start.isoformat(),
+            modelName=model_name,
+            modelVersion=model_version or None,
+            additionalMetrics=additional or None,
+            rollup=MetricRollupStats(
+                bucketSeconds=group[0].bucket_seconds,
+                count=max(rollup.count for rollup in group),
+                min={rollup.metric_key: rollup.min_value for rollup in group},
+                max={rollup.metric_key: rollup.max_value for rollup in group},
+                last={rollup.metric_key: rollup.last_value for rollup in group},
+            ),
+            **values,
+        ))
+    return records
+
+def reclaim_free_pages(db: Session) -> dict:
+    """Return pages freed by deletes to the filesystem.
+    
+    Uses incremental vacuum when the database was created with auto_vacuum=INCREMENTAL (the
+    default since connections request it); older files get one full VACUUM, which also converts them.
+    """
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+        pages_before = connection.exec_driver_sql("PRAGMA page_count").scalar()
+        mode = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if mode == 2:  # INCREMENTAL
+            # sqlite3's execute() steps a statement once, which frees a single page; executescript runs it to completion
+            connection.connection.dbapi_connection.executescript("PRAGMA incremental_vacuum;")
+        else:
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+        pages_after = connection.exec_driver_sql("PRAGMA page_count").scalar()
+    return {'mode': 'incremental' if mode == 2 else 'full', 'freedBytes': (pages_before - pages_after) * page_size}
+
+# Sparse fieldsets: only the requested columns are selected and decoded
+PROJECT_FIELDS = {
+    'id': ProjectDB.id,
+    'name': ProjectDB.name,
+    'description': ProjectDB.description,
+    'createdAt': ProjectDB.created_at,
+    'updatedAt': ProjectDB.updated_at,
+    'color': ProjectDB.color,
+}
+PROJECT_INCLUDES = ('records', 'metricsConfig')
+METRIC_FIELDS = {
+    'id': ProjectMetricDB.id,
+    'projectId': ProjectMetricDB.project_id,
+    'timestamp': ProjectMetricDB.timestamp,
+    'modelName': ProjectMetricDB.model_name,
+    'modelVersion': ProjectMetricDB.model_version,
+    'accuracy': ProjectMetricDB.accuracy,
+    'loss': ProjectMetricDB.loss,
+    'precision': ProjectMetricDB.precision,
+    'recall': ProjectMetricDB.recall,
+    'f1Score': ProjectMetricDB.f1_score,
+    'additionalMetrics': ProjectMetricDB.additional_metrics,
+}
+
+def is_metric_field(name: str) -> bool:
+    """A ProjectMetric field, or an additionalMetrics key to extract on its own"""
+    return name in METRIC_FIELDS or is_supported_metric(name)
+
+def get_metric_settings(db: Session, project_ids: Optional[List[str]] = None) -> List[MetricSettingsDB]:
+    query = db.query(MetricSettingsDB)
+    if project_ids is not None:
+        query = query.filter(MetricSettingsDB.project_id.in_(project_ids))
+    return query.order_by(MetricSettingsDB.id).all()
+
+def get_project_field_rows(db: Session, fields: List[str], project_id: Optional[str] = None) -> List[tuple]:
+    """``(project_id, {field: value})`` for the requested project fields"""
+    statement = select(ProjectDB.id.label('_id'), *(PROJECT_FIELDS[name].label(name) for name in fields))
+    if project_id is not None:
+        statement = statement.where(ProjectDB.id == project_id)
+    rows = []
+    for row in db.execute(statement).mappings():
+        values = {name: row[name] for name in fields}
+        for name in ('createdAt', 'updatedAt'):
+            if values.get(name) is not None:
+                values[name] = values[name].isoformat()
+        rows.append((row['_id'], values))
+    return rows
+
+def get_metric_field_rows(db: Session, fields: List[str], project_ids: Optional[List[str]] = None) -> List[tuple]:
+    """``(project_id, {field: value})`` for the requested metric fields.
+    
+    Names that are not ProjectMetric fields are additionalMetrics keys; each is extracted in SQL
+    and returned under ``additionalMetrics``, so the JSON column itself is never read or decoded
+    unless ``additionalMetrics`` is requested.
+    """
+    base = [name for name in fields if name in METRIC_FIELDS]
+    extra = [name for name in fields if name not in METRIC_FIELDS and 'additionalMetrics' not in fields]
+    columns = [ProjectMetricDB.project_id.label('_project_id')]
+    columns += [METRIC_FIELDS[name].label(name) for name in base]
+    columns += [metric_value_expression(key).label(f'_extra_{i}') for i, key in enumerate(extra)]
+    statement = select(*columns)
+    if project_ids is not None:
+        statement = statement.where(ProjectMetricDB.project_id.in_(project_ids))
+    
+    rows = []
+    for row in db.execute(statement).mappings():
+        values = {name: row[name] for name in base}
+        if 'timestamp' in values:
+            values['timestamp'] = values['timestamp'].isoformat()
+        if values.get('additionalMetrics'):
+            try:
+                values['additionalMetrics'] = json.loads(values['additionalMetrics'])
+            except (json.JSONDecodeError, TypeError):
+                values['additionalMetrics'] = None
+        if extra:
+            extracted = {key: row[f'_extra_{i}'] for i, key in enumerate(extra) if row[f'_extra_{i}'] is not None}
+            values['additionalMetrics'] = extracted or None
+        rows.append((row['_project_id'], values))
+    return rows
+
+def project_metric_fields(metric: ProjectMetric, fields: List[str]) -> dict:
+    """Apply a sparse fieldset to an already built record (rollup or archived records)"""
+    data = metric.model_dump()
+    values = {name: data[name] for name in fields if name in METRIC_FIELDS}
+    extra = [name for name in fields if name not in METRIC_FIELDS]
+    if extra and 'additionalMetrics' not in fields:
+        additional = data['additionalMetrics'] or {}
+        extracted = {key: additional[key] for key in extra if additional.get(key) is not None}
+        values['additionalMetrics'] = extracted or None
+    return values
+
+# Cold-tier archive catalog
+ARCHIVE_ROW_COLUMNS = ('id', 'timestamp', 'model_name', 'model_version', 'accuracy', 'loss', 'precision', 'recall',
+                       'f1_score', 'additional_metrics')
+
+def get_archive_segments(db: Session, project_id: str) -> List[ArchiveSegmentDB]:
+    return db.query(ArchiveSegmentDB).filter(ArchiveSegmentDB.project_id == project_id).order_by(
+        ArchiveSegmentDB.id).all()
+
+def get_archived_segment_names(db: Session) -> Dict[str, List[str]]:
+    """Segment file names per archived project, in archive order"""
+    names: Dict[str, List[str]] = {}
+    for project_id, name in db.execute(
+        select(ArchiveSegmentDB.project_id, ArchiveSegmentDB.name).order_by(ArchiveSegmentDB.id)
+    ):
+        names.setdefault(project_id, []).append(name)
+    return names
+
+def fetch_metric_rows(db: Session, project_id: str, limit: int) -> List[dict]:
+    """Up to ``limit`` raw records of a project, oldest first, as column dicts"""
+    statement = (
+        select(*(getattr(ProjectMetricDB, column) for column in ARCHIVE_ROW_COLUMNS))
+        .where(ProjectMetricDB.project_id == project_id)
+        .order_by(ProjectMetricDB.timestamp, ProjectMetricDB.id)
+        .limit(limit)
+    )
+    return [dict(row) for row in db.execute(statement).mappings()]
+
+def commit_archived_segment(db: Session, project_id: str, name: str, rows: List[dict], compressed_bytes: int) -> None:
+    """Replace records now stored in segment ``name`` by its catalog entry, in one transaction
+    
+    Raises ``RuntimeError`` without changing anything when some of the rows are no longer in the
+    database, e.g. deleted meanwhile, so the segment never holds records the database lost or kept.
+    """
+    try:
+        ids = [row['id'] for row in rows]
+        deleted = 0
+        for start in range(0, len(ids), BULK_ID_CHUNK_SIZE):
+            deleted += db.execute(
+                delete(ProjectMetricDB).where(ProjectMetricDB.id.in_(ids[start:start + BULK_ID_CHUNK_SIZE]))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        if deleted != len(rows):
+            raise RuntimeError(f"Only {deleted} of the {len(rows)} records of segment {name} were still in the "
+                               "database; they changed while being archived")
+        db.add(ArchiveSegmentDB(
+            project_id=project_id,
+            name=name,
+            record_count=len(rows),
+            compressed_bytes=compressed_bytes,
+            min_timestamp=min(row['timestamp'] for row in rows),
+            max_timestamp=max(row['timestamp'] for row in rows),
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    touch_projects(project_id)
+
+def commit_restored_segment(db: Session, project_id: str, segment_id: int, rows: List[dict]) -> None:
+    """Re-insert a segment's records and drop its catalog entry, in one transaction"""
+    try:
+        if rows:
+            db.execute(insert(ProjectMetricDB), [{**row, 'project_id': project_id} for row in rows])
+            _index_models(db, ((project_id, row['model_name'], row['model_version']) for row in rows))
+        db.execute(delete(ArchiveSegmentDB).where(ArchiveSegmentDB.id == segment_id)
+                   .execution_options(synchronize_session=False))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    touch_projects(project_id)
+
+# Full-text search documents, kept in the same transaction as the rows they describe
+SEARCH_DOCUMENT_COLUMNS = ('project_id', 'kind', 'model_name', 'model_version', 'metric_id', 'title', 'body')
+SEARCH_KEY_COLUMNS = ['project_id', 'kind', 'model_name', 'model_version', 'metric_id']
+
+def _model_key(row: dict) -> tuple:
+    return (row['project_id'], row['model_name'], row.get('model_version'))
+
+def _index_projects(db: Session, projects_data: List[dict]) -> None:
+    """Insert or refresh the search documents of projects (``projects`` column dicts)"""
+    upsert = sqlite_insert(SearchDocumentDB)
+    db.execute(
+        upsert.on_conflict_do_update(index_elements=SEARCH_KEY_COLUMNS,
+                                     set_={'title': upsert.excluded.title, 'body': upsert.excluded.body}),
+        [{'project_id': project['id'], 'kind': 'project', 'model_name': '', 'model_version': '', 'metric_id': '',
+          'title': project['name'], 'body': project.get('description') or ''}
+         for project in projects_data],
+    )
+
+def _index_models(db: Session, models) -> None:
+    """Add documents for ``(project_id, model_name, model_version)`` triples not indexed yet"""
+    documents = {}
+    for project_id, model_name, model_version in set(models):
+        if not model_name:
+            continue
+        documents[(project_id, 'model', model_name, '')] = model_name
+        if model_version:
+            documents[(project_id, 'version', model_name, model_version)] = model_version
+    if documents:
+        db.execute(
+            sqlite_insert(SearchDocumentDB).on_conflict_do_nothing(),
+            [{'project_id': project_id, 'kind': kind, 'model_name': model_name, 'model_version': model_version,
+              'metric_id': '', 'title': model_name, 'body': body if kind == 'version' else ''}
+             for (project_id, kind, model_name, model_version), body in documents.items()],
+        )
+
+def _prune_model_documents(db: Session, project_id: str) -> None:
+    """Drop model and version documents of a project that no record or rollup refers to any more
+    
+    Each document costs one probe of the project/model indexes, so this stays cheap however many
+    records the project has. Projects with archived segments keep their documents, since the
+    archived records are not visible to these probes.
+    """
+    if db.execute(select(ArchiveSegmentDB.id).where(ArchiveSegmentDB.project_id == project_id).limit(1)).first():
+        return
+    documents = SearchDocumentDB
+    for kind, record_match, rollup_match in (
+        ('model', (), ()),
+        ('version', (ProjectMetricDB.model_version == documents.model_version,),
+         (MetricRollupDB.model_version == documents.model_version,)),
+    ):
+        in_records = select(ProjectMetricDB.id).where(
+            ProjectMetricDB.project_id == documents.project_id,
+            ProjectMetricDB.model_name == documents.model_name, *record_match
+        ).exists()
+        in_rollups = select(MetricRollupDB.id).where(
+            MetricRollupDB.project_id == documents.project_id,
+            MetricRollupDB.model_name == documents.model_name, *rollup_match
+        ).exists()
+        db.execute(delete(documents).where(documents.project_id == project_id, documents.kind == kind,
+                                           ~in_records, ~in_rollups)
+                   .execution_options(synchronize_session=False))
+
+def _refresh_model_documents(db: Session, project_id: str) -> None:
+    """Index every model of a project and drop documents of models that are gone, e.g. after a rename"""
+    rows = db.execute(
+        select(ProjectMetricDB.model_name, ProjectMetricDB.model_version)
+        .where(ProjectMetricDB.project_id == project_id).distinct()
+    )
+    _index_models(db, ((project_id, model_name, model_version) for model_name, model_version in rows))
+    _prune_model_documents(db, project_id)
+
+def _insert_metric_documents(db: Session, *where) -> None:
+    settings = select(
+        MetricSettingsDB.project_id, literal('metric'), literal(''), literal(''), MetricSettingsDB.metric_id,
+        MetricSettingsDB.name,
+        (MetricSettingsDB.metric_id + ' ' + func.coalesce(MetricSettingsDB.description, '')),
+    ).where(*where)
+    # OR IGNORE skips duplicate settings rows of the same metric
+    db.execute(insert(SearchDocumentDB).from_select(SEARCH_DOCUMENT_COLUMNS, settings).prefix_with('OR IGNORE'))
+
+def _sync_metric_documents(db: Session, project_id: str) -> None:
+    """Replace the metric documents of a project with one per current metric setting"""
+    db.execute(delete(SearchDocumentDB).where(SearchDocumentDB.project_id == project_id,
+                                              SearchDocumentDB.kind == 'metric')
+               .execution_options(synchronize_session=False))
+    _insert_metric_documents(db, MetricSettingsDB.project_id == project_id)
+
+def has_search_documents(db: Session) -> bool:
+    return db.query(SearchDocumentDB.id).limit(1).first() is not None
+
+def search_index_in_sync(db: Session) -> bool:
+    """Whether ``search_index`` holds as many documents as ``search_documents``
+    
+    FTS5 keeps one ``search_index_docsize`` row per indexed document. Documents written while the
+    triggers did not exist, e.g. into a schema built by ``create_all`` alone, are missing from it.
+    """
+    documents = db.query(func.count(SearchDocumentDB.id)).scalar()
+    return db.execute(text("SELECT count(*) FROM search_index_docsize")).scalar() == documents
+
+def rebuild_search_documents(db: Session, archived_models: List[tuple]) -> int:
+    """Recreate all search documents from the tables they describe, set-based; returns how many exist
+    
+    ``archived_models`` lists ``(project_id, model_name, model_version)`` of archived records, which
+    only the segment files know about.
+    """
+    try:
+        # Re-index the current documents first, so the delete triggers below remove exactly what is indexed
+        db.execute(text("INSERT INTO search_index(search_index) VALUES ('rebuild')"))
+        db.execute(delete(SearchDocumentDB).execution_options(synchronize_session=False))
+        db.execute(insert(SearchDocumentDB).from_select(SEARCH_DOCUMENT_COLUMNS, select(
+            ProjectDB.id, literal('project'), literal(''), literal(''), literal(''),
+            ProjectDB.name, func.coalesce(ProjectDB.description, ''),
+        )))
+        for table in (ProjectMetricDB, MetricRollupDB):
+            db.execute(insert(SearchDocumentDB).from_select(SEARCH_DOCUMENT_COLUMNS, select(
+                table.project_id, literal('model'), table.model_name, literal(''), literal(''),
+                table.model_name, literal(''),
+            ).where(table.model_name != '').distinct()).prefix_with('OR IGNORE'))
+            db.execute(insert(SearchDocumentDB).from_select(SEARCH_DOCUMENT_COLUMNS, select(
+                table.project_id, literal('version'), table.model_name, table.model_version, literal(''),
+                table.model_name, table.model_version,
+            ).where(table.model_name != '', table.model_version != '').distinct()).prefix_with('OR IGNORE'))
+        _index_models(db, archived_models)
+        _insert_metric_documents(db)
+        # Merge the index segments written by the inserts above into one
+        db.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return db.query(func.count(SearchDocumentDB.id)).scalar()
+
+_SEARCH_STATEMENT = """
+    SELECT d.kind, d.project_id, p.name, d.model_name, d.model_version, d.metric_id, d.title, d.body,
+           search_index.rank
+    FROM search_index
+    JOIN search_documents AS d ON d.id = search_index.rowid
+    JOIN projects AS p ON p.id = d.project_id
+    WHERE search_index MATCH :match AND search_index.rank MATCH :ranking {filters}
+    ORDER BY search_index.rank
+    LIMIT :limit
+"""
+
+def search_documents(db: Session, match: str, kinds: Optional[List[str]] = None, project_id: Optional[str] = None,
+                     limit: int = 20) -> List[tuple]:
+    """Documents matching an FTS5 ``match`` expression, best BM25 rank first
+    
+    Every match is ranked: FTS5 computes the weighted BM25 ``rank`` and keeps only the best ``limit``
+    while sorting. Rows are
+    ``(kind, project_id, project_name, model_name, model_version, metric_id, title, body, rank)``.
+    """
+    filters = []
+    params = {'match': match, 'ranking': f"bm25({TITLE_WEIGHT}, {BODY_WEIGHT})", 'limit': limit}
+    statement_params = []
+    if kinds:
+        filters.append("AND d.kind IN :kinds")
+        params['kinds'] = list(kinds)
+        statement_params.append(bindparam('kinds', expanding=True))
+    if project_id is not None:
+        filters.append("AND d.project_id = :project_id")
+        params['project_id'] = project_id
+    statement = text(_SEARCH_STATEMENT.format(filters=" ".join(filters))).bindparams(*statement_params)
+    return db.execute(statement, params).all()
+
 # Conversion functions between DB models and Pydantic models
+def metric_row_to_pydantic(project_id: str, row: dict) -> ProjectMetric:
+    """Convert a ``project_metrics`` column dict (e.g. read from an archive segment) to a Pydantic model"""
+    additional_metrics = None
+    if row['additional_metrics']:
+        try:
+            additional_metrics = json.loads(row['additional_metrics'])
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"Warning: Failed to parse additional metrics for metric {row['id']}: {e}")
+    
+    return ProjectMetric(
+        id=row['id'],
+        projectId=project_id,
+        timestamp=row['timestamp'].isoformat(),
+        modelName=row['model_name'],
+        modelVersion=row['model_version'],
+        accuracy=row['accuracy'],
+        loss=row['loss'],
+        precision=row['precision'],
+        recall=row['recall'],
+        f1Score=row['f1_score'],
+        additionalMetrics=additional_metrics,
+    )
+
+def db_metric_to_pydantic(db_metric: ProjectMetricDB) -> ProjectMetric:
+    """Convert database metric record to Pydantic model"""
+    additional_metrics = None
+    if db_metric.additional_metrics:
+        try:
+            additional_metrics = json.loads(db_metric.additional_metrics)
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"Warning: Failed to parse additional metrics for metric {db_metric.id}: {e}")
+    
+    return ProjectMetric(
+        id=db_metric.id,
+        projectId=db_metric.project_id,
+        timestamp=db_metric.timestamp.isoformat(),
+        modelName=db_metric.model_name,
+        modelVersion=db_metric.model_version,
+        accuracy=db_metric.accuracy,
+        loss=db_metric.loss,
+        precision=db_metric.precision,
+        recall=db_metric.recall,
+        f1Score=db_metric.f1_score,
+        additionalMetrics=additional_metrics,
+    )
+
 def db_project_to_pydantic(db_project: ProjectDB) -> Project:
     """Convert database project to Pydantic model"""
     # Get metrics for this project
@@ -155,21 +1471,11 @@ def db_project_to_pydantic(db_project: ProjectDB) -> Project:
         }
         metrics.append(ProjectMetric(**metric_dict))
     
+    # Compacted ranges are represented by their rollup records
+    metrics = rollups_to_pydantic(db_project.rollups) + metrics
+    
     # Get metric settings for this project
-    settings = []
-    for db_setting in db_project.metrics_config:
-        setting_dict = {
-            'id': db_setting.metric_id,
-            'name': db_setting.name,
-            'type': db_setting.type,
-            'color': db_setting.color,
-            'unit': db_setting.unit,
-            'enabled': db_setting.enabled,
-            'min': db_setting.min_value,
-            'max': db_setting.max_value,
-            'description': db_setting.description
-        }
-        settings.append(MetricSettings(**setting_dict))
+    settings = [db_setting_to_pydantic(db_setting) for db_setting in db_project.metrics_config]
     
     project_dict = {
         'id': db_project.id,
@@ -184,6 +1490,20 @@ def db_project_to_pydantic(db_project: ProjectDB) -> Project:
     
     return Project(**project_dict)
 
+def db_setting_to_pydantic(db_setting: MetricSettingsDB) -> MetricSettings:
+    """Convert database metric setting to Pydantic model"""
+    return MetricSettings(
+        id=db_setting.metric_id,
+        name=db_setting.name,
+        type=db_setting.type,
+        color=db_setting.color,
+        unit=db_setting.unit,
+        enabled=db_setting.enabled,
+        min=db_setting.min_value,
+        max=db_setting.max_value,
+        description=db_setting.description,
+    )
+
 def pydantic_project_to_db(project: Project) -> dict:
     """Convert Pydantic project to database model dict"""
     return {
@@ -0,0 +1,116 @@
+"""
+Time series helpers for metric analysis.
+
+Series are plain sorted sequences of epoch seconds and values. The
+resampling functions walk the series and the target grid together in a
+single merge pass, so aligning a series costs O(len(series) + len(grid))
+without per-point searches. The summary statistics work on whole lists
+with C-level ``map``/``accumulate``/``fsum`` passes rather than Python loops.
+"""
+
+import math
+from datetime import datetime, timezone
+from itertools import accumulate, repeat
+from operator import mul, sub
+from typing import List, Optional, Sequence
+
+RESAMPLE_METHODS = ("linear", "previous")
+SECONDS_PER_DAY = 86400.0
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Seconds since the epoch for a naive (UTC) or aware datetime."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def from_epoch(seconds: float) -> datetime:
+    """Naive UTC datetime, matching how timestamps are stored."""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+
+
+def uniform_grid(start: float, end: float, points: int) -> List[float]:
+    """``points`` evenly spaced instants from ``start`` to ``end`` inclusive."""
+    if points <= 1 or end <= start:
+        return [start]
+    step = (end - start) / (points - 1)
+    return [start + step * i for i in range(points - 1)] + [end]
+
+
+def union_grid(series_times: Sequence[Sequence[float]]) -> List[float]:
+    """Every distinct instant observed in any series, sorted."""
+    instants = set()
+    for times in series_times:
+        instants.update(times)
+    return sorted(instants)
+
+
+def resample(times: Sequence[float], values: Sequence[float], grid: Sequence[float],
+             method: str = "linear") -> List[Optional[float]]:
+    """Align a sorted series onto a sorted grid.
+
+    ``linear`` interpolates between the surrounding observations and is
+    undefined (None) outside the observed range. ``previous`` is an as-of
+    join: the last observation at or before each grid instant.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unknown resample method '{method}'")
+
+    result: List[Optional[float]] = []
+    n = len(times)
+    i = 0  # index of the first observation strictly after the current grid instant
+    for instant in grid:
+        while i < n and times[i] <= instant:
+            i += 1
+        if i == 0:
+            result.append(None)  # before the first observation
+        elif method == "previous" or times[i - 1] == instant:
+            result.append(values[i - 1])
+        elif i == n:
+            result.append(None)  # after the last observation
+        else:
+            t0, t1 = times[i - 1], times[i]
+            v0, v1 = values[i - 1], values[i]
+            result.append(v0 + (v1 - v0) * (instant - t0) / (t1 - t0))
+    return result
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """The ``q``-th percentile (0-100) of sorted values, interpolating linearly between ranks."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def mean_and_std(values: Sequence[float]) -> tuple:
+    """Mean and population standard deviation from exactly rounded sums (``math.fsum``)."""
+    n = len(values)
+    mean = math.fsum(values) / n
+    variance = math.fsum(map(mul, values, values)) / n - mean * mean
+    return mean, math.sqrt(max(variance, 0.0))
+
+
+def moving_averages(values: Sequence[float], window: int, indices: Sequence[int]) -> List[float]:
+    """Trailing ``window``-point means ending at each of ``indices``, from one prefix-sum pass.
+
+    Near the start, where fewer than ``window`` points exist, the mean covers those available.
+    """
+    prefix = [0.0, *accumulate(values)]
+    return [(prefix[i + 1] - prefix[max(0, i + 1 - window)]) / min(window, i + 1) for i in indices]
+
+
+def linear_slope(times: Sequence[float], values: Sequence[float]) -> Optional[float]:
+    """Least-squares slope of values over time, in units per second; None without a time spread."""
+    n = len(times)
+    if n < 2:
+        return None
+    # Shifting to the first instant keeps the sums well conditioned despite epoch-sized times
+    shifted = list(map(sub, times, repeat(times[0], n)))
+    mean_time = math.fsum(shifted) / n
+    mean_value = math.fsum(values) / n
+    spread = math.fsum(map(mul, shifted, shifted)) / n - mean_time * mean_time
+    if spread <= 0:
+        return None
+    return (math.fsum(map(mul, shifted, values)) / n - mean_time * mean_value) / spread
@@ -0,0 +1,10 @@
+"""
+Microbenchmarks for the Chronology backend.
+
+This package measures the hot paths of the storage, service and serialization
+layers against a temporary SQLite database so regressions can be spotted
+before they ship. Run it from the backend directory:
+
+    uv run python -m benchmarks --sizes 1000,100000 --output results.json
+    uv run python -m benchmarks --baseline results.json --threshold 0.15
+"""
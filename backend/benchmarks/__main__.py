@@ -0,0 +1,68 @@
+"""
+Command line entry point: ``python -m benchmarks``.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+from .cases import run_size
+from .harness import build_report, compare, format_comparison, format_results, load_report, write_report
+
+DEFAULT_SIZES = "1000,100000,1000000"
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(size.replace("_", "")) for size in value.split(",") if size.strip()]
+
+
+def _parse_overrides(values: List[str]) -> Dict[str, float]:
+    overrides = {}
+    for value in values:
+        name, _, limit = value.partition("=")
+        overrides[name] = float(limit)
+    return overrides
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Chronology backend microbenchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated record counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="maximum timed runs per case (default: %(default)s)")
+    parser.add_argument("--max-time", type=float, default=10.0,
+                        help="stop repeating a case after this many seconds (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for generated data")
+    parser.add_argument("--output", help="write machine-readable JSON results to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="compare against a previously saved JSON result file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown versus baseline as a fraction (default: %(default)s)")
+    parser.add_argument("--threshold-for", action="append", default=[], metavar="NAME=FRACTION",
+                        help="per-benchmark threshold override, may be repeated")
+    args = parser.parse_args(argv)
+
+    sizes = _parse_sizes(args.sizes)
+    results = []
+    for size in sizes:
+        print(f"Running benchmarks at {size} records...", file=sys.stderr)
+        results.extend(run_size(size, args.repeat, args.max_time, args.seed))
+
+    report = build_report(results, sizes)
+    print(format_results(results), file=sys.stderr)
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+    elif args.output:
+        write_report(report, args.output)
+
+    if args.baseline:
+        rows = compare(report, load_report(args.baseline), args.threshold, _parse_overrides(args.threshold_for))
+        print(format_comparison(rows), file=sys.stderr)
+        if any(row["regressed"] for row in rows):
+            print("Performance regression detected.", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
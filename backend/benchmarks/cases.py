@@ -0,0 +1,163 @@
+"""
+Benchmark cases for the storage, service and serialization layers.
+
+Every size runs against its own temporary SQLite database (and dataset
+directory) so results are independent of the developer's ``chronology.db``.
+"""
+
+import random
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.datagen import generate_csv
+from app.dataset_service import DatasetService
+from app.database import create_tables
+from app.services import MetricRecordService
+from app.storage import (
+    create_project, create_metric, create_metrics, get_project_metrics, get_project_by_id,
+    update_project_metric_settings, db_project_to_pydantic
+)
+
+from .harness import BenchResult, measure
+
+PROJECT_ID = "bench"
+MODELS = ["ResNet-50", "EfficientNet-B0", "Vision Transformer", "BERT-base", "LSTM"]
+INSERT_BATCH_SIZE = 5000
+SINGLE_INSERT_OPS = 1000
+DATASET_ROWS_READ = 100
+
+
+def _metric_rows(rng: random.Random, count: int, start: datetime) -> Iterator[dict]:
+    for i in range(count):
+        accuracy = rng.uniform(0.5, 0.99)
+        yield {
+            'id': f"{PROJECT_ID}-{uuid.UUID(int=rng.getrandbits(128))}",
+            'project_id': PROJECT_ID,
+            'timestamp': start + timedelta(minutes=i),
+            'model_name': MODELS[i % len(MODELS)],
+            'model_version': f"v{i % 7}.0",
+            'accuracy': accuracy,
+            'loss': 1.0 - accuracy + rng.uniform(-0.05, 0.05),
+            'precision': rng.uniform(0.5, 0.99),
+            'recall': rng.uniform(0.5, 0.99),
+            'f1_score': rng.uniform(0.5, 0.99),
+            'additional_metrics': '{"throughput": %.3f}' % rng.uniform(100, 1000),
+        }
+
+
+def _settings(count: int) -> List[dict]:
+    settings = []
+    for i in range(count):
+        settings.append({
+            'metric_id': f"metric_{i}",
+            'name': f"Metric {i}",
+            'type': 'float',
+            'color': f"hsl({(i * 37) % 360}, 100%, 50%)",
+            'unit': '',
+            'enabled': True,
+            'min_value': 0.0,
+            'max_value': 1.0,
+            'description': f"Benchmark metric {i}",
+        })
+    return settings
+
+
+def run_size(size: int, repeat: int, max_time: float, seed: int = 42) -> List[BenchResult]:
+    """Run every benchmark case against a fresh database holding ``size`` records."""
+    rng = random.Random(seed)
+    workdir = Path(tempfile.mkdtemp(prefix="chronology-bench-"))
+    engine = create_engine(f"sqlite:///{workdir / 'bench.db'}", connect_args={"check_same_thread": False})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    create_tables(engine)
+    results: List[BenchResult] = []
+
+    try:
+        db = Session()
+        now = datetime.utcnow()
+        create_project(db, {
+            'id': PROJECT_ID, 'name': 'Benchmark', 'description': 'Benchmark project',
+            'color': 'hsl(200, 100%, 50%)', 'created_at': now, 'updated_at': now,
+        })
+
+        # Batched inserts double as the population step, so they are timed exactly once
+        rows = list(_metric_rows(rng, size, datetime(2020, 1, 1)))
+
+        def insert_batched(rows=rows):
+            for offset in range(0, size, INSERT_BATCH_SIZE):
+                create_metrics(db, rows[offset:offset + INSERT_BATCH_SIZE])
+
+        results.append(measure("create_metric_batched", size, insert_batched, ops=size, repeat=1))
+        del rows, insert_batched  # the closure's default argument would keep the rows alive
+
+        single_rows = list(_metric_rows(rng, SINGLE_INSERT_OPS * repeat, datetime(2030, 1, 1)))
+        single_iter = iter(single_rows)
+
+        def insert_single():
+            for _ in range(SINGLE_INSERT_OPS):
+                create_metric(db, next(single_iter))
+
+        results.append(measure("create_metric_single", size, insert_single,
+                               ops=SINGLE_INSERT_OPS, repeat=repeat, max_time=max_time))
+        db.close()
+
+        # Read paths get a fresh session per run so the identity map never serves cached rows
+        session_holder = {}
+
+        def fresh_session():
+            if 'db' in session_holder:
+                session_holder['db'].close()
+            session_holder['db'] = Session()
+
+        results.append(measure(
+            "get_project_metrics", size,
+            lambda: get_project_metrics(session_holder['db'], PROJECT_ID),
+            repeat=repeat, max_time=max_time, setup=fresh_session,
+        ))
+        results.append(measure(
+            "db_project_to_pydantic", size,
+            lambda: db_project_to_pydantic(get_project_by_id(session_holder['db'], PROJECT_ID)),
+            repeat=repeat, max_time=max_time, setup=fresh_session,
+        ))
+        results.append(measure(
+            "get_models", size,
+            lambda: MetricRecordService.get_models(session_holder['db'], PROJECT_ID),
+            repeat=repeat, max_time=max_time, setup=fresh_session,
+        ))
+
+        settings = _settings(20)
+        results.append(measure(
+            "update_project_metric_settings", size,
+            lambda: update_project_metric_settings(session_holder['db'], PROJECT_ID, [dict(s) for s in settings]),
+            ops=len(settings), repeat=repeat, max_time=max_time, setup=fresh_session,
+        ))
+        session_holder['db'].close()
+
+        dataset_dir = workdir / "dataset"
+        dataset_dir.mkdir()
+        generate_csv(str(dataset_dir / "bench_data.csv"), "weather", size, seed)
+        service = DatasetService(str(dataset_dir))
+        dataset_id = service.list_datasets()[0]["id"]
+
+        results.append(measure("dataset_list", size, service.list_datasets, repeat=repeat, max_time=max_time))
+        results.append(measure(
+            "dataset_content_head", size,
+            lambda: service.get_dataset_content(dataset_id, DATASET_ROWS_READ),
+            ops=DATASET_ROWS_READ, repeat=repeat, max_time=max_time,
+        ))
+        results.append(measure(
+            "dataset_content_full", size,
+            lambda: service.get_dataset_content(dataset_id, size),
+            ops=size, repeat=repeat, max_time=max_time,
+        ))
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
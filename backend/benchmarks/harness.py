@@ -0,0 +1,162 @@
+"""
+Timing, result collection and baseline comparison for the benchmark suite.
+"""
+
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# A median of fewer runs than this is too noisy to gate on; such cases are compared as advisory only
+MIN_GATED_RUNS = 3
+# Slowdowns smaller than this many seconds are timer and scheduler noise, whatever their ratio
+NOISE_FLOOR_SECONDS = 0.0005
+
+
+@dataclass
+class BenchResult:
+    """Timings of one benchmark case at one dataset size."""
+    name: str
+    size: int
+    ops: int
+    runs: int
+    min: float
+    median: float
+    mean: float
+    opsPerSec: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return (self.name, self.size)
+
+
+def measure(
+    name: str,
+    size: int,
+    fn: Callable[[], Any],
+    ops: int = 1,
+    repeat: int = 5,
+    max_time: float = 10.0,
+    setup: Optional[Callable[[], Any]] = None,
+) -> BenchResult:
+    """Time ``fn`` up to ``repeat`` times, stopping early once ``max_time`` is spent.
+
+    ``setup`` runs before every timed call and is excluded from the timing.
+    At least one run is always recorded.
+    """
+    timings: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > max_time:
+            break
+
+    median = statistics.median(timings)
+    return BenchResult(
+        name=name,
+        size=size,
+        ops=ops,
+        runs=len(timings),
+        min=min(timings),
+        median=median,
+        mean=statistics.fmean(timings),
+        opsPerSec=ops / median if median > 0 else float("inf"),
+    )
+
+
+def build_report(results: List[BenchResult], sizes: List[int]) -> Dict[str, Any]:
+    """Wrap results with enough environment metadata to interpret them later."""
+    import sqlalchemy
+
+    return {
+        "meta": {
+            "createdAt": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sizes": sizes,
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    overrides: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """Compare median timings against a baseline report.
+
+    A case regresses when its median is more than ``threshold`` (a fraction,
+    e.g. ``0.1`` for 10%) slower than the baseline. ``overrides`` maps a case
+    name to its own threshold for noisier benchmarks. Cases with fewer than
+    ``MIN_GATED_RUNS`` runs in either report are advisory: they are listed
+    but never count as regressed, and so is any slowdown of less than
+    ``NOISE_FLOOR_SECONDS``.
+    """
+    overrides = overrides or {}
+    previous = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+
+    rows = []
+    for result in report["results"]:
+        base = previous.get((result["name"], result["size"]))
+        if base is None or base["median"] <= 0:
+            continue
+        limit = overrides.get(result["name"], threshold)
+        ratio = result["median"] / base["median"]
+        advisory = (min(result["runs"], base["runs"]) < MIN_GATED_RUNS
+                    or result["median"] - base["median"] < NOISE_FLOOR_SECONDS)
+        rows.append({
+            "name": result["name"],
+            "size": result["size"],
+            "baseline": base["median"],
+            "current": result["median"],
+            "ratio": ratio,
+            "threshold": limit,
+            "advisory": advisory,
+            "regressed": ratio > 1 + limit and not advisory,
+        })
+    return rows
+
+
+def format_results(results: List[BenchResult]) -> str:
+    lines = [f"{'benchmark':<36} {'size':>9} {'runs':>5} {'median(s)':>12} {'ops/s':>14}"]
+    for r in results:
+        lines.append(f"{r.name:<36} {r.size:>9} {r.runs:>5} {r.median:>12.6f} {r.opsPerSec:>14.1f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<36} {'size':>9} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for row in rows:
+        change = (row["ratio"] - 1) * 100
+        if row["regressed"]:
+            flag = "  REGRESSION"
+        elif row["advisory"] and row["ratio"] > 1 + row["threshold"]:
+            flag = "  slower (advisory)"
+        else:
+            flag = ""
+        lines.append(
+            f"{row['name']:<36} {row['size']:>9} {row['baseline']:>12.6f} "
+            f"{row['current']:>12.6f} {change:>+7.1f}%{flag}"
+        )
+    return "\n".join(lines)